@@ -0,0 +1,425 @@
+"""Price-drop alerts on scraped snapshots.
+
+Watch rules live in a JSON-lines watchlist, one rule per line, combining
+any of: brand, item, product id, size (one of available_sizes), a
+maximum price and a minimum discount. Rules are compiled into indexes by
+product id, brand, item and size, each bucket sorted by max_price, so a
+snapshot is matched in one pass: a product only looks at the bucket for
+its own id/brand/item/sizes, and only at rules whose max_price it meets.
+
+A (rule, product) pair alerts the first time it matches and again
+whenever the price falls below the last price seen for it
+(alerts_state.sqlite). Alerts are appended to alerts.jsonl and can also
+be POSTed to a webhook:
+
+    python alerts.py add --brand GUESS --max-price 150
+    python alerts.py add --item dress --min-discount 60 --size M
+    python alerts.py match premium_outlet_products_20251130_224700.csv --webhook http://localhost:9000/hook
+    python scrape_products.py --alerts watchlist.jsonl
+"""
+import argparse
+import contextlib
+import csv
+import json
+import math
+import sqlite3
+import sys
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_WATCHLIST = "watchlist.jsonl"
+DEFAULT_ALERTS = "alerts.jsonl"
+DEFAULT_ALERT_STATE = "alerts_state.sqlite"
+WEBHOOK_BATCH = 500  # Alerts per webhook POST
+WEBHOOK_TIMEOUT = 10.0
+
+# A rule is indexed under the first of these it sets: the most selective key
+ANCHORS = ('product_id', 'brand', 'item', 'size')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    rule_id TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    price REAL NOT NULL,
+    alerted_at TEXT NOT NULL,
+    PRIMARY KEY (rule_id, product_id)
+) WITHOUT ROWID;
+"""
+
+def fold(value) -> str:
+    """Case- and whitespace-insensitive key for brand, item and size comparisons"""
+    return str(value).strip().casefold()
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class WatchRule:
+    """One watch: every condition that is set must hold"""
+    id: str
+    brand: Optional[str] = None
+    item: Optional[str] = None
+    product_id: Optional[int] = None
+    size: Optional[str] = None
+    max_price: Optional[float] = None
+    min_discount: Optional[float] = None
+
+    def __post_init__(self):
+        if all(getattr(self, name) is None for name in (*ANCHORS, 'max_price', 'min_discount')):
+            raise ValueError(f"rule {self.id} has no conditions")
+        # Folded once here so matching compares plain strings
+        self._brand = fold(self.brand) if self.brand is not None else None
+        self._item = fold(self.item) if self.item is not None else None
+        self._size = fold(self.size) if self.size is not None else None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WatchRule":
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"unknown rule fields: {', '.join(sorted(unknown))}")
+        rule = dict(data)
+        rule['id'] = str(rule['id'])
+        if rule.get('product_id') is not None:
+            rule['product_id'] = int(rule['product_id'])
+        for name in ('max_price', 'min_discount'):
+            if rule.get(name) is not None:
+                rule[name] = float(rule[name])
+        return cls(**rule)
+
+    def as_dict(self) -> Dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+    @property
+    def anchor(self) -> Optional[Tuple[str, object]]:
+        for name in ANCHORS:
+            value = getattr(self, name)
+            if value is not None:
+                return name, value if name == 'product_id' else fold(value)
+        return None
+
+    def matches(self, product: "WatchedProduct") -> bool:
+        return ((self.product_id is None or product.id == self.product_id)
+                and (self._brand is None or product.brand == self._brand)
+                and (self._item is None or product.item == self._item)
+                and (self._size is None or self._size in product.sizes)
+                and (self.max_price is None or (product.price is not None and product.price <= self.max_price))
+                and (self.min_discount is None or (product.discount is not None
+                                                   and product.discount >= self.min_discount)))
+
+@dataclass
+class WatchedProduct:
+    """The fields rules look at, normalised from a flattened row (CSV strings or typed values)"""
+    id: int
+    brand: str
+    item: str
+    sizes: Tuple[str, ...]
+    price: Optional[float]
+    discount: Optional[float]
+    row: Dict
+
+    @classmethod
+    def from_row(cls, row: Dict) -> Optional["WatchedProduct"]:
+        try:
+            product_id = int(float(row['id']))
+        except (KeyError, TypeError, ValueError):
+            return None
+        sizes = row.get('available_sizes') or ''
+        if isinstance(sizes, str):
+            sizes = sizes.split(', ')
+        return cls(product_id, fold(row.get('brand_title') or ''), fold(row.get('item') or ''),
+                   tuple(fold(s) for s in sizes if s), _float(row.get('price')), _float(row.get('discount')), row)
+
+class _Bucket:
+    """Rules sharing an anchor key, sorted by max_price (no limit sorts last)"""
+
+    def __init__(self, rules: List[WatchRule]):
+        rules.sort(key=lambda r: math.inf if r.max_price is None else r.max_price)
+        self.rules = rules
+        self.limits = [math.inf if r.max_price is None else r.max_price for r in rules]
+
+    def affordable(self, price: Optional[float]) -> List[WatchRule]:
+        """Rules whose max_price this price meets; an unknown price only meets rules without one"""
+        start = bisect_left(self.limits, math.inf if price is None else price)
+        return self.rules[start:]
+
+class RuleIndex:
+    """Watch rules compiled for one-pass matching"""
+
+    def __init__(self, rules: Iterable[WatchRule]):
+        self.rules = list(rules)
+        grouped: Dict[str, Dict[object, List[WatchRule]]] = {name: {} for name in ANCHORS}
+        unanchored = []
+        for rule in self.rules:
+            anchor = rule.anchor
+            if anchor is None:
+                unanchored.append(rule)
+            else:
+                grouped[anchor[0]].setdefault(anchor[1], []).append(rule)
+        self.buckets = {name: {key: _Bucket(rules) for key, rules in keys.items()}
+                        for name, keys in grouped.items()}
+        self.unanchored = _Bucket(unanchored)
+
+    def match(self, product: WatchedProduct) -> List[WatchRule]:
+        """Rules this product satisfies; each rule sits in one bucket, so none is returned twice"""
+        candidates = [
+            self.buckets['product_id'].get(product.id),
+            self.buckets['brand'].get(product.brand),
+            self.buckets['item'].get(product.item),
+            *(self.buckets['size'].get(size) for size in set(product.sizes)),
+            self.unanchored,
+        ]
+        matched = []
+        for bucket in candidates:
+            if bucket is not None:
+                matched.extend(rule for rule in bucket.affordable(product.price) if rule.matches(product))
+        return matched
+
+def load_rules(path: str = DEFAULT_WATCHLIST) -> List[WatchRule]:
+    rules = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        rules.append(WatchRule.from_dict(json.loads(line)))
+                    except (KeyError, TypeError, ValueError) as e:
+                        raise SystemExit(f"{path}:{number}: invalid rule: {e}")
+    except FileNotFoundError:
+        pass
+    return rules
+
+def save_rules(rules: List[WatchRule], path: str = DEFAULT_WATCHLIST):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(rule.as_dict(), ensure_ascii=False) + '\n' for rule in rules)
+
+def iter_snapshot_rows(path: str) -> Iterator[Dict]:
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+class AlertLog:
+    """Last price seen per (rule, product), so only new matches and further drops alert"""
+
+    def __init__(self, path: str = DEFAULT_ALERT_STATE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "AlertLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def previous_prices(self) -> Dict[Tuple[str, int], float]:
+        return {(rule_id, product_id): price
+                for rule_id, product_id, price in self.conn.execute("SELECT rule_id, product_id, price FROM seen")}
+
+    def update(self, seen: List[Tuple[str, int, float]]):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)",
+                                  [(rule_id, product_id, price, now) for rule_id, product_id, price in seen])
+
+class AlertEngine:
+    """Matches rows against a RuleIndex and decides which matches are alerts"""
+
+    def __init__(self, index: RuleIndex, log: Optional[AlertLog] = None):
+        self.index = index
+        self.log = log
+        self.previous = log.previous_prices() if log is not None else {}
+        self.seen: Dict[Tuple[str, int], float] = {}  # This run, so a product in several snapshots alerts once
+        self.alerts: List[Dict] = []
+        self.sent: List[Dict] = []
+        self.matched = 0
+
+    def match_rows(self, rows: Iterable[Dict]):
+        for row in rows:
+            product = WatchedProduct.from_row(row)
+            if product is None:
+                continue
+            for rule in self.index.match(product):
+                key = (rule.id, product.id)
+                if key in self.seen:
+                    continue
+                self.matched += 1
+                # Cents, so float noise from re-serialised prices does not read as a drop
+                price = round(product.price, 2) if product.price is not None else math.inf
+                self.seen[key] = price
+                previous = self.previous.get(key)
+                if previous is None or price < previous:
+                    self.alerts.append(alert_record(rule, product, previous))
+
+    def finish(self, sinks: List["AlertSink"]) -> List[Dict]:
+        """Send the alerts and remember the prices seen; returns the alerts sent"""
+        alerts, self.alerts = self.alerts, []
+        self.sent.extend(alerts)
+        for sink in sinks:
+            sink.send(alerts)
+        if self.log is not None:
+            self.log.update([(rule_id, product_id, price) for (rule_id, product_id), price in self.seen.items()
+                             if price != math.inf])
+        return alerts
+
+def alert_record(rule: WatchRule, product: WatchedProduct, previous: Optional[float]) -> Dict:
+    row = product.row
+    return {
+        'type': 'new_match' if previous is None else 'price_drop',
+        'rule': rule.id,
+        'product_id': product.id,
+        'title': row.get('title'),
+        'brand': row.get('brand_title'),
+        'item': row.get('item'),
+        'price': product.price,
+        'previous_price': previous,
+        'discount': product.discount,
+        'sizes': [s for s in (row.get('available_sizes') or '').split(', ') if s]
+                 if isinstance(row.get('available_sizes'), str) else list(row.get('available_sizes') or []),
+        'route': row.get('route'),
+        'matched_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+class AlertSink(ABC):
+    """Where alerts go once a run has evaluated its rules"""
+
+    @abstractmethod
+    def send(self, alerts: List[Dict]):
+        """Deliver one run's alerts; called even when the list is empty"""
+
+class JsonlSink(AlertSink):
+    """Append alerts to a JSON-lines file"""
+
+    def __init__(self, path: str = DEFAULT_ALERTS):
+        self.path = path
+
+    def send(self, alerts: List[Dict]):
+        if alerts:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(a, ensure_ascii=False) + '\n' for a in alerts)
+
+class WebhookSink(AlertSink):
+    """POST alerts as JSON arrays of up to WEBHOOK_BATCH; failures are reported, not raised"""
+
+    def __init__(self, url: str, timeout: float = WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.failed = 0
+
+    def send(self, alerts: List[Dict]):
+        for i in range(0, len(alerts), WEBHOOK_BATCH):
+            batch = alerts[i:i + WEBHOOK_BATCH]
+            request = urllib.request.Request(self.url, data=json.dumps(batch, ensure_ascii=False).encode('utf-8'),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError) as e:
+                self.failed += len(batch)
+                print(f"✗ Webhook {self.url} failed for {len(batch)} alerts: {e}")
+
+def build_sinks(alerts_path: Optional[str] = DEFAULT_ALERTS, webhook: Optional[str] = None) -> List[AlertSink]:
+    sinks: List[AlertSink] = []
+    if alerts_path:
+        sinks.append(JsonlSink(alerts_path))
+    if webhook:
+        sinks.append(WebhookSink(webhook))
+    return sinks
+
+@contextlib.contextmanager
+def alert_session(rules_path: str, alerts_path: Optional[str] = DEFAULT_ALERTS, webhook: Optional[str] = None,
+                  state_path: Optional[str] = DEFAULT_ALERT_STATE) -> Iterator[Optional[AlertEngine]]:
+    """AlertEngine for a watchlist (None when it is empty); alerts are sent when the block ends"""
+    rules = load_rules(rules_path)
+    if not rules:
+        print(f"No watch rules in {rules_path}")
+        yield None
+        return
+    log = AlertLog(state_path) if state_path else None
+    try:
+        engine = AlertEngine(RuleIndex(rules), log)
+        yield engine
+        alerts = engine.finish(build_sinks(alerts_path, webhook))
+        print(f"✓ {len(rules)} watch rules: {engine.matched} matches, {len(alerts)} alerts"
+              + (f" saved to {alerts_path}" if alerts and alerts_path else ""))
+    finally:
+        if log is not None:
+            log.close()
+
+def run_alerts(rules_path: str, snapshots: List[str], alerts_path: Optional[str] = DEFAULT_ALERTS,
+               webhook: Optional[str] = None, state_path: Optional[str] = DEFAULT_ALERT_STATE) -> List[Dict]:
+    """Match CSV snapshots against a watchlist and send the resulting alerts"""
+    with alert_session(rules_path, alerts_path, webhook, state_path) as engine:
+        if engine is None:
+            return []
+        for path in snapshots:
+            engine.match_rows(iter_snapshot_rows(path))
+    return engine.sent
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage watch rules and match snapshots against them")
+    parser.add_argument('--rules', default=DEFAULT_WATCHLIST, help=f"watchlist file (default: {DEFAULT_WATCHLIST})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add a watch rule")
+    add.add_argument('--id', help="rule id (default: next free r<N>)")
+    add.add_argument('--brand')
+    add.add_argument('--item')
+    add.add_argument('--product-id', type=int)
+    add.add_argument('--size', help="alert when this size is in available_sizes")
+    add.add_argument('--max-price', type=float)
+    add.add_argument('--min-discount', type=float)
+
+    commands.add_parser('list', help="print the watch rules")
+    remove = commands.add_parser('remove', help="delete watch rules by id")
+    remove.add_argument('ids', nargs='+')
+
+    match = commands.add_parser('match', help="match CSV snapshots and send alerts")
+    match.add_argument('snapshots', nargs='+', help="premium_outlet_products_*.csv files")
+    match.add_argument('--out', default=DEFAULT_ALERTS, help=f"JSON-lines alert file (default: {DEFAULT_ALERTS})")
+    match.add_argument('--webhook', help="also POST alerts to this URL")
+    match.add_argument('--state', default=DEFAULT_ALERT_STATE,
+                       help=f"last prices per rule and product (default: {DEFAULT_ALERT_STATE})")
+    match.add_argument('--all', action='store_true', help="alert on every match, ignoring earlier runs")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    rules = load_rules(args.rules)
+
+    if args.command == 'add':
+        taken = {rule.id for rule in rules}
+        number = len(rules) + 1
+        while f"r{number}" in taken:
+            number += 1
+        rule_id = args.id or f"r{number}"
+        if rule_id in taken:
+            raise SystemExit(f"Rule {rule_id} already exists")
+        try:
+            rule = WatchRule(rule_id, args.brand, args.item, args.product_id, args.size, args.max_price,
+                             args.min_discount)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        save_rules(rules + [rule], args.rules)
+        print(f"✓ Added {json.dumps(rule.as_dict(), ensure_ascii=False)}")
+    elif args.command == 'list':
+        for rule in rules:
+            print(json.dumps(rule.as_dict(), ensure_ascii=False))
+        print(f"{len(rules)} rules in {args.rules}", file=sys.stderr)
+    elif args.command == 'remove':
+        kept = [rule for rule in rules if rule.id not in args.ids]
+        save_rules(kept, args.rules)
+        print(f"✓ Removed {len(rules) - len(kept)} rules")
+    else:
+        run_alerts(args.rules, args.snapshots, args.out, args.webhook, None if args.all else args.state)
+
+if __name__ == "__main__":
+    main()
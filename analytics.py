@@ -0,0 +1,464 @@
+"""Headless analytics over a product snapshot.
+
+Each analysis takes a DataFrame loaded by load_products (plus
+add_derived_columns) and its parameters, and returns plain JSON-ready
+data, so single numbers can be had without rendering any chart:
+
+    from analytics import load_dataset, brand_summary
+    df = load_dataset('premium_outlet_products_20251130_224700.csv')
+    brand_summary(df, 'Marina Rinaldi')['avg_discount']
+
+As a query front end the dataset is loaded once and kept in memory:
+
+    python analytics.py brand_ranking top=5 by=avg_discount
+    python analytics.py --repl                 # one query per line on stdin
+    python analytics.py --serve --port 8050    # GET /brand_summary?brand=Aquanova
+
+Every query also takes the filters brand, item, season, collection,
+min_price, max_price, min_discount and new_in.
+"""
+import argparse
+import inspect
+import json
+import shlex
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import pandas as pd
+
+from compact import SNAPSHOT_EXTENSION, read_frame, read_variants
+
+DATA_FILE = 'premium_outlet_products_20251130_224700.csv'
+DEFAULT_PORT = 8050
+
+# Explicit schema for the columns the charts and insights read; nothing else is loaded
+DTYPES = {
+    'brand_title': 'category',
+    'item': 'category',
+    'season': 'category',
+    'colection': 'category',
+    # float64: as float32, 250.4 comes back as 250.39999 and means drift in insights.json
+    'price': 'float64',
+    'priceOld': 'float64',
+    'discount': 'float64',
+    'variant_count': 'int16',
+    'newIn': 'bool',
+}
+USED_COLUMNS = list(DTYPES)
+NUMERIC_COLUMNS = ['price', 'priceOld', 'discount']
+QUERY_COLUMNS = USED_COLUMNS + ['id', 'title']  # Queries also name the products they list
+
+# Default length of every ranked list; analyze_data.py --top overrides them per run
+TOP_N = {
+    'brands': 15,
+    'items': 12,
+    'seasons': 10,
+    'collections': 8,
+    'expensive': 15,
+    'savings_brands': 10,
+    'variants': 10,
+    'sizes': 12,
+}
+
+def load_products(path, columns=None, engine=None):
+    """Load a CSV, Parquet or compact (.snap) snapshot with the DTYPES schema, reporting load time and memory.
+
+    engine='pyarrow' uses the multithreaded pyarrow CSV parser.
+    """
+    columns = list(columns or USED_COLUMNS)
+    dtypes = {c: DTYPES[c] for c in columns if c in DTYPES}
+    start = time.perf_counter()
+
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns).astype(dtypes)
+    elif path.endswith(SNAPSHOT_EXTENSION):
+        df = read_frame(path, columns).astype(dtypes)
+    else:
+        try:
+            df = pd.read_csv(path, usecols=columns, dtype=dtypes, engine=engine)
+        except (ValueError, TypeError):
+            # Malformed numbers: parse them as text and coerce, like the old cleaning step
+            text_dtypes = {c: t for c, t in dtypes.items() if c not in NUMERIC_COLUMNS}
+            df = pd.read_csv(path, usecols=columns, dtype=text_dtypes, engine=engine)
+            for column in NUMERIC_COLUMNS:
+                if column in df:
+                    df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtypes[column])
+
+    elapsed = time.perf_counter() - start
+    memory_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"Loaded {len(df):,} rows x {len(df.columns)} columns in {elapsed:.2f}s ({memory_mb:.2f} MB in memory)")
+    return df
+
+def add_derived_columns(df):
+    df['savings'] = df['priceOld'] - df['price']
+    df['savings_pct'] = (df['savings'] / df['priceOld'] * 100).fillna(0)
+    return df
+
+def load_variants(path):
+    """The variant table stored with a compact snapshot, or None (CSV/Parquet snapshots only carry sizes as text)"""
+    if not path.endswith(SNAPSHOT_EXTENSION):
+        return None
+    variants = read_variants(path, ['product_row', 'size', 'price', 'priceOld', 'quantity'])
+    if variants is not None:
+        print(f"Loaded {len(variants):,} variants")
+    return variants
+
+def load_dataset(path=DATA_FILE, columns=None, engine=None):
+    """load_products + add_derived_columns, with the columns the queries use"""
+    return add_derived_columns(load_products(path, columns or QUERY_COLUMNS, engine))
+
+def _counts(series: pd.Series) -> Dict[str, int]:
+    return {str(k): int(v) for k, v in series.items()}
+
+def _number(value) -> Optional[float]:
+    """JSON-ready float; rounded to 4 decimals so float noise (e.g. 250.39999) never reaches a response"""
+    return None if pd.isna(value) else round(float(value), 4)
+
+def filter_products(df, brand=None, item=None, season=None, collection=None, min_price=None,
+                    max_price=None, min_discount=None, new_in=None):
+    """Rows matching every given filter; df itself when no filter is set"""
+    mask = None
+    conditions = [
+        (brand, lambda: df['brand_title'] == brand),
+        (item, lambda: df['item'] == item),
+        (season, lambda: df['season'] == season),
+        (collection, lambda: df['colection'] == collection),
+        (min_price, lambda: df['price'] >= min_price),
+        (max_price, lambda: df['price'] <= max_price),
+        (min_discount, lambda: df['discount'] >= min_discount),
+        (new_in, lambda: df['newIn'] == new_in),
+    ]
+    for value, condition in conditions:
+        if value is not None:
+            mask = condition() if mask is None else mask & condition()
+    return df if mask is None else df[mask]
+
+FILTERS = [name for name in inspect.signature(filter_products).parameters if name != 'df']
+
+def price_distribution(df, bins=50):
+    """Summary statistics, price bands and a histogram of prices"""
+    prices = df['price'].dropna()
+    if prices.empty:
+        return {'products': 0}
+    counts, edges = np.histogram(prices, bins=bins)
+    bands = pd.cut(prices, bins=[0, 50, 100, 200, 500, 1000, np.inf],
+                   labels=['0-50', '50-100', '100-200', '200-500', '500-1000', '1000+'])
+    return {
+        'products': int(len(prices)),
+        'mean': _number(prices.mean()),
+        'median': _number(prices.median()),
+        'min': _number(prices.min()),
+        'max': _number(prices.max()),
+        'std': _number(prices.std()),
+        'bands': _counts(bands.value_counts().sort_index()),
+        'histogram': {'counts': counts.tolist(), 'edges': [_number(e) for e in edges]},
+    }
+
+def brand_table(df):
+    """Per-brand product count, average price and discount, and total savings"""
+    brands = df['brand_title']
+    stats = df.groupby(brands, observed=True).agg(
+        products=('price', 'size'),
+        avg_price=('price', 'mean'),
+        avg_discount=('discount', 'mean'),
+        total_savings=('savings', 'sum'),
+    )
+    stats['discounted'] = (df['discount'] > 0).groupby(brands, observed=True).sum()
+    return stats
+
+BRAND_RANKINGS = ['products', 'avg_price', 'avg_discount', 'total_savings']
+
+def brand_ranking(df, top=TOP_N['brands'], by='products', min_products=1, ascending=False):
+    """Brands ranked by product count, average price, average discount or total savings"""
+    if by not in BRAND_RANKINGS:
+        raise ValueError(f"by must be one of {', '.join(BRAND_RANKINGS)}")
+    stats = brand_table(df)
+    stats = stats[stats['products'] >= min_products]
+    stats = stats.sort_values(by, ascending=ascending).head(top)
+    return [{'brand': str(brand), 'products': int(row.products), 'avg_price': _number(row.avg_price),
+             'avg_discount': _number(row.avg_discount), 'discounted': int(row.discounted),
+             'total_savings': _number(row.total_savings)}
+            for brand, row in stats.iterrows()]
+
+def brand_summary(df, brand):
+    """Everything about one brand: size, prices, discounts, savings, items"""
+    rows = df[df['brand_title'] == brand]
+    if rows.empty:
+        return {'brand': brand, 'products': 0}
+    discount = rows['discount']
+    return {
+        'brand': brand,
+        'products': int(len(rows)),
+        'avg_price': _number(rows['price'].mean()),
+        'median_price': _number(rows['price'].median()),
+        'avg_discount': _number(discount.mean()),
+        'avg_discount_when_discounted': _number(discount[discount > 0].mean()),
+        'discounted': int((discount > 0).sum()),
+        'new_items': int(rows['newIn'].sum()),
+        'total_savings': _number(rows['savings'].sum()),
+        'items': _counts(rows['item'].value_counts().head(TOP_N['items'])[lambda c: c > 0]),
+    }
+
+def discount_summary(df):
+    """Discount depth overall and by band"""
+    discount = df['discount']
+    discounted = discount[discount > 0]
+    bands = pd.cut(discount, bins=[-1, 0, 20, 40, 60, 80, 100],
+                   labels=['No Discount', '1-20%', '21-40%', '41-60%', '61-80%', '81-100%'])
+    return {
+        'products_with_discount': int(len(discounted)),
+        'products_without_discount': int((discount == 0).sum()),
+        'avg_discount': _number(discounted.mean()),
+        'max_discount': _number(discount.max()),
+        'bands': _counts(bands.value_counts().sort_index()),
+    }
+
+def value_counts(df, column, top):
+    return _counts(df[column].value_counts().head(top)[lambda c: c > 0])
+
+def item_ranking(df, top=TOP_N['items']):
+    """Most common product categories"""
+    return value_counts(df, 'item', top)
+
+def season_ranking(df, top=TOP_N['seasons']):
+    """Products per season"""
+    return value_counts(df, 'season', top)
+
+def collection_ranking(df, top=TOP_N['collections']):
+    """Products per collection"""
+    return value_counts(df, 'colection', top)
+
+def savings_summary(df, top=TOP_N['savings_brands'], min_products=10):
+    """Total and typical savings, and the brands with the largest average savings"""
+    savings = df['savings']
+    positive = savings[savings > 0]
+    by_brand = positive.groupby(df.loc[savings > 0, 'brand_title'], observed=True).agg(['mean', 'count'])
+    best = by_brand[by_brand['count'] >= min_products].nlargest(top, 'mean')
+    return {
+        'total_potential_savings': _number(savings.sum()),
+        'avg_savings': _number(positive.mean()),
+        'median_savings': _number(positive.median()),
+        'products_with_savings': int(len(positive)),
+        'top_brands': [{'brand': str(brand), 'avg_savings': _number(row['mean']), 'products': int(row['count'])}
+                       for brand, row in best.iterrows()],
+    }
+
+def variant_summary(df, top=TOP_N['variants']):
+    """How many sizes/variants products come in"""
+    variants = df['variant_count']
+    return {
+        'avg_variants': _number(variants.mean()),
+        'max_variants': int(variants.max()) if len(variants) else 0,
+        'products_with_multiple_variants': int((variants > 1).sum()),
+        'counts': _counts(variants.value_counts().sort_index().head(top)),
+    }
+
+def size_summary(df, variants, top=TOP_N['sizes'], by='products'):
+    """Products offered in each size, with the average and lowest variant price (needs a variant table)"""
+    if by not in ('products', 'avg_price'):
+        raise ValueError(f"by must be products or avg_price, not {by!r}")
+    variants = variants[variants['product_row'].isin(df.index)]
+    per_size = variants.groupby('size', observed=True).agg(
+        products=('product_row', 'nunique'), avg_price=('price', 'mean'), min_price=('price', 'min'))
+    ranked = per_size.sort_values(by, ascending=False, kind='stable').head(top)
+    return {
+        'variants': int(len(variants)),
+        'sizes': int(len(per_size)),
+        'top': [{'size': str(size), 'products': int(row['products']),
+                 'share': _number(row['products'] / len(df) * 100) if len(df) else 0.0,
+                 'avg_price': _number(row['avg_price']), 'min_price': _number(row['min_price'])}
+                for size, row in ranked.iterrows()],
+    }
+
+def new_vs_old(df):
+    """Share and average price of new-in items"""
+    new_in = df['newIn']
+    new_count = int(new_in.sum())
+    avg_prices = df['price'].groupby(new_in).mean()
+    return {
+        'new_count': new_count,
+        'old_count': int(len(df) - new_count),
+        'new_percentage': _number(new_count / len(df) * 100) if len(df) else 0.0,
+        'avg_price_new': _number(avg_prices.get(True)),
+        'avg_price_old': _number(avg_prices.get(False)),
+    }
+
+def top_expensive(df, top=TOP_N['expensive']):
+    """Most expensive products"""
+    columns = [c for c in ('id', 'title', 'brand_title', 'item', 'price', 'priceOld', 'discount') if c in df]
+    rows = df.nlargest(top, 'price')[columns]
+    return [{k: _number(v) if isinstance(v, float) else v for k, v in row.items()}
+            for row in rows.to_dict('records')]
+
+QUERIES: Dict[str, Callable] = {
+    'price_distribution': price_distribution,
+    'brand_ranking': brand_ranking,
+    'brand_summary': brand_summary,
+    'discount_summary': discount_summary,
+    'item_ranking': item_ranking,
+    'season_ranking': season_ranking,
+    'collection_ranking': collection_ranking,
+    'savings_summary': savings_summary,
+    'variant_summary': variant_summary,
+    'new_vs_old': new_vs_old,
+    'top_expensive': top_expensive,
+}
+
+# Queries that also take the variant table, restricted to the filtered products
+VARIANT_QUERIES: Dict[str, Callable] = {
+    'size_summary': size_summary,
+}
+
+FILTER_TYPES = {'min_price': float, 'max_price': float, 'min_discount': float}
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"expected true/false: {value}")
+
+def _convert(name: str, value: str, default):
+    """Parse a query-string value by its parameter's default (or filter) type"""
+    kind = FILTER_TYPES.get(name) or (type(default) if default is not inspect.Parameter.empty else str)
+    if name == 'new_in' or kind is bool:
+        return _parse_bool(value)
+    return kind(value) if kind in (int, float) else value
+
+def describe_queries() -> Dict[str, Dict]:
+    """Query name -> description and parameters with their defaults"""
+    described = {}
+    for name, fn in {**QUERIES, **VARIANT_QUERIES}.items():
+        skip = 2 if name in VARIANT_QUERIES else 1
+        params = {p.name: (None if p.default is inspect.Parameter.empty else p.default)
+                  for p in list(inspect.signature(fn).parameters.values())[skip:]}
+        described[name] = {'description': inspect.getdoc(fn), 'params': params, 'filters': FILTERS}
+    return described
+
+def run_query(df, name: str, params: Dict[str, str], variants=None) -> Dict:
+    """Run one named query with string parameters (as from a URL or command line)"""
+    if name in VARIANT_QUERIES:
+        if variants is None:
+            raise ValueError(f"{name} needs a variant table: load a .snap snapshot written with --variants")
+        fn = VARIANT_QUERIES[name]
+    elif name in QUERIES:
+        fn = QUERIES[name]
+    else:
+        raise KeyError(f"unknown query {name!r}; try one of: {', '.join([*QUERIES, *VARIANT_QUERIES])}")
+    skip = 2 if name in VARIANT_QUERIES else 1
+    signature = {p.name: p.default for p in list(inspect.signature(fn).parameters.values())[skip:]}
+    filters, kwargs = {}, {}
+    for key, value in params.items():
+        if key in signature:  # brand_summary's own brand parameter wins over the brand filter
+            kwargs[key] = _convert(key, value, signature[key])
+        elif key in FILTERS:
+            filters[key] = _convert(key, value, inspect.Parameter.empty)
+        else:
+            raise ValueError(f"{name} has no parameter {key!r}")
+
+    start = time.perf_counter()
+    rows = filter_products(df, **filters)
+    result = fn(rows, variants, **kwargs) if name in VARIANT_QUERIES else fn(rows, **kwargs)
+    return {'query': name, 'params': params, 'rows': int(len(rows)),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3), 'result': result}
+
+def parse_query(line: str):
+    """'brand_ranking top=5 by=avg_discount' -> ('brand_ranking', {'top': '5', 'by': 'avg_discount'})"""
+    tokens = shlex.split(line)
+    params = {}
+    for token in tokens[1:]:
+        key, sep, value = token.partition('=')
+        if not sep:
+            raise ValueError(f"expected key=value, got {token!r}")
+        params[key] = value
+    return tokens[0], params
+
+def make_handler(df, variants=None) -> type:
+    class QueryHandler(BaseHTTPRequestHandler):
+        """GET /<query>?param=value returns JSON; GET / lists the queries"""
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            name = url.path.strip('/')
+            try:
+                body, status = (describe_queries(), 200) if not name else \
+                    (run_query(df, name, dict(parse_qsl(url.query)), variants), 200)
+            except KeyError as e:
+                body, status = {'error': str(e.args[0])}, 404
+            except (TypeError, ValueError) as e:
+                body, status = {'error': str(e)}, 400
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+def serve(df, host: str = '127.0.0.1', port: int = DEFAULT_PORT, variants=None):
+    server = HTTPServer((host, port), make_handler(df, variants))
+    print(f"Serving {len(QUERIES) + (len(VARIANT_QUERIES) if variants is not None else 0)} queries on http://{host}:{server.server_port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def repl(df, variants=None):
+    """Answer one query per input line until EOF"""
+    interactive = sys.stdin.isatty()
+    while True:
+        if interactive:
+            print('query> ', end='', flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            print(json.dumps(run_query(df, *parse_query(line), variants), ensure_ascii=False, indent=2, default=str))
+        except (KeyError, TypeError, ValueError) as e:
+            print(json.dumps({'error': str(e.args[0]) if isinstance(e, KeyError) else str(e)}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a product snapshot without rendering charts")
+    parser.add_argument('query', nargs='*', help="query name followed by key=value parameters")
+    parser.add_argument('--data', default=DATA_FILE, help="CSV, Parquet or compact .snap snapshot")
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default=None, help="CSV parser engine")
+    parser.add_argument('--serve', action='store_true', help="answer queries over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--repl', action='store_true', help="read queries from stdin, one per line")
+    parser.add_argument('--list', action='store_true', help="list the queries and their parameters")
+    args = parser.parse_args()
+
+    if args.list:
+        print(json.dumps(describe_queries(), indent=2))
+        return
+    if not (args.query or args.serve or args.repl):
+        parser.error("give a query, --repl or --serve (see --list)")
+
+    df = load_dataset(args.data, engine=args.engine)
+    variants = load_variants(args.data)
+    if args.serve:
+        serve(df, args.host, args.port, variants)
+    elif args.repl:
+        repl(df, variants)
+    else:
+        try:
+            result = run_query(df, *parse_query(shlex.join(args.query)), variants)
+        except (KeyError, TypeError, ValueError) as e:
+            raise SystemExit(str(e.args[0]) if isinstance(e, KeyError) else str(e))
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
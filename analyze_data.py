@@ -1,425 +1,729 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+import argparse
+import inspect
 import json
+import os
+import pickle
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style for better-looking charts
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
-plt.rcParams['font.size'] = 10
-
-# Load the data
-print("Loading data...")
-df = pd.read_csv('premium_outlet_products_20251130_224700.csv')
-
-print(f"Total records: {len(df)}")
-print(f"Columns: {len(df.columns)}")
-
-# Clean data
-df['price'] = pd.to_numeric(df['price'], errors='coerce')
-df['priceOld'] = pd.to_numeric(df['priceOld'], errors='coerce')
-df['discount'] = pd.to_numeric(df['discount'], errors='coerce')
-
-# Create insights dictionary
-insights = {}
+from analytics import DATA_FILE, TOP_N, USED_COLUMNS, add_derived_columns, load_products, load_variants
+from chart_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ArtifactCache, fingerprint
+
+CHARTS_DIR = 'charts'
+DEFAULT_DPI = 300
+
+# matplotlib and seaborn take most of this script's startup time, so they are
+# imported by load_plotting() the first time a chart is drawn, never on import
+plt = None
+sns = None
+
+def load_plotting():
+    """Import the plotting stack on the off-screen Agg backend (no-op once loaded)"""
+    global plt, sns
+    if plt is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Render off-screen, also inside worker processes
+        import matplotlib.pyplot
+        import seaborn
+        plt, sns = matplotlib.pyplot, seaborn
+
+def apply_style():
+    """Set style for better-looking charts (run once per rendering process)"""
+    load_plotting()
+    warnings.filterwarnings('ignore')
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 6)
+    plt.rcParams['font.size'] = 10
+
+def histogram(values, bins=50):
+    """Precomputed histogram; plt.hist(edges[:-1], edges, weights=counts) redraws it exactly"""
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+def plot_histogram(hist, **kwargs):
+    plt.hist(hist['edges'][:-1], bins=hist['edges'], weights=hist['counts'], **kwargs)
+
+def compute_aggregates(df, top_n=None, variant_table=None):
+    """One pass of pandas work shared by the charts, insights.json and the console summary.
+
+    Every mask, value count and group-by is built once. The result is plain
+    data: summary sections plus a small picklable aggregate per chart.
+    top_n overrides entries of analytics.TOP_N, the length of each chart's ranking.
+    With a variant table (analytics.load_variants), variants are counted from
+    it and chart 10 also ranks sizes by the products offered in them.
+    """
+    top_n = {**TOP_N, **(top_n or {})}
+    price = df['price']
+    discount = df['discount']
+    savings = df['savings']
+    if variant_table is not None:
+        variants = pd.Series(np.bincount(variant_table['product_row'], minlength=len(df)), index=df.index)
+    else:
+        variants = df['variant_count']
+
+    # Masks and value counts reused below
+    discounted = discount > 0
+    has_savings = savings > 0
+    new_in = df['newIn']
+    brand_counts = df['brand_title'].value_counts()
+    item_counts = df['item'].value_counts()
+    season_counts = df['season'].value_counts()
+    prices = price.dropna()
+    price_median = prices.median()
+    price_mean = prices.mean()
+    price_max = price.max()
+
+    df_discount = df.loc[discounted, ['discount', 'price']]
+    points = df_discount.dropna()
+    savings_data = savings[has_savings]
+    savings_by_brand = savings_data.groupby(df.loc[has_savings, 'brand_title'], observed=True).agg(['mean', 'count'])
+    top_brands_list = brand_counts.head(top_n['brands']).index
+    in_top_brands = df['brand_title'].isin(top_brands_list)
+    max_variants = int(variants.max())
+
+    if max_variants > 10:
+        variant_categories = pd.cut(variants, bins=[0, 1, 3, 5, 10, max_variants],
+                                    labels=['1 variant', '2-3 variants', '4-5 variants', '6-10 variants', '10+ variants'])
+    else:
+        variant_categories = pd.cut(variants, bins=[0, 1, 3, 5, max_variants],
+                                    labels=['1 variant', '2-3 variants', '4-5 variants', f'6-{max_variants} variants'])
+
+    charts = {
+        1: {
+            'hist': histogram(prices),
+            'median': price_median,
+            'mean': price_mean,
+            'price_range_counts': pd.cut(prices, bins=[0, 50, 100, 200, 500, 1000, price_max],
+                                         labels=['0-50', '50-100', '100-200', '200-500', '500-1000', '1000+'])
+                                  .value_counts().sort_index(),
+        },
+        2: {'top_brands': brand_counts.head(top_n['brands'])},
+        3: {
+            'discount_dist': df_discount['discount'].value_counts().sort_index(),
+            'discount_cat_counts': pd.cut(discount, bins=[-1, 0, 20, 40, 60, 80, 100],
+                                          labels=['No Discount', '1-20%', '21-40%', '41-60%', '61-80%', '81-100%'])
+                                   .value_counts().sort_index(),
+        },
+        4: {'top_items': item_counts.head(top_n['items'])},
+        5: {'season_counts': season_counts.head(top_n['seasons'])},
+        6: {
+            'discount': df_discount['discount'].to_numpy(),
+            'price': df_discount['price'].to_numpy(),
+            'trend': np.polyfit(points['discount'], points['price'], 1),
+            'avg_price_by_discount': df_discount['price'].groupby(
+                pd.cut(df_discount['discount'], bins=[0, 20, 40, 60, 80, 100])).mean(),
+        },
+        7: {'top_expensive': df.nlargest(top_n['expensive'], 'price')[['brand_title', 'price']].copy()},
+        8: {
+            'new_items': new_in.value_counts(),
+            'avg_prices': price.groupby(new_in).mean(),
+        },
+        9: {'brand_avg_prices': price[in_top_brands].groupby(df.loc[in_top_brands, 'brand_title'], observed=True)
+                                .mean().sort_values(ascending=True)},
+        10: {
+            'variant_counts': variants.value_counts().sort_index().head(top_n['variants']),
+            'variant_cat_counts': variant_categories.value_counts().sort_index(),
+        },
+        11: {
+            'hist': histogram(savings_data),
+            'median': savings_data.median(),
+            'top_savings_brands': savings_by_brand[savings_by_brand['count'] >= 10].nlargest(top_n['savings_brands'], 'mean'),
+        },
+        12: {'collection_counts': df['colection'].value_counts().head(top_n['collections'])},
+    }
+
+    if variant_table is not None:
+        per_size = variant_table.groupby('size', observed=True).agg(
+            products=('product_row', 'nunique'), avg_price=('price', 'mean'))
+        charts[10]['top_sizes'] = per_size.nlargest(top_n['sizes'], 'products')
+
+    discounted_count = int(discounted.sum())
+    new_count = int(new_in.sum())
+    return {
+        'total_products': len(df),
+        'unique_brands': int(df['brand_title'].nunique()),
+        'price': {
+            'mean': float(price_mean),
+            'median': float(price_median),
+            'min': float(price.min()),
+            'max': float(price_max),
+            'std': float(price.std()),
+        },
+        'top_brands': brand_counts.head(10).to_dict(),
+        'discount': {
+            'avg_discount': float(df_discount['discount'].mean()),
+            'products_with_discount': discounted_count,
+            'products_without_discount': int((discount == 0).sum()),
+            'max_discount': float(discount.max()),
+        },
+        'top_categories': item_counts.head(10).to_dict(),
+        'top_seasons': season_counts.head(5).to_dict(),
+        'new_items': {
+            'new_count': new_count,
+            'old_count': len(df) - new_count,
+            'new_percentage': float(new_count / len(df) * 100),
+        },
+        'variants': {
+            'avg_variants': float(variants.mean()),
+            'max_variants': max_variants,
+            'products_with_multiple_variants': int((variants > 1).sum()),
+        },
+        'savings': {
+            'total_potential_savings': float(savings.sum()),
+            'avg_savings': float(savings_data.mean()),
+            'products_with_savings': int(has_savings.sum()),
+        },
+        'charts': charts,
+    }
+
+INSIGHT_KEYS = ['price', 'top_brands', 'discount', 'top_categories', 'top_seasons',
+                'new_items', 'variants', 'savings']
+
+# Each chart is rendered from its entry in compute_aggregates()['charts'];
+# render functions only draw, so they can run in a worker process.
 
 # 1. PRICE DISTRIBUTION
-print("\n1. Creating Price Distribution chart...")
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-df['price'].dropna().hist(bins=50, edgecolor='black', color='#2E86AB')
-plt.xlabel('Price (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Price Distribution of Products', fontsize=14, fontweight='bold', pad=20)
-plt.axvline(df['price'].median(), color='red', linestyle='--', linewidth=2, label=f'Median: {df["price"].median():.2f} AZN')
-plt.axvline(df['price'].mean(), color='green', linestyle='--', linewidth=2, label=f'Mean: {df["price"].mean():.2f} AZN')
-plt.legend()
-plt.grid(True, alpha=0.3)
-
-plt.subplot(1, 2, 2)
-price_ranges = pd.cut(df['price'].dropna(), bins=[0, 50, 100, 200, 500, 1000, df['price'].max()],
-                      labels=['0-50', '50-100', '100-200', '200-500', '500-1000', '1000+'])
-price_range_counts = price_ranges.value_counts().sort_index()
-colors = sns.color_palette("viridis", len(price_range_counts))
-price_range_counts.plot(kind='bar', color=colors, edgecolor='black')
-plt.xlabel('Price Range (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Products by Price Range', fontsize=14, fontweight='bold', pad=20)
-plt.xticks(rotation=45)
-plt.grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('charts/01_price_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['price'] = {
-    'mean': float(df['price'].mean()),
-    'median': float(df['price'].median()),
-    'min': float(df['price'].min()),
-    'max': float(df['price'].max()),
-    'std': float(df['price'].std())
-}
+def render_price_distribution(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+
+    plt.subplot(1, 2, 1)
+    plot_histogram(data['hist'], edgecolor='black', color='#2E86AB')
+    plt.xlabel('Price (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Price Distribution of Products', fontsize=14, fontweight='bold', pad=20)
+    plt.axvline(data['median'], color='red', linestyle='--', linewidth=2, label=f'Median: {data["median"]:.2f} AZN')
+    plt.axvline(data['mean'], color='green', linestyle='--', linewidth=2, label=f'Mean: {data["mean"]:.2f} AZN')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+    plt.subplot(1, 2, 2)
+    price_range_counts = data['price_range_counts']
+    colors = sns.color_palette("viridis", len(price_range_counts))
+    price_range_counts.plot(kind='bar', color=colors, edgecolor='black')
+    plt.xlabel('Price Range (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Products by Price Range', fontsize=14, fontweight='bold', pad=20)
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 2. TOP BRANDS
-print("2. Creating Top Brands chart...")
-plt.figure(figsize=(14, 8))
-top_brands = df['brand_title'].value_counts().head(15)
-colors = sns.color_palette("husl", len(top_brands))
-bars = plt.barh(range(len(top_brands)), top_brands.values, color=colors, edgecolor='black', linewidth=1.5)
-plt.yticks(range(len(top_brands)), top_brands.index, fontsize=11)
-plt.xlabel('Number of Products', fontsize=12, fontweight='bold')
-plt.ylabel('Brand', fontsize=12, fontweight='bold')
-plt.title('Top 15 Brands by Product Count', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='x')
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, top_brands.values)):
-    plt.text(value + 5, i, str(value), va='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/02_top_brands.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['top_brands'] = top_brands.head(10).to_dict()
+def render_top_brands(data, path, dpi):
+    plt.figure(figsize=(14, 8))
+    top_brands = data['top_brands']
+    colors = sns.color_palette("husl", len(top_brands))
+    bars = plt.barh(range(len(top_brands)), top_brands.values, color=colors, edgecolor='black', linewidth=1.5)
+    plt.yticks(range(len(top_brands)), top_brands.index, fontsize=11)
+    plt.xlabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.ylabel('Brand', fontsize=12, fontweight='bold')
+    plt.title(f'Top {len(top_brands)} Brands by Product Count', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, top_brands.values)):
+        plt.text(value + 5, i, str(value), va='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 3. DISCOUNT ANALYSIS
-print("3. Creating Discount Analysis chart...")
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-discount_dist = df[df['discount'] > 0]['discount'].value_counts().sort_index()
-colors = sns.color_palette("rocket", len(discount_dist))
-plt.bar(discount_dist.index, discount_dist.values, color=colors, edgecolor='black', linewidth=1.5)
-plt.xlabel('Discount Percentage (%)', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Distribution of Discount Percentages', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='y')
-
-plt.subplot(1, 2, 2)
-discount_categories = pd.cut(df['discount'], bins=[-1, 0, 20, 40, 60, 80, 100],
-                              labels=['No Discount', '1-20%', '21-40%', '41-60%', '61-80%', '81-100%'])
-discount_cat_counts = discount_categories.value_counts().sort_index()
-colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#6C5CE7']
-
-# Create pie chart without labels, use legend instead
-wedges, texts, autotexts = plt.pie(discount_cat_counts, autopct='%1.1f%%',
-                                     colors=colors, startangle=140,
-                                     textprops={'fontsize': 11, 'fontweight': 'bold'},
-                                     pctdistance=0.75)
-
-# Make percentage text white for better visibility
-for autotext in autotexts:
-    autotext.set_color('white')
-    autotext.set_fontsize(11)
-    autotext.set_fontweight('bold')
-
-# Add legend
-plt.legend(discount_cat_counts.index, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1),
-           fontsize=10, frameon=False)
-plt.title('Products by Discount Range', fontsize=14, fontweight='bold', pad=20)
-
-plt.tight_layout()
-plt.savefig('charts/03_discount_analysis.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['discount'] = {
-    'avg_discount': float(df[df['discount'] > 0]['discount'].mean()),
-    'products_with_discount': int((df['discount'] > 0).sum()),
-    'products_without_discount': int((df['discount'] == 0).sum()),
-    'max_discount': float(df['discount'].max())
-}
+def render_discount_analysis(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+
+    plt.subplot(1, 2, 1)
+    discount_dist = data['discount_dist']
+    colors = sns.color_palette("rocket", len(discount_dist))
+    plt.bar(discount_dist.index, discount_dist.values, color=colors, edgecolor='black', linewidth=1.5)
+    plt.xlabel('Discount Percentage (%)', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Distribution of Discount Percentages', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    plt.subplot(1, 2, 2)
+    discount_cat_counts = data['discount_cat_counts']
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#6C5CE7']
+
+    # Create pie chart without labels, use legend instead
+    wedges, texts, autotexts = plt.pie(discount_cat_counts, autopct='%1.1f%%',
+                                       colors=colors, startangle=140,
+                                       textprops={'fontsize': 11, 'fontweight': 'bold'},
+                                       pctdistance=0.75)
+
+    # Make percentage text white for better visibility
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontsize(11)
+        autotext.set_fontweight('bold')
+
+    # Add legend
+    plt.legend(discount_cat_counts.index, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1),
+               fontsize=10, frameon=False)
+    plt.title('Products by Discount Range', fontsize=14, fontweight='bold', pad=20)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 4. PRODUCT CATEGORIES (ITEMS)
-print("4. Creating Product Categories chart...")
-plt.figure(figsize=(14, 8))
-top_items = df['item'].value_counts().head(12)
-colors = sns.color_palette("Set3", len(top_items))
-wedges, texts, autotexts = plt.pie(top_items, labels=top_items.index, autopct='%1.1f%%',
-                                     colors=colors, startangle=140,
-                                     textprops={'fontsize': 10, 'fontweight': 'bold'})
-plt.title('Product Categories Distribution (Top 12)', fontsize=14, fontweight='bold', pad=20)
-plt.axis('equal')
-plt.tight_layout()
-plt.savefig('charts/04_product_categories.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['top_categories'] = top_items.head(10).to_dict()
+def render_product_categories(data, path, dpi):
+    plt.figure(figsize=(14, 8))
+    top_items = data['top_items']
+    colors = sns.color_palette("Set3", len(top_items))
+    wedges, texts, autotexts = plt.pie(top_items, labels=top_items.index, autopct='%1.1f%%',
+                                       colors=colors, startangle=140,
+                                       textprops={'fontsize': 10, 'fontweight': 'bold'})
+    plt.title(f'Product Categories Distribution (Top {len(top_items)})', fontsize=14, fontweight='bold', pad=20)
+    plt.axis('equal')
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 5. SEASONAL ANALYSIS
-print("5. Creating Seasonal Analysis chart...")
-plt.figure(figsize=(14, 6))
-season_counts = df['season'].value_counts().head(10)
-colors = sns.color_palette("coolwarm", len(season_counts))
-plt.bar(range(len(season_counts)), season_counts.values, color=colors, edgecolor='black', linewidth=1.5)
-plt.xticks(range(len(season_counts)), season_counts.index, rotation=45, ha='right')
-plt.xlabel('Season', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Products by Season', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='y')
-
-# Add value labels
-for i, value in enumerate(season_counts.values):
-    plt.text(i, value + 10, str(value), ha='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/05_seasonal_analysis.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['top_seasons'] = season_counts.head(5).to_dict()
+def render_seasonal_analysis(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+    season_counts = data['season_counts']
+    colors = sns.color_palette("coolwarm", len(season_counts))
+    plt.bar(range(len(season_counts)), season_counts.values, color=colors, edgecolor='black', linewidth=1.5)
+    plt.xticks(range(len(season_counts)), season_counts.index, rotation=45, ha='right')
+    plt.xlabel('Season', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Products by Season', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    # Add value labels
+    for i, value in enumerate(season_counts.values):
+        plt.text(i, value + 10, str(value), ha='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 6. PRICE VS DISCOUNT CORRELATION
-print("6. Creating Price vs Discount chart...")
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-df_discount = df[df['discount'] > 0].copy()
-plt.scatter(df_discount['discount'], df_discount['price'], alpha=0.5, color='#E74C3C', s=30)
-plt.xlabel('Discount (%)', fontsize=12, fontweight='bold')
-plt.ylabel('Current Price (AZN)', fontsize=12, fontweight='bold')
-plt.title('Price vs Discount Percentage', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3)
-
-# Add trend line
-z = np.polyfit(df_discount['discount'].dropna(), df_discount['price'].dropna(), 1)
-p = np.poly1d(z)
-plt.plot(df_discount['discount'].sort_values(), p(df_discount['discount'].sort_values()),
-         "r--", linewidth=2, label='Trend')
-plt.legend()
-
-plt.subplot(1, 2, 2)
-# Average price by discount bracket
-discount_brackets = pd.cut(df_discount['discount'], bins=[0, 20, 40, 60, 80, 100])
-avg_price_by_discount = df_discount.groupby(discount_brackets)['price'].mean()
-colors = sns.color_palette("mako", len(avg_price_by_discount))
-avg_price_by_discount.plot(kind='bar', color=colors, edgecolor='black', linewidth=1.5)
-plt.xlabel('Discount Range (%)', fontsize=12, fontweight='bold')
-plt.ylabel('Average Price (AZN)', fontsize=12, fontweight='bold')
-plt.title('Average Price by Discount Range', fontsize=14, fontweight='bold', pad=20)
-plt.xticks(rotation=45)
-plt.grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('charts/06_price_vs_discount.png', dpi=300, bbox_inches='tight')
-plt.close()
+def render_price_vs_discount(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+
+    plt.subplot(1, 2, 1)
+    plt.scatter(data['discount'], data['price'], alpha=0.5, color='#E74C3C', s=30)
+    plt.xlabel('Discount (%)', fontsize=12, fontweight='bold')
+    plt.ylabel('Current Price (AZN)', fontsize=12, fontweight='bold')
+    plt.title('Price vs Discount Percentage', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3)
+
+    # Add trend line
+    p = np.poly1d(data['trend'])
+    x = np.sort(data['discount'])
+    plt.plot(x, p(x), "r--", linewidth=2, label='Trend')
+    plt.legend()
+
+    plt.subplot(1, 2, 2)
+    avg_price_by_discount = data['avg_price_by_discount']
+    colors = sns.color_palette("mako", len(avg_price_by_discount))
+    avg_price_by_discount.plot(kind='bar', color=colors, edgecolor='black', linewidth=1.5)
+    plt.xlabel('Discount Range (%)', fontsize=12, fontweight='bold')
+    plt.ylabel('Average Price (AZN)', fontsize=12, fontweight='bold')
+    plt.title('Average Price by Discount Range', fontsize=14, fontweight='bold', pad=20)
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 7. TOP EXPENSIVE PRODUCTS BY BRAND
-print("7. Creating Top Expensive Products chart...")
-plt.figure(figsize=(14, 8))
-top_expensive = df.nlargest(15, 'price')[['title', 'brand_title', 'price']].copy()
-colors = sns.color_palette("Spectral", len(top_expensive))
-bars = plt.barh(range(len(top_expensive)), top_expensive['price'].values, color=colors,
-                edgecolor='black', linewidth=1.5)
-labels = [f"{row['brand_title'][:20]}" for _, row in top_expensive.iterrows()]
-plt.yticks(range(len(top_expensive)), labels, fontsize=10)
-plt.xlabel('Price (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Brand', fontsize=12, fontweight='bold')
-plt.title('Top 15 Most Expensive Products', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='x')
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, top_expensive['price'].values)):
-    plt.text(value + 10, i, f'{value:.0f} AZN', va='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/07_top_expensive_products.png', dpi=300, bbox_inches='tight')
-plt.close()
+def render_top_expensive_products(data, path, dpi):
+    plt.figure(figsize=(14, 8))
+    top_expensive = data['top_expensive']
+    colors = sns.color_palette("Spectral", len(top_expensive))
+    bars = plt.barh(range(len(top_expensive)), top_expensive['price'].values, color=colors,
+                    edgecolor='black', linewidth=1.5)
+    labels = [f"{row['brand_title'][:20]}" for _, row in top_expensive.iterrows()]
+    plt.yticks(range(len(top_expensive)), labels, fontsize=10)
+    plt.xlabel('Price (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Brand', fontsize=12, fontweight='bold')
+    plt.title(f'Top {len(top_expensive)} Most Expensive Products', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, top_expensive['price'].values)):
+        plt.text(value + 10, i, f'{value:.0f} AZN', va='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 8. NEW ITEMS vs OLD ITEMS
-print("8. Creating New vs Old Items chart...")
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-new_items = df['newIn'].value_counts()
-colors_new = ['#3498DB', '#E74C3C']
-labels_new = ['New Items', 'Older Items']
-plt.pie(new_items, labels=labels_new, autopct='%1.1f%%', colors=colors_new,
-        startangle=90, textprops={'fontsize': 12, 'fontweight': 'bold'})
-plt.title('New Items vs Older Items', fontsize=14, fontweight='bold', pad=20)
-
-plt.subplot(1, 2, 2)
-# Average price comparison
-avg_prices = df.groupby('newIn')['price'].mean()
-colors_bar = ['#E74C3C', '#3498DB']
-bars = plt.bar(['Older Items', 'New Items'], avg_prices.values, color=colors_bar,
-               edgecolor='black', linewidth=2, width=0.6)
-plt.ylabel('Average Price (AZN)', fontsize=12, fontweight='bold')
-plt.title('Average Price: New vs Older Items', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='y')
-
-# Add value labels
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height,
-             f'{height:.2f} AZN', ha='center', va='bottom', fontweight='bold', fontsize=11)
-
-plt.tight_layout()
-plt.savefig('charts/08_new_vs_old_items.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['new_items'] = {
-    'new_count': int(df['newIn'].sum()),
-    'old_count': int((~df['newIn']).sum()),
-    'new_percentage': float(df['newIn'].sum() / len(df) * 100)
-}
+def render_new_vs_old_items(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+
+    plt.subplot(1, 2, 1)
+    colors_new = ['#3498DB', '#E74C3C']
+    labels_new = ['New Items', 'Older Items']
+    plt.pie(data['new_items'], labels=labels_new, autopct='%1.1f%%', colors=colors_new,
+            startangle=90, textprops={'fontsize': 12, 'fontweight': 'bold'})
+    plt.title('New Items vs Older Items', fontsize=14, fontweight='bold', pad=20)
+
+    plt.subplot(1, 2, 2)
+    # Average price comparison
+    colors_bar = ['#E74C3C', '#3498DB']
+    bars = plt.bar(['Older Items', 'New Items'], data['avg_prices'].values, color=colors_bar,
+                   edgecolor='black', linewidth=2, width=0.6)
+    plt.ylabel('Average Price (AZN)', fontsize=12, fontweight='bold')
+    plt.title('Average Price: New vs Older Items', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    # Add value labels
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                 f'{height:.2f} AZN', ha='center', va='bottom', fontweight='bold', fontsize=11)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 9. AVERAGE PRICE BY TOP BRANDS
-print("9. Creating Average Price by Brand chart...")
-plt.figure(figsize=(14, 8))
-top_brands_list = df['brand_title'].value_counts().head(15).index
-brand_avg_prices = df[df['brand_title'].isin(top_brands_list)].groupby('brand_title')['price'].mean().sort_values(ascending=True)
-colors = sns.color_palette("viridis", len(brand_avg_prices))
-bars = plt.barh(range(len(brand_avg_prices)), brand_avg_prices.values, color=colors,
-                edgecolor='black', linewidth=1.5)
-plt.yticks(range(len(brand_avg_prices)), brand_avg_prices.index, fontsize=11)
-plt.xlabel('Average Price (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Brand', fontsize=12, fontweight='bold')
-plt.title('Average Price by Top 15 Brands', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='x')
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, brand_avg_prices.values)):
-    plt.text(value + 5, i, f'{value:.0f}', va='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/09_avg_price_by_brand.png', dpi=300, bbox_inches='tight')
-plt.close()
+def render_avg_price_by_brand(data, path, dpi):
+    plt.figure(figsize=(14, 8))
+    brand_avg_prices = data['brand_avg_prices']
+    colors = sns.color_palette("viridis", len(brand_avg_prices))
+    bars = plt.barh(range(len(brand_avg_prices)), brand_avg_prices.values, color=colors,
+                    edgecolor='black', linewidth=1.5)
+    plt.yticks(range(len(brand_avg_prices)), brand_avg_prices.index, fontsize=11)
+    plt.xlabel('Average Price (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Brand', fontsize=12, fontweight='bold')
+    plt.title(f'Average Price by Top {len(brand_avg_prices)} Brands', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, brand_avg_prices.values)):
+        plt.text(value + 5, i, f'{value:.0f}', va='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 10. PRODUCT VARIANTS DISTRIBUTION
-print("10. Creating Product Variants chart...")
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-variant_counts = df['variant_count'].value_counts().sort_index().head(10)
-colors = sns.color_palette("magma", len(variant_counts))
-plt.bar(variant_counts.index, variant_counts.values, color=colors, edgecolor='black', linewidth=1.5)
-plt.xlabel('Number of Variants', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Products by Number of Variants', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='y')
-
-plt.subplot(1, 2, 2)
-max_variants = int(df['variant_count'].max())
-if max_variants > 10:
-    variant_categories = pd.cut(df['variant_count'], bins=[0, 1, 3, 5, 10, max_variants],
-                                labels=['1 variant', '2-3 variants', '4-5 variants', '6-10 variants', '10+ variants'])
-else:
-    variant_categories = pd.cut(df['variant_count'], bins=[0, 1, 3, 5, max_variants],
-                                labels=['1 variant', '2-3 variants', '4-5 variants', f'6-{max_variants} variants'])
-variant_cat_counts = variant_categories.value_counts().sort_index()
-colors_pie = sns.color_palette("Set2", len(variant_cat_counts))
-
-# Create pie chart with legend instead of labels
-wedges, texts, autotexts = plt.pie(variant_cat_counts, autopct='%1.1f%%',
-                                     colors=colors_pie, startangle=140,
-                                     textprops={'fontsize': 11, 'fontweight': 'bold'},
-                                     pctdistance=0.75)
-
-# Make percentage text white for better visibility
-for autotext in autotexts:
-    autotext.set_color('white')
-    autotext.set_fontsize(11)
-    autotext.set_fontweight('bold')
-
-# Add legend
-plt.legend(variant_cat_counts.index, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1),
-           fontsize=10, frameon=False)
-plt.title('Variant Range Distribution', fontsize=14, fontweight='bold', pad=20)
-
-plt.tight_layout()
-plt.savefig('charts/10_product_variants.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['variants'] = {
-    'avg_variants': float(df['variant_count'].mean()),
-    'max_variants': int(df['variant_count'].max()),
-    'products_with_multiple_variants': int((df['variant_count'] > 1).sum())
-}
+def render_product_variants(data, path, dpi):
+    panels = 3 if 'top_sizes' in data else 2
+    plt.figure(figsize=(7 * panels, 6))
+
+    plt.subplot(1, panels, 1)
+    variant_counts = data['variant_counts']
+    colors = sns.color_palette("magma", len(variant_counts))
+    plt.bar(variant_counts.index, variant_counts.values, color=colors, edgecolor='black', linewidth=1.5)
+    plt.xlabel('Number of Variants', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Products by Number of Variants', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    plt.subplot(1, panels, 2)
+    variant_cat_counts = data['variant_cat_counts']
+    colors_pie = sns.color_palette("Set2", len(variant_cat_counts))
+
+    # Create pie chart with legend instead of labels
+    wedges, texts, autotexts = plt.pie(variant_cat_counts, autopct='%1.1f%%',
+                                       colors=colors_pie, startangle=140,
+                                       textprops={'fontsize': 11, 'fontweight': 'bold'},
+                                       pctdistance=0.75)
+
+    # Make percentage text white for better visibility
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontsize(11)
+        autotext.set_fontweight('bold')
+
+    # Add legend
+    plt.legend(variant_cat_counts.index, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1),
+               fontsize=10, frameon=False)
+    plt.title('Variant Range Distribution', fontsize=14, fontweight='bold', pad=20)
+
+    if 'top_sizes' in data:
+        plt.subplot(1, panels, 3)
+        top_sizes = data['top_sizes'].iloc[::-1]
+        colors = sns.color_palette("crest", len(top_sizes))
+        bars = plt.barh(range(len(top_sizes)), top_sizes['products'].values, color=colors,
+                        edgecolor='black', linewidth=1.5)
+        plt.yticks(range(len(top_sizes)), top_sizes.index, fontsize=10)
+        plt.xlabel('Products Available', fontsize=12, fontweight='bold')
+        plt.ylabel('Size', fontsize=12, fontweight='bold')
+        plt.title(f'Top {len(top_sizes)} Sizes (avg price)', fontsize=14, fontweight='bold', pad=20)
+        plt.grid(True, alpha=0.3, axis='x')
+
+        for i, (bar, avg_price) in enumerate(zip(bars, top_sizes['avg_price'].values)):
+            plt.text(bar.get_width(), i, f' {avg_price:.0f} AZN', va='center', fontsize=9)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 11. SAVINGS ANALYSIS
-print("11. Creating Savings Analysis chart...")
-df['savings'] = df['priceOld'] - df['price']
-df['savings_pct'] = (df['savings'] / df['priceOld'] * 100).fillna(0)
-
-plt.figure(figsize=(14, 6))
-
-plt.subplot(1, 2, 1)
-savings_data = df[df['savings'] > 0]['savings']
-plt.hist(savings_data, bins=50, color='#27AE60', edgecolor='black', alpha=0.7)
-plt.xlabel('Savings Amount (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.title('Distribution of Savings', fontsize=14, fontweight='bold', pad=20)
-plt.axvline(savings_data.median(), color='red', linestyle='--', linewidth=2,
-            label=f'Median: {savings_data.median():.2f} AZN')
-plt.legend()
-plt.grid(True, alpha=0.3)
-
-plt.subplot(1, 2, 2)
-# Top brands by average savings
-top_savings_brands = df[df['savings'] > 0].groupby('brand_title')['savings'].agg(['mean', 'count'])
-top_savings_brands = top_savings_brands[top_savings_brands['count'] >= 10].nlargest(10, 'mean')
-colors = sns.color_palette("summer", len(top_savings_brands))
-bars = plt.barh(range(len(top_savings_brands)), top_savings_brands['mean'].values,
-                color=colors, edgecolor='black', linewidth=1.5)
-plt.yticks(range(len(top_savings_brands)), top_savings_brands.index, fontsize=10)
-plt.xlabel('Average Savings (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Brand', fontsize=12, fontweight='bold')
-plt.title('Top 10 Brands by Average Savings', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='x')
-
-for i, (bar, value) in enumerate(zip(bars, top_savings_brands['mean'].values)):
-    plt.text(value + 2, i, f'{value:.0f}', va='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/11_savings_analysis.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-insights['savings'] = {
-    'total_potential_savings': float(df['savings'].sum()),
-    'avg_savings': float(df[df['savings'] > 0]['savings'].mean()),
-    'products_with_savings': int((df['savings'] > 0).sum())
-}
+def render_savings_analysis(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+
+    plt.subplot(1, 2, 1)
+    plot_histogram(data['hist'], color='#27AE60', edgecolor='black', alpha=0.7)
+    plt.xlabel('Savings Amount (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.title('Distribution of Savings', fontsize=14, fontweight='bold', pad=20)
+    plt.axvline(data['median'], color='red', linestyle='--', linewidth=2,
+                label=f'Median: {data["median"]:.2f} AZN')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+    plt.subplot(1, 2, 2)
+    top_savings_brands = data['top_savings_brands']
+    colors = sns.color_palette("summer", len(top_savings_brands))
+    bars = plt.barh(range(len(top_savings_brands)), top_savings_brands['mean'].values,
+                    color=colors, edgecolor='black', linewidth=1.5)
+    plt.yticks(range(len(top_savings_brands)), top_savings_brands.index, fontsize=10)
+    plt.xlabel('Average Savings (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Brand', fontsize=12, fontweight='bold')
+    plt.title(f'Top {len(top_savings_brands)} Brands by Average Savings', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='x')
+
+    for i, (bar, value) in enumerate(zip(bars, top_savings_brands['mean'].values)):
+        plt.text(value + 2, i, f'{value:.0f}', va='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
 # 12. COLLECTION ANALYSIS
-print("12. Creating Collection Analysis chart...")
-plt.figure(figsize=(14, 6))
-collection_counts = df['colection'].value_counts().head(8)
-colors = sns.color_palette("pastel", len(collection_counts))
-bars = plt.bar(range(len(collection_counts)), collection_counts.values, color=colors,
-               edgecolor='black', linewidth=1.5)
-plt.xticks(range(len(collection_counts)), collection_counts.index, rotation=45, ha='right')
-plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
-plt.xlabel('Collection Type', fontsize=12, fontweight='bold')
-plt.title('Products by Collection', fontsize=14, fontweight='bold', pad=20)
-plt.grid(True, alpha=0.3, axis='y')
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, collection_counts.values)):
-    plt.text(i, value + 20, str(value), ha='center', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('charts/12_collection_analysis.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-# Save insights to JSON
-print("\nSaving insights to insights.json...")
-with open('insights.json', 'w', encoding='utf-8') as f:
-    json.dump(insights, f, indent=2, ensure_ascii=False)
-
-print("\n" + "="*60)
-print("ANALYSIS COMPLETE!")
-print("="*60)
-print(f"\nGenerated 12 charts in the 'charts/' folder")
-print(f"Insights saved to 'insights.json'")
-print(f"\nKey Statistics:")
-print(f"  - Total Products: {len(df):,}")
-print(f"  - Unique Brands: {df['brand_title'].nunique()}")
-print(f"  - Average Price: {df['price'].mean():.2f} AZN")
-print(f"  - Products on Discount: {(df['discount'] > 0).sum():,} ({(df['discount'] > 0).sum()/len(df)*100:.1f}%)")
-print(f"  - New Items: {df['newIn'].sum():,} ({df['newIn'].sum()/len(df)*100:.1f}%)")
-print(f"  - Total Potential Savings: {df['savings'].sum():,.2f} AZN")
-print("="*60)
+def render_collection_analysis(data, path, dpi):
+    plt.figure(figsize=(14, 6))
+    collection_counts = data['collection_counts']
+    colors = sns.color_palette("pastel", len(collection_counts))
+    bars = plt.bar(range(len(collection_counts)), collection_counts.values, color=colors,
+                   edgecolor='black', linewidth=1.5)
+    plt.xticks(range(len(collection_counts)), collection_counts.index, rotation=45, ha='right')
+    plt.ylabel('Number of Products', fontsize=12, fontweight='bold')
+    plt.xlabel('Collection Type', fontsize=12, fontweight='bold')
+    plt.title('Products by Collection', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, axis='y')
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, collection_counts.values)):
+        plt.text(i, value + 20, str(value), ha='center', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+# Chart number -> (output name, render, columns the chart reads)
+# number: (output name, render function, the TOP_N rankings it is drawn with)
+CHARTS = {
+    1: ('01_price_distribution', render_price_distribution, ()),
+    2: ('02_top_brands', render_top_brands, ('brands',)),
+    3: ('03_discount_analysis', render_discount_analysis, ()),
+    4: ('04_product_categories', render_product_categories, ('items',)),
+    5: ('05_seasonal_analysis', render_seasonal_analysis, ('seasons',)),
+    6: ('06_price_vs_discount', render_price_vs_discount, ()),
+    7: ('07_top_expensive_products', render_top_expensive_products, ('expensive',)),
+    8: ('08_new_vs_old_items', render_new_vs_old_items, ()),
+    9: ('09_avg_price_by_brand', render_avg_price_by_brand, ('brands',)),
+    10: ('10_product_variants', render_product_variants, ('variants', 'sizes')),
+    11: ('11_savings_analysis', render_savings_analysis, ('savings_brands',)),
+    12: ('12_collection_analysis', render_collection_analysis, ('collections',)),
+}
+
+def render_chart(number, data, dpi, out_dir=CHARTS_DIR):
+    """Render one chart from its aggregate; safe to run in a worker process"""
+    load_plotting()
+    name, render, _ = CHARTS[number]
+    path = os.path.join(out_dir, f'{name}.png')
+    start = time.perf_counter()
+    render(data, path, dpi)
+    return path, time.perf_counter() - start
+
+def render_charts(aggregates, numbers, dpi=DEFAULT_DPI, workers=None, out_dir=CHARTS_DIR):
+    """Rasterise the selected charts from their precomputed aggregates across a process pool"""
+    os.makedirs(out_dir, exist_ok=True)
+    aggregates = aggregates['charts']
+    workers = workers or min(len(numbers), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    if workers <= 1:
+        apply_style()
+        for n in numbers:
+            path, elapsed = render_chart(n, aggregates[n], dpi, out_dir)
+            print(f"  ✓ {path} ({elapsed:.2f}s)")
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_style) as pool:
+            futures = [pool.submit(render_chart, n, aggregates[n], dpi, out_dir) for n in numbers]
+            for future in as_completed(futures):
+                path, elapsed = future.result()
+                print(f"  ✓ {path} ({elapsed:.2f}s)")
+    print(f"Rendered {len(numbers)} chart(s) with {workers} worker(s) in {time.perf_counter() - start:.2f}s")
+
+def build_insights(aggregates):
+    return {key: aggregates[key] for key in INSIGHT_KEYS}
+
+def column_fingerprints(df, columns):
+    """Content hash per column, so a chart's cache key only changes when its inputs do"""
+    return {c: fingerprint(pd.util.hash_pandas_object(df[c], index=False).to_numpy().tobytes())
+            for c in columns}
+
+def chart_cache_key(number, data, dpi, top_n=None):
+    """The chart's own aggregate, ranking lengths and render code, plus DPI and style.
+
+    Keyed on the aggregate rather than the columns and compute_aggregates,
+    so a --top change or an edit to the aggregation only re-renders the
+    charts whose data actually changed.
+    """
+    _, render, rankings = CHARTS[number]
+    top_n = {**TOP_N, **(top_n or {})}
+    # Pickles of equal aggregates are byte-identical (checked across processes and hash seeds)
+    return fingerprint(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), dpi,
+                       [(name, top_n[name]) for name in rankings],
+                       inspect.getsource(apply_style), inspect.getsource(render))
+
+def insights_cache_key(column_hashes):
+    return fingerprint(*[column_hashes[c] for c in sorted(column_hashes)], inspect.getsource(compute_aggregates))
+
+def refresh_charts(aggregates, numbers, cache, dpi=DEFAULT_DPI, workers=None,
+                   force=False, out_dir=CHARTS_DIR, top_n=None):
+    """Re-render only charts whose cache key changed; restore earlier versions from the cache"""
+    os.makedirs(out_dir, exist_ok=True)
+    keys = {n: chart_cache_key(n, aggregates['charts'][n], dpi, top_n) for n in numbers}
+    stale = []
+    for n in numbers:
+        path = os.path.join(out_dir, f'{CHARTS[n][0]}.png')
+        if force:
+            stale.append(n)
+        elif cache.is_current(path, keys[n]):
+            print(f"  = {path} (unchanged)")
+        elif cache.restore(path, keys[n]):
+            print(f"  ↺ {path} (restored from cache)")
+        else:
+            stale.append(n)
+
+    if stale:
+        render_charts(aggregates, stale, dpi=dpi, workers=workers, out_dir=out_dir)
+        for n in stale:
+            cache.store(os.path.join(out_dir, f'{CHARTS[n][0]}.png'), keys[n])
+    else:
+        print("All selected charts are up to date")
+    return stale
+
+def parse_chart_list(value):
+    """'1,3,05_seasonal_analysis' -> [1, 3, 5]; 'all' selects every chart"""
+    if value == 'all':
+        return list(CHARTS)
+    names = {name: n for n, (name, _, _) in CHARTS.items()}
+    numbers = []
+    for token in value.split(','):
+        token = token.strip()
+        number = int(token) if token.isdigit() else names.get(token)
+        if number not in CHARTS:
+            raise argparse.ArgumentTypeError(f"unknown chart: {token}")
+        numbers.append(number)
+    return sorted(set(numbers))
+
+def parse_top_list(value):
+    """'brands=20,expensive=25' -> {'brands': 20, 'expensive': 25}"""
+    top_n = {}
+    for token in value.split(','):
+        key, _, count = token.strip().partition('=')
+        if key not in TOP_N or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(f"expected name=count with name one of {', '.join(TOP_N)}: {token}")
+        top_n[key] = int(count)
+    return top_n
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the Premium Outlet charts and insights.json")
+    parser.add_argument('data_file', nargs='?', default=DATA_FILE, help="CSV, Parquet or compact .snap snapshot")
+    parser.add_argument('--engine', choices=['c', 'pyarrow'], default=None, help="CSV parser engine")
+    parser.add_argument('--history', action='store_true',
+                        help="ingest every premium_outlet_products_* snapshot and report changes over time")
+    parser.add_argument('--charts', type=parse_chart_list, default=list(CHARTS),
+                        help="comma-separated chart numbers or names to render (default: all)")
+    parser.add_argument('--no-charts', action='store_true',
+                        help="only write insights.json and the summary; matplotlib is never imported")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="rendering processes (default: one per chart, up to the CPU count)")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help="output resolution")
+    parser.add_argument('--top', type=parse_top_list, default={},
+                        help="ranking lengths of the charts, e.g. brands=20,expensive=25")
+    parser.add_argument('--force', action='store_true', help="ignore the cache and re-render everything")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="chart/insights cache location")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 ** 2,
+                        help="evict stale cached artifacts beyond this size")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.history:
+        from history import run_history
+        run_history()
+        return
+
+    # Load the data
+    print("Loading data...")
+    df = add_derived_columns(load_products(args.data_file, engine=args.engine))
+    variant_table = load_variants(args.data_file)
+
+    print(f"Total records: {len(df)}")
+    print(f"Columns: {len(df.columns)}")
+
+    start = time.perf_counter()
+    aggregates = compute_aggregates(df, args.top, variant_table)
+    print(f"Computed aggregates in {time.perf_counter() - start:.2f}s")
+
+    cache = ArtifactCache(args.cache_dir, int(args.cache_max_mb * 1024 ** 2))
+    column_hashes = column_fingerprints(df, USED_COLUMNS)
+    column_hashes['variants'] = (fingerprint(pd.util.hash_pandas_object(variant_table, index=False).to_numpy().tobytes())
+                                 if variant_table is not None else 'none')
+
+    if args.no_charts:
+        print("\nSkipping charts (--no-charts)")
+    else:
+        print(f"\nRendering charts {', '.join(str(n) for n in args.charts)} at {args.dpi} dpi...")
+        refresh_charts(aggregates, args.charts, cache, dpi=args.dpi,
+                       workers=args.workers, force=args.force, top_n=args.top)
+
+    # Save insights to JSON
+    insights_key = insights_cache_key(column_hashes)
+    if not args.force and cache.is_current('insights.json', insights_key):
+        print("\ninsights.json is up to date")
+    else:
+        print("\nSaving insights to insights.json...")
+        insights = build_insights(aggregates)
+        with open('insights.json', 'w', encoding='utf-8') as f:
+            json.dump(insights, f, indent=2, ensure_ascii=False)
+        cache.store('insights.json', insights_key)
+
+    evicted = cache.evict()
+    if evicted:
+        print(f"Evicted {len(evicted)} stale cache entries")
+    cache.save()
+
+    print("\n" + "="*60)
+    print("ANALYSIS COMPLETE!")
+    print("="*60)
+    if not args.no_charts:
+        print(f"\nGenerated {len(args.charts)} charts in the '{CHARTS_DIR}/' folder")
+    print(f"Insights saved to 'insights.json'")
+    print(f"\nKey Statistics:")
+    total = aggregates['total_products']
+    discounted = aggregates['discount']['products_with_discount']
+    new_count = aggregates['new_items']['new_count']
+    print(f"  - Total Products: {total:,}")
+    print(f"  - Unique Brands: {aggregates['unique_brands']}")
+    print(f"  - Average Price: {aggregates['price']['mean']:.2f} AZN")
+    print(f"  - Products on Discount: {discounted:,} ({discounted/total*100:.1f}%)")
+    print(f"  - New Items: {new_count:,} ({new_count/total*100:.1f}%)")
+    print(f"  - Total Potential Savings: {aggregates['savings']['total_potential_savings']:,.2f} AZN")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Indexed vs naive watch-rule matching over a full snapshot.
+
+Generates random watch rules from the snapshot's own brands, items,
+sizes and ids, then matches every product against them twice: looping
+over every rule per product ("naive") and through alerts.RuleIndex
+("indexed"). Both must find the same (rule, product) pairs:
+
+    python -m benchmarks.bench_alerts --rules 20000 --json alerts.json
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from alerts import RuleIndex, WatchedProduct, WatchRule, iter_snapshot_rows
+from benchmarks.mock_api import DEFAULT_CSV
+
+def generate_rules(products: List[WatchedProduct], count: int, seed: int = 0) -> List[WatchRule]:
+    """A mix of brand + max price, item + min discount, product id and size (+ brand) rules"""
+    rng = random.Random(seed)
+    brands = sorted({p.brand for p in products if p.brand})
+    items = sorted({p.item for p in products if p.item})
+    sizes = sorted({s for p in products for s in p.sizes})
+    ids = [p.id for p in products]
+    rules = []
+    for n in range(count):
+        kind = n % 4
+        if kind == 0:
+            rule = WatchRule(f"r{n}", brand=rng.choice(brands), max_price=float(rng.randrange(20, 800, 10)))
+        elif kind == 1:
+            rule = WatchRule(f"r{n}", item=rng.choice(items), min_discount=float(rng.randrange(30, 90, 10)))
+        elif kind == 2:
+            rule = WatchRule(f"r{n}", product_id=rng.choice(ids), max_price=float(rng.randrange(50, 2000, 50)))
+        else:
+            rule = WatchRule(f"r{n}", size=rng.choice(sizes), brand=rng.choice(brands))
+        rules.append(rule)
+    return rules
+
+def naive_match(rules: List[WatchRule], products: List[WatchedProduct]) -> List[tuple]:
+    return [(rule.id, product.id) for product in products for rule in rules if rule.matches(product)]
+
+def indexed_match(index: RuleIndex, products: List[WatchedProduct]) -> List[tuple]:
+    return [(rule.id, product.id) for product in products for rule in index.match(product)]
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def run_benchmark(csv_path: str, rule_count: int, seed: int) -> Dict:
+    products = [p for p in map(WatchedProduct.from_row, iter_snapshot_rows(csv_path)) if p is not None]
+    rules = generate_rules(products, rule_count, seed)
+
+    index, compile_seconds = timed(lambda: RuleIndex(rules))
+    indexed, indexed_seconds = timed(lambda: indexed_match(index, products))
+    naive, naive_seconds = timed(lambda: naive_match(rules, products))
+    if sorted(indexed) != sorted(naive):
+        raise SystemExit(f"Indexed matching found {len(indexed)} pairs, naive {len(naive)}")
+
+    return {
+        'products': len(products),
+        'rules': len(rules),
+        'matches': len(indexed),
+        'compile_seconds': compile_seconds,
+        'naive_seconds': naive_seconds,
+        'indexed_seconds': indexed_seconds,
+        'speedup': naive_seconds / indexed_seconds if indexed_seconds else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed vs naive watch-rule matching")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="snapshot to match")
+    parser.add_argument('--rules', type=int, default=20000, help="number of random watch rules")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    r = run_benchmark(args.csv, args.rules, args.seed)
+
+    print(f"{r['products']:,} products x {r['rules']:,} rules -> {r['matches']:,} matches")
+    print(f"naive    {r['naive_seconds']:>8.3f}s")
+    print(f"indexed  {r['indexed_seconds']:>8.3f}s  (+{r['compile_seconds']:.3f}s to compile)  "
+          f"{r['speedup']:.0f}x faster")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(r, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compact .snap snapshots vs CSV and Parquet: size on disk and load time.
+
+Converts the snapshot into a temporary compact store, loads the analysis
+columns through analytics.load_products from each format, times the
+conversion again with the variant table (the cost of --variants), then
+copies the .snap file --copies times to time opening a run of hourly
+snapshots and summing a price column across them:
+
+    python -m benchmarks.bench_compact --copies 168 --json compact.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict
+
+from analytics import load_products
+from benchmarks.mock_api import DEFAULT_CSV
+from columnar import csv_to_parquet
+from compact import CompactStore, convert, variants_path
+
+HOURS_PER_YEAR = 24 * 365
+
+def timed_load(path: str, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_products(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def run_benchmark(csv_path: str, copies: int, rounds: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CompactStore(os.path.join(tmp, 'store'))
+        start = time.perf_counter()
+        snap, rows = convert(csv_path, store)
+        convert_seconds = time.perf_counter() - start
+        with_variants = CompactStore(os.path.join(tmp, 'variants'), variants=True)
+        start = time.perf_counter()
+        variants_snap, _ = convert(csv_path, with_variants)
+        variants_seconds = time.perf_counter() - start
+        parquet = csv_to_parquet(csv_path, os.path.join(tmp, 'snapshot.parquet'))
+
+        sizes = {'csv': os.path.getsize(csv_path), 'parquet': os.path.getsize(parquet),
+                 'snap': os.path.getsize(snap), 'variants': os.path.getsize(variants_path(variants_snap)),
+                 'dictionaries': directory_size(os.path.join(store.root, 'strings'))}
+        loads = {'csv': timed_load(csv_path, rounds), 'parquet': timed_load(parquet, rounds),
+                 'snap': timed_load(snap, rounds)}
+
+        # Later snapshots only add the strings they introduce, so copies share the dictionaries
+        stem = os.path.splitext(os.path.basename(snap))[0]
+        for n in range(1, copies):
+            shutil.copyfile(snap, os.path.join(store.root, f"{stem}_{n:05d}.snap"))
+        start = time.perf_counter()
+        total = 0.0
+        opened = 0
+        for snapshot in CompactStore(store.root).snapshots():
+            total += float(snapshot.column('price').sum())
+            opened += 1
+        scan_seconds = time.perf_counter() - start
+
+    return {
+        'rows': rows,
+        'bytes': sizes,
+        'convert_seconds': convert_seconds,
+        'convert_with_variants_seconds': variants_seconds,
+        'load_seconds': loads,
+        'snapshots_scanned': opened,
+        'scan_seconds': scan_seconds,
+        'year_scan_estimate_seconds': scan_seconds / opened * HOURS_PER_YEAR,
+        'year_bytes_estimate': sizes['snap'] * HOURS_PER_YEAR + sizes['dictionaries'],
+        'price_total': total,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact snapshots against CSV and Parquet")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="snapshot to convert")
+    parser.add_argument('--copies', type=int, default=168, help="snapshots to scan (a week of hourly runs)")
+    parser.add_argument('--rounds', type=int, default=3, help="loads per format; the fastest counts")
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    r = run_benchmark(args.csv, args.copies, args.rounds)
+
+    print(f"{r['rows']:,} rows, converted in {r['convert_seconds']:.2f}s")
+    print(f"{'format':<10} {'MB':>8} {'load s':>8}")
+    for name in ('csv', 'parquet', 'snap'):
+        print(f"{name:<10} {r['bytes'][name] / 1024 ** 2:>8.2f} {r['load_seconds'][name]:>8.3f}")
+    print(f"variant table {r['bytes']['variants'] / 1024 ** 2:.2f} MB, adds "
+          f"{r['convert_with_variants_seconds'] - r['convert_seconds']:.2f}s to the conversion")
+    print(f"shared dictionaries {r['bytes']['dictionaries'] / 1024 ** 2:.2f} MB (written once per store)")
+    print(f"{r['snapshots_scanned']} snapshots opened and summed in {r['scan_seconds']:.3f}s; "
+          f"a year of hourly snapshots: ~{r['year_scan_estimate_seconds']:.1f}s, "
+          f"~{r['year_bytes_estimate'] / 1024 ** 3:.1f} GB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(r, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Rows/sec for per-dict vs column-wise flattening of API products.
+
+Rebuilds API-shaped products from a CSV snapshot, splits them into pages
+of PAGE_SIZE and flattens every page with each approach:
+
+    python -m benchmarks.bench_flatten --rounds 5 --json flatten.json
+
+"before" is flatten_product (below) per item fed to csv.DictWriter, "after" is
+columnar.flatten_page per page fed to csv.writer. "flatten" times the
+flattening alone, "flatten+csv" includes writing the CSV to memory.
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.mock_api import DEFAULT_CSV, load_catalogue
+from columnar import flatten_page
+from scrape_products import FIELDNAMES, PAGE_SIZE
+
+def flatten_product(product: Dict) -> Dict:
+    """The per-product flattener the scraper used before columnar.flatten_page; the baseline"""
+    flattened = {
+        'id': product.get('id'),
+        'title': product.get('title'),
+        'route': product.get('route'),
+        'brandName': product.get('brandName'),
+        'brand_title': product.get('brand', {}).get('title'),
+        'brand_route': product.get('brand', {}).get('route'),
+        'price': product.get('price'),
+        'priceOld': product.get('priceOld'),
+        'discount': product.get('discount'),
+        'maxPrice': product.get('maxPrice'),
+        'minPrice': product.get('minPrice'),
+        'maxPriceOld': product.get('maxPriceOld'),
+        'minPriceOld': product.get('minPriceOld'),
+        'newIn': product.get('newIn'),
+        'monoBrand': product.get('monoBrand'),
+        'priceInStore': product.get('priceInStore'),
+        'season': product.get('season'),
+        'colection': product.get('colection'),
+        'line': product.get('line'),
+        'item': product.get('item'),
+        'model': product.get('model'),
+        'article': product.get('article'),
+        'warehouse': product.get('warehouse'),
+        'image': product.get('image'),
+        'mannequins': product.get('mannequins'),
+        'outfit': product.get('outfit'),
+        'hasVariantPrice': product.get('hasVariantPrice'),
+        'beautyDiscount': product.get('beautyDiscount'),
+        'discountId': product.get('discountId'),
+        # Size table info
+        'sizeTable_name': product.get('sizeTable', {}).get('name'),
+        'sizeTable_title': product.get('sizeTable', {}).get('title'),
+        'sizeTable_show': product.get('sizeTable', {}).get('show'),
+        # Variants (join sizes)
+        'available_sizes': ', '.join([v.get('siteSize', '') for v in product.get('variants', [])]),
+        'variant_count': len(product.get('variants', [])),
+        # Images (join image URLs)
+        'images': ', '.join([img.get('source', '') for img in product.get('images', [])]),
+        'image_count': len(product.get('images', [])),
+    }
+
+    return flattened
+
+def per_dict_flatten(pages: List[List[Dict]]):
+    for page in pages:
+        [flatten_product(p) for p in page]
+
+def per_dict_csv(pages: List[List[Dict]]):
+    writer = csv.DictWriter(io.StringIO(), fieldnames=FIELDNAMES)
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(flatten_product(p) for p in page)
+
+def columnar_flatten(pages: List[List[Dict]]):
+    for page in pages:
+        flatten_page(page)
+
+def columnar_csv(pages: List[List[Dict]]):
+    writer = csv.writer(io.StringIO())
+    writer.writerow(FIELDNAMES)
+    for page in pages:
+        columns = flatten_page(page)
+        writer.writerows(zip(*(columns[name] for name in FIELDNAMES)))
+
+CASES = {
+    'flatten': {'before': per_dict_flatten, 'after': columnar_flatten},
+    'flatten+csv': {'before': per_dict_csv, 'after': columnar_csv},
+}
+
+def best_of(fn: Callable, pages: List[List[Dict]], rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(pages)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_benchmark(csv_path: str, rounds: int) -> Dict:
+    products = load_catalogue(csv_path)
+    pages = [products[i:i + PAGE_SIZE] for i in range(0, len(products), PAGE_SIZE)]
+    results = {'rows': len(products)}
+    for case, variants in CASES.items():
+        results[case] = {}
+        for name, fn in variants.items():
+            seconds = best_of(fn, pages, rounds)
+            results[case][name] = {'seconds': seconds, 'rows_per_sec': len(products) / seconds}
+        results[case]['speedup'] = results[case]['after']['rows_per_sec'] / results[case]['before']['rows_per_sec']
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-dict vs column-wise product flattening")
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.csv, args.rounds)
+
+    print(f"{results['rows']:,} rows, best of {args.rounds}")
+    print(f"{'case':<12} {'before rows/s':>14} {'after rows/s':>13} {'speedup':>8}")
+    for case in CASES:
+        r = results[case]
+        print(f"{case:<12} {r['before']['rows_per_sec']:>14,.0f} {r['after']['rows_per_sec']:>13,.0f} "
+              f"{r['speedup']:>7.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
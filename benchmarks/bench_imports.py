@@ -0,0 +1,93 @@
+"""Cold-start import time of each entry point, from python -X importtime.
+
+Each module is imported in a fresh interpreter a few times; the run with
+the smallest cumulative import time is reported along with the modules
+that cost the most and whether the heavy optional stacks were loaded:
+
+    python -m benchmarks.bench_imports --rounds 5 --json imports.json
+    python -m benchmarks.bench_imports --modules analyze_data --top 20
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ENTRY_POINTS = ('scrape_products', 'analyze_data', 'analytics', 'history', 'columnar')
+# matplotlib/seaborn should only load once a chart is drawn; pandas itself may import pyarrow
+HEAVY_PACKAGES = ('matplotlib', 'seaborn', 'pyarrow')
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """'import time: self [us] | cumulative | imported package' lines -> dicts in microseconds"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        records.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                        'self_us': int(own), 'cumulative_us': int(cumulative)})
+    return records
+
+def measure(module: str) -> Dict:
+    """Import one module in a fresh interpreter"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr.splitlines()[-1]}")
+    records = parse_importtime(proc.stderr)
+    top_level = next(r for r in reversed(records) if r['module'] == module)
+    loaded = {r['module'].split('.')[0] for r in records}
+    return {
+        'import_seconds': top_level['cumulative_us'] / 1e6,
+        'process_seconds': wall,
+        'modules': len(records),
+        'heavy_loaded': [p for p in HEAVY_PACKAGES if p in loaded],
+        'records': records,
+    }
+
+def run_benchmark(modules: List[str], rounds: int, top: int) -> Dict:
+    results = {}
+    for module in modules:
+        best = min((measure(module) for _ in range(rounds)), key=lambda r: r['import_seconds'])
+        records = best.pop('records')
+        best['slowest'] = [{'module': r['module'], 'self_seconds': r['self_us'] / 1e6,
+                            'cumulative_seconds': r['cumulative_us'] / 1e6}
+                           for r in sorted(records, key=lambda r: r['self_us'], reverse=True)[:top]]
+        # Own import time summed per top-level package, so nested imports are not counted twice
+        packages = {}
+        for r in records:
+            name = r['module'].split('.')[0]
+            packages[name] = packages.get(name, 0) + r['self_us']
+        best['packages'] = {name: us / 1e6 for name, us in
+                            sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]}
+        results[module] = best
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import time of the entry points")
+    parser.add_argument('--modules', default=','.join(ENTRY_POINTS), help="comma-separated modules to import")
+    parser.add_argument('--rounds', type=int, default=3, help="fresh interpreters per module; the fastest counts")
+    parser.add_argument('--top', type=int, default=8, help="heaviest modules and packages to list")
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+    modules = [m.strip() for m in args.modules.split(',') if m.strip()]
+
+    results = run_benchmark(modules, args.rounds, args.top)
+
+    print(f"{'module':<16} {'import s':>9} {'process s':>10} {'modules':>8}  heavy stacks loaded")
+    for module, r in results.items():
+        print(f"{module:<16} {r['import_seconds']:>9.3f} {r['process_seconds']:>10.3f} {r['modules']:>8}  "
+              f"{', '.join(r['heavy_loaded']) or '-'}")
+    for module, r in results.items():
+        packages = ', '.join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in r['packages'].items())
+        print(f"\n{module}: {packages}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
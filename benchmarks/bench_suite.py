@@ -0,0 +1,198 @@
+"""End-to-end benchmark suite with JSON results for comparing commits.
+
+Stages (best of --rounds each):
+  run_snapshot      full snapshot run (crawl, checkpoint, CSV/NDJSON) against an in-process mock API
+  snapshot_writer   writing the replayed catalogue page by page through SnapshotWriter
+  load/aggregate    analyze_data.load_products + compute_aggregates
+  chart_NN          each chart rendered alone from its aggregate
+  insights          build_insights + json.dump
+
+    python -m benchmarks.generate_data --rows 1000000 -o synthetic_1m.csv
+    python -m benchmarks.bench_suite --pages 2000 --data synthetic_1m.csv --json bench.json
+    python -m benchmarks.bench_suite --json new.json --baseline bench.json
+
+With --baseline, stages more than --threshold slower than the baseline
+are reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.mock_api import DEFAULT_CSV, create_app, load_catalogue, start_server
+from scrape_products import PAGE_SIZE, SnapshotWriter, run_snapshot
+from transport import TransportConfig
+
+STAGE_GROUPS = ('scrape', 'csv', 'analysis')
+DEFAULT_THRESHOLD = 0.10
+COMPARABLE_PARAMS = ('csv', 'pages', 'latency', 'jitter', 'error_rate', 'data', 'dpi')
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def best_of(rounds: int, fn: Callable[[], None]) -> float:
+    """Fastest of `rounds` runs of fn, with its console output silenced"""
+    timings = []
+    for _ in range(rounds):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def stage(seconds: float, count: int, unit: str) -> Dict:
+    return {'seconds': seconds, 'count': count, 'unit': unit, 'per_sec': count / seconds if seconds else 0.0}
+
+async def _scrape(url: str, out_dir: str) -> int:
+    # run_snapshot writes timestamped files to the working directory
+    with contextlib.chdir(out_dir):
+        return await run_snapshot(TransportConfig(api_url=url), collect_metrics=False,
+                                  checkpoint_path=os.path.join(out_dir, 'bench_checkpoint.sqlite'))
+
+async def _scrape_rounds(products: List[Dict], args: argparse.Namespace, out_dir: str) -> Dict:
+    app = create_app(products, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                     seed=0, total_items=args.pages * PAGE_SIZE if args.pages else None)
+    runner, url = await start_server(app)
+    timings = []
+    try:
+        for _ in range(args.rounds):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                items = await _scrape(url, out_dir)
+                timings.append(time.perf_counter() - start)
+    finally:
+        await runner.cleanup()
+    pages = -(-items // PAGE_SIZE)
+    result = stage(min(timings), pages, 'pages')
+    result['items'] = items
+    return result
+
+def bench_scrape(products: List[Dict], args: argparse.Namespace, out_dir: str) -> Dict[str, Dict]:
+    return {'run_snapshot': asyncio.run(_scrape_rounds(products, args, out_dir))}
+
+def bench_csv(products: List[Dict], args: argparse.Namespace, out_dir: str) -> Dict[str, Dict]:
+    pages = [products[start:start + PAGE_SIZE] for start in range(0, len(products), PAGE_SIZE)]
+
+    def write():
+        with SnapshotWriter(os.path.join(out_dir, 'writer.csv'), os.path.join(out_dir, 'writer.ndjson')) as writer:
+            for page in pages:
+                writer.write_page(page)
+            writer.complete()
+    return {'snapshot_writer': stage(best_of(args.rounds, write), len(products), 'rows')}
+
+def bench_analysis(args: argparse.Namespace, out_dir: str) -> Dict[str, Dict]:
+    import analyze_data
+
+    results = {}
+    frames = []
+    seconds = best_of(args.rounds, lambda: frames.append(
+        analyze_data.add_derived_columns(analyze_data.load_products(args.data))))
+    df = frames[-1]
+    rows = len(df)
+    results['load'] = stage(seconds, rows, 'rows')
+
+    aggregates = []
+    seconds = best_of(args.rounds, lambda: aggregates.append(analyze_data.compute_aggregates(df)))
+    aggregates = aggregates[-1]
+    results['aggregate'] = stage(seconds, rows, 'rows')
+
+    analyze_data.apply_style()
+    for number, (name, _, _) in analyze_data.CHARTS.items():
+        seconds = best_of(args.rounds, lambda: analyze_data.render_chart(
+            number, aggregates['charts'][number], args.dpi, out_dir))
+        results[f'chart_{number:02d}'] = stage(seconds, 1, 'charts')
+        results[f'chart_{number:02d}']['name'] = name
+
+    def write_insights():
+        with open(os.path.join(out_dir, 'insights.json'), 'w', encoding='utf-8') as f:
+            json.dump(analyze_data.build_insights(aggregates), f, indent=2, ensure_ascii=False)
+    results['insights'] = stage(best_of(args.rounds, write_insights), 1, 'files')
+    return results
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Stages whose time grew by more than `threshold` relative to the baseline"""
+    regressions = []
+    changed = [k for k in COMPARABLE_PARAMS if baseline.get('params', {}).get(k) != results['params'].get(k)]
+    if changed:
+        print(f"\nNote: {', '.join(changed)} differ from the baseline run, timings may not be comparable")
+    print(f"\n{'stage':<18} {'baseline s':>11} {'current s':>10} {'change':>8}")
+    for name, current in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or not before['seconds']:
+            continue
+        change = current['seconds'] / before['seconds'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<18} {before['seconds']:>11.4f} {current['seconds']:>10.4f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraping, CSV writing and analysis stages")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="snapshot (CSV or raw .ndjson) the mock API replays")
+    parser.add_argument('--pages', type=int, default=None,
+                        help="mock catalogue size in pages (default: the snapshot's own, 213)")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--data', default=DEFAULT_CSV, help="snapshot analysed by the analysis stages")
+    parser.add_argument('--dpi', type=int, default=100, help="chart resolution for the chart stages")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--stages', default=','.join(STAGE_GROUPS),
+                        help=f"comma-separated subset of {', '.join(STAGE_GROUPS)}")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="earlier --json results to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+    groups = [g.strip() for g in args.stages.split(',') if g.strip()]
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': vars(args),
+        'stages': {},
+    }
+    products = load_catalogue(args.csv) if {'scrape', 'csv'} & set(groups) else []
+    with tempfile.TemporaryDirectory() as out_dir:
+        if 'scrape' in groups:
+            results['stages'].update(bench_scrape(products, args, out_dir))
+        if 'csv' in groups:
+            results['stages'].update(bench_csv(products, args, out_dir))
+        if 'analysis' in groups:
+            results['stages'].update(bench_analysis(args, out_dir))
+
+    print(f"{'stage':<18} {'seconds':>9} {'throughput':>20}")
+    for name, r in results['stages'].items():
+        print(f"{name:<18} {r['seconds']:>9.4f} {r['per_sec']:>13,.1f} {r['unit']}/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
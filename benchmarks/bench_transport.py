@@ -0,0 +1,107 @@
+"""Pages/sec and p50/p99 latency for the bare vs tuned aiohttp transport.
+
+Starts benchmarks.mock_api in-process and fetches the whole catalogue with
+each transport for a few rounds:
+
+    python -m benchmarks.bench_transport --latency 0.02 --rounds 3 --json transport.json
+
+"before" is the original setup (default ClientSession, stdlib json),
+"after" is transport.Transport with the default TransportConfig.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from typing import Dict
+
+import aiohttp
+
+from benchmarks.mock_api import DEFAULT_CSV, create_app, load_catalogue, start_server
+from concurrency import AdaptiveLimiter
+from metrics import percentile
+from scrape_products import PAGE_SIZE, fetch_page
+from transport import BASE_HEADERS, Transport, TransportConfig
+
+class BareTransport(Transport):
+    """The pre-tuning setup: default connector and timeouts, stdlib json decoding"""
+
+    def __init__(self, config: TransportConfig):
+        super().__init__(config)
+        self.loads = json.loads
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(headers=BASE_HEADERS)
+
+async def run_round(transport: Transport, pages: int, concurrency: int) -> Dict:
+    limiter = AdaptiveLimiter(initial=concurrency, max_limit=concurrency)
+    queue = list(range(pages, 0, -1))
+    latencies = []
+    failed = 0
+
+    # A fixed worker pool keeps queueing time out of the per-request latency
+    async def worker():
+        nonlocal failed
+        while queue:
+            page = queue.pop()
+            start = time.perf_counter()
+            if await fetch_page(transport, page, limiter) is None:
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'pages': pages,
+        'failed': failed,
+        'seconds': elapsed,
+        'pages_per_sec': pages / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+async def run_benchmark(args: argparse.Namespace) -> Dict:
+    products = load_catalogue(args.csv)
+    app = create_app(products, latency=args.latency, jitter=args.jitter)
+    runner, url = await start_server(app)
+    pages = -(-len(products) // PAGE_SIZE)
+    results = {}
+    try:
+        for name, transport_cls in (('before', BareTransport), ('after', Transport)):
+            rounds = []
+            for _ in range(args.rounds):
+                async with transport_cls(TransportConfig(api_url=url)) as transport:
+                    rounds.append(await run_round(transport, pages, args.concurrency))
+            # Report the median round by throughput
+            rounds.sort(key=lambda r: r['pages_per_sec'])
+            results[name] = rounds[len(rounds) // 2]
+    finally:
+        await runner.cleanup()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper transport against the local mock API")
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    print(f"{'transport':<10} {'pages/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['pages_per_sec']:>9.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['failed']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
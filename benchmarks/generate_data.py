@@ -0,0 +1,63 @@
+"""Scale a CSV snapshot up to a large synthetic one for analysis benchmarks.
+
+Rows cycle through the source snapshot; every copy after the first gets a
+new id and a price scaled by a random factor (priceOld and the min/max
+prices scale with it, so discounts stay consistent). Output is streamed,
+so 1M rows need no more memory than the source snapshot:
+
+    python -m benchmarks.generate_data --rows 1000000 -o synthetic_1m.csv
+    python analyze_data.py synthetic_1m.csv --charts all --force
+"""
+import argparse
+import csv
+import random
+import time
+from typing import Dict, Iterator, List
+
+from benchmarks.mock_api import DEFAULT_CSV, SYNTHETIC_ID_STRIDE
+
+DEFAULT_ROWS = 1_000_000
+PRICE_COLUMNS = ('price', 'priceOld', 'maxPrice', 'minPrice', 'maxPriceOld', 'minPriceOld')
+PRICE_SPREAD = 0.2  # Synthetic prices vary by up to ±20%
+
+def synthetic_rows(source: List[Dict[str, str]], rows: int, seed: int = 0) -> Iterator[Dict[str, str]]:
+    rng = random.Random(seed)
+    for index in range(rows):
+        cycle, offset = divmod(index, len(source))
+        row = source[offset]
+        if cycle:
+            row = dict(row)
+            row['id'] = str(int(float(row['id'])) + cycle * SYNTHETIC_ID_STRIDE)
+            factor = 1 + rng.uniform(-PRICE_SPREAD, PRICE_SPREAD)
+            for column in PRICE_COLUMNS:
+                if row.get(column):
+                    row[column] = f"{float(row[column]) * factor:.2f}"
+        yield row
+
+def generate(source_csv: str, output_csv: str, rows: int = DEFAULT_ROWS, seed: int = 0) -> int:
+    with open(source_csv, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        source = list(reader)
+
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(synthetic_rows(source, rows, seed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic product snapshot")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="source snapshot")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default=None, help="default: synthetic_<rows>.csv")
+    args = parser.parse_args()
+
+    output = args.output or f"synthetic_{args.rows}.csv"
+    start = time.perf_counter()
+    generate(args.csv, output, args.rows, args.seed)
+    print(f"✓ Wrote {args.rows:,} rows to {output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Local stand-in for the Premium Outlet products API.
+
+Replays products from a CSV snapshot or a recorded raw NDJSON snapshot
+(the items exactly as the API returned them), can stretch the catalogue to
+any number of pages, and can inject latency, random server errors and 429
+overload responses above a concurrency capacity:
+
+    python -m benchmarks.mock_api --latency 0.05 --error-rate 0.1 --capacity 20
+    python -m benchmarks.mock_api --csv premium_outlet_products_<ts>.ndjson --pages 50000
+    python -m benchmarks.mock_api --categories 4,5,6   # overlapping listings per filter_category
+    python -m benchmarks.mock_api --images ./fixtures   # also serve ./fixtures/* under /images/
+    python scrape_products.py --api-url http://127.0.0.1:8080/products
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+DEFAULT_CSV = "premium_outlet_products_20251130_224700.csv"
+ERROR_STATUSES = [500, 502, 503]
+SYNTHETIC_ID_STRIDE = 10_000_000  # Id offset per repetition when the catalogue is stretched
+
+INT_FIELDS = {'id', 'discount', 'discountId', 'variant_count', 'image_count'}
+FLOAT_FIELDS = {'price', 'priceOld', 'maxPrice', 'minPrice', 'maxPriceOld', 'minPriceOld'}
+BOOL_FIELDS = {'newIn', 'monoBrand', 'priceInStore', 'hasVariantPrice', 'beautyDiscount', 'sizeTable_show'}
+
+def _parse_value(key: str, value: str):
+    if value == '':
+        return None
+    if key in BOOL_FIELDS:
+        return value == 'True'
+    if key in INT_FIELDS:
+        return int(float(value))
+    if key in FLOAT_FIELDS:
+        return float(value)
+    return value
+
+def row_to_product(row: Dict[str, str]) -> Dict:
+    """Rebuild an API-shaped product from a flattened CSV row"""
+    values = {k: _parse_value(k, v) for k, v in row.items()}
+    product = {k: v for k, v in values.items()
+               if not k.startswith(('brand_', 'sizeTable_')) and k not in
+               ('available_sizes', 'variant_count', 'images', 'image_count')}
+    product['brand'] = {'title': values.get('brand_title'), 'route': values.get('brand_route')}
+    product['sizeTable'] = {'name': values.get('sizeTable_name'), 'title': values.get('sizeTable_title'),
+                            'show': values.get('sizeTable_show')}
+    product['variants'] = [{'siteSize': s} for s in (row.get('available_sizes') or '').split(', ') if s]
+    product['images'] = [{'source': s} for s in (row.get('images') or '').split(', ') if s]
+    return product
+
+def load_catalogue(csv_path: str = DEFAULT_CSV) -> List[Dict]:
+    """Products from a flattened CSV snapshot, or replayed verbatim from a raw .ndjson/.json one"""
+    if csv_path.endswith('.ndjson'):
+        with open(csv_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    if csv_path.endswith('.json'):
+        with open(csv_path, encoding='utf-8') as f:
+            return json.load(f)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [row_to_product(row) for row in csv.DictReader(f)]
+
+def catalogue_page(products: List[Dict], page: int, limit: int, total: int) -> List[Dict]:
+    """Items of one page of a catalogue of `total` items that cycles through `products`.
+
+    Items past the real catalogue are copies with a shifted id, built per
+    request so a 50k-page catalogue costs no extra memory.
+    """
+    items = []
+    for index in range(max(0, (page - 1) * limit), min(page * limit, total)):
+        cycle, offset = divmod(index, len(products))
+        product = products[offset]
+        if cycle:
+            product = {**product, 'id': (product.get('id') or 0) + cycle * SYNTHETIC_ID_STRIDE}
+        items.append(product)
+    return items
+
+def split_categories(products: List[Dict], categories: List[int], overlap: float = 0.1,
+                     seed: int = 0) -> Dict[int, List[Dict]]:
+    """Deal products round-robin into categories of different sizes; some also appear in the next one"""
+    rng = random.Random(seed)
+    listings = {category: [] for category in categories}
+    for index, product in enumerate(products):
+        # Weighted so listings differ in size, like real categories
+        slot = min(int(rng.random() ** 2 * len(categories)), len(categories) - 1)
+        listings[categories[slot]].append(product)
+        if len(categories) > 1 and rng.random() < overlap:
+            listings[categories[(slot + 1) % len(categories)]].append(product)
+    return listings
+
+def create_app(products: List[Dict], page_size: int = 30, latency: float = 0.0, jitter: float = 0.0,
+               error_rate: float = 0.0, capacity: Optional[int] = None, seed: Optional[int] = None,
+               advertise_total: bool = True, compress: bool = True,
+               total_items: Optional[int] = None,
+               categories: Optional[Dict[int, List[Dict]]] = None,
+               image_dir: Optional[str] = None,
+               faults: Optional[Dict[int, List]] = None) -> web.Application:
+    """Build the mock app; request counters are exposed on GET /stats.
+
+    total_items stretches (or truncates) the catalogue, see catalogue_page.
+    With categories, filter_category selects a listing (unknown ids are empty);
+    otherwise every category serves the whole catalogue. image_dir is
+    served as static files under /images/. faults scripts the first
+    answers to a page: an int is sent as that HTTP status, a str as a 200
+    response with that (possibly malformed) JSON body; once they are used
+    up the page is served normally. Every page answered with items is
+    appended to app['served'].
+    """
+    total = len(products) if total_items is None else total_items
+    rng = random.Random(seed)
+    stats = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0, 'in_flight': 0, 'peak_in_flight': 0}
+    pending_faults = {page: list(answers) for page, answers in (faults or {}).items()}
+    served = []
+
+    async def products_handler(request: web.Request) -> web.Response:
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+        try:
+            if capacity is not None and stats['in_flight'] > capacity:
+                stats['throttled'] += 1
+                return web.json_response({'ok': False, 'error': 'Too Many Requests'}, status=429,
+                                         headers={'Retry-After': '1'})
+            if latency or jitter:
+                await asyncio.sleep(latency + rng.uniform(0, jitter))
+            if error_rate and rng.random() < error_rate:
+                stats['errors'] += 1
+                return web.json_response({'ok': False}, status=rng.choice(ERROR_STATUSES))
+
+            body = await request.json()
+            page = int(body.get('page', 1))
+            limit = int(body.get('limit', page_size))
+            if pending_faults.get(page):
+                fault = pending_faults[page].pop(0)
+                if isinstance(fault, int):
+                    stats['errors'] += 1
+                    return web.json_response({'ok': False}, status=fault)
+                return web.Response(text=fault, content_type='application/json')
+            if categories is not None:
+                listing = categories.get(int(body.get('filter_category') or 0), [])
+                listing_total = len(listing)
+                items = listing[(page - 1) * limit:page * limit]
+            else:
+                listing_total = total
+                items = catalogue_page(products, page, limit, total)
+            stats['ok'] += 1
+            if items:
+                served.append(page)
+            data = {'items': items}
+            if advertise_total:
+                data['total'] = listing_total
+            response = web.json_response({'ok': True, 'data': data})
+            if compress:
+                # Negotiated from the client's Accept-Encoding, like a real reverse proxy
+                response.enable_compression()
+            return response
+        finally:
+            stats['in_flight'] -= 1
+
+    async def stats_handler(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app['stats'] = stats
+    app['served'] = served
+    app.router.add_post('/products', products_handler)
+    app.router.add_get('/stats', stats_handler)
+    if image_dir:
+        app.router.add_static('/images/', image_dir)
+    return app
+
+async def start_server(app: web.Application, host: str = '127.0.0.1', port: int = 0):
+    """Run the app in the current event loop; returns (runner, products_url). Call runner.cleanup() to stop"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}/products"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Premium Outlet products API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="CSV or raw .ndjson snapshot to replay")
+    parser.add_argument('--pages', type=int, default=None,
+                        help="catalogue size in pages of 30 (default: the snapshot's own size)")
+    parser.add_argument('--latency', type=float, default=0.0, help="base response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument('--capacity', type=int, default=None, help="answer 429 above this many concurrent requests")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--images', default=None, help="directory served as static files under /images/")
+    parser.add_argument('--categories', default=None,
+                        help="comma-separated category ids to split the catalogue into (with some overlap)")
+    parser.add_argument('--hide-total', action='store_true',
+                        help="omit the item total so clients have to probe for the last page")
+    args = parser.parse_args()
+
+    products = load_catalogue(args.csv)
+    categories = None
+    if args.categories:
+        categories = split_categories(products, [int(c) for c in args.categories.split(',')])
+        for category, listing in categories.items():
+            print(f"Category {category}: {len(listing)} products")
+    app = create_app(products, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, capacity=args.capacity, seed=args.seed,
+                     advertise_total=not args.hide_total,
+                     total_items=args.pages * 30 if args.pages else None, categories=categories,
+                     image_dir=args.images)
+    web.run_app(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
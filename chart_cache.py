@@ -0,0 +1,91 @@
+"""Content-addressed cache for rendered charts and insights.json.
+
+Each artifact is stored under a key derived from the data it reads and
+the parameters and code that render it. analyze_data.py skips artifacts
+whose key has not changed, restores earlier versions from the cache
+instead of re-rendering them, and evicts the least recently used entries
+that no output points at once the cache grows past its size limit.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List
+
+DEFAULT_CACHE_DIR = os.path.join('charts', '.cache')
+DEFAULT_MAX_BYTES = 200 * 1024 ** 2
+
+def fingerprint(*parts) -> str:
+    """sha256 over a sequence of str/bytes parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ArtifactCache:
+    """Key -> file store with a JSON manifest of blobs and of which key each output holds"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(cache_dir, 'manifest.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {'blobs': {}, 'outputs': {}}
+
+    def _blob_path(self, key: str, output_path: str) -> str:
+        return os.path.join(self.cache_dir, key + os.path.splitext(output_path)[1])
+
+    def is_current(self, output_path: str, key: str) -> bool:
+        """True if output_path already holds the artifact for this key"""
+        return self.manifest['outputs'].get(output_path) == key and os.path.exists(output_path)
+
+    def restore(self, output_path: str, key: str) -> bool:
+        """Copy a cached artifact to output_path; False if the key is not cached"""
+        blob = self._blob_path(key, output_path)
+        if key not in self.manifest['blobs'] or not os.path.exists(blob):
+            return False
+        shutil.copyfile(blob, output_path)
+        self._record(output_path, key)
+        return True
+
+    def store(self, output_path: str, key: str):
+        """Add a freshly written artifact to the cache"""
+        blob = self._blob_path(key, output_path)
+        shutil.copyfile(output_path, blob)
+        self.manifest['blobs'][key] = {'file': os.path.basename(blob), 'size': os.path.getsize(blob)}
+        self._record(output_path, key)
+
+    def _record(self, output_path: str, key: str):
+        self.manifest['blobs'][key]['last_used'] = time.time()
+        self.manifest['outputs'][output_path] = key
+
+    def evict(self) -> List[str]:
+        """Drop least recently used blobs not held by any output until under max_bytes"""
+        blobs: Dict[str, dict] = self.manifest['blobs']
+        live = set(self.manifest['outputs'].values())
+        total = sum(b['size'] for b in blobs.values())
+        evicted = []
+        for key in sorted(blobs, key=lambda k: blobs[k].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if key in live:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, blobs[key]['file']))
+            except OSError:
+                pass
+            total -= blobs.pop(key)['size']
+            evicted.append(key)
+        return evicted
+
+    def save(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
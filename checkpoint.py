@@ -0,0 +1,131 @@
+"""Durable page log for resumable scrapes.
+
+Every page is committed to SQLite as soon as it arrives, together with
+each job's last page once it is known. A killed or partly failed run
+can be resumed (scrape_products.py --resume): only pages missing from
+the log are fetched, and the snapshot files are rebuilt from the log.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_CHECKPOINT = "scrape_checkpoint.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS run (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    category INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    sort TEXT NOT NULL,
+    end_page INTEGER
+);
+CREATE TABLE IF NOT EXISTS pages (
+    job TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    item_count INTEGER NOT NULL,
+    items TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (job, page)
+) WITHOUT ROWID;
+"""
+
+JobSpec = Tuple[str, int, str, str]  # name, category, lang, sort
+
+class CrawlCheckpoint:
+    """SQLite log of the pages a scrape has completed, keyed by (job name, page)"""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL commits survive the process being killed without an fsync per page
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "CrawlCheckpoint":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def discard(self):
+        """Close and delete the checkpoint once its snapshot is complete"""
+        self.close()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def start(self, timestamp: str, jobs: List[JobSpec], options: Dict):
+        """Begin a new run, dropping anything logged before"""
+        with self.conn:
+            self.conn.execute("DELETE FROM run")
+            self.conn.execute("DELETE FROM jobs")
+            self.conn.execute("DELETE FROM pages")
+            self.conn.executemany("INSERT INTO run (key, value) VALUES (?, ?)", [
+                ('timestamp', timestamp),
+                ('started_at', datetime.now().isoformat(timespec='seconds')),
+                ('options', json.dumps(options)),
+            ])
+            self.conn.executemany("INSERT INTO jobs (name, position, category, lang, sort) VALUES (?, ?, ?, ?, ?)",
+                                  [(name, position, category, lang, sort)
+                                   for position, (name, category, lang, sort) in enumerate(jobs)])
+
+    def _run_value(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM run WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def started(self) -> bool:
+        return self._run_value('timestamp') is not None
+
+    @property
+    def timestamp(self) -> Optional[str]:
+        return self._run_value('timestamp')
+
+    @property
+    def options(self) -> Dict:
+        return json.loads(self._run_value('options') or '{}')
+
+    def jobs(self) -> List[JobSpec]:
+        return self.conn.execute("SELECT name, category, lang, sort FROM jobs ORDER BY position").fetchall()
+
+    def set_end(self, job: str, end_page: int):
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET end_page = ? WHERE name = ?", (end_page, job))
+
+    def record_page(self, job: str, page: int, items: List[Dict]):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                              (job, page, len(items), json.dumps(items, ensure_ascii=False),
+                               datetime.now().isoformat(timespec='seconds')))
+
+    def progress(self, job: str) -> Tuple[Set[int], Optional[int], int]:
+        """(completed pages, last page if known, items logged) for one job"""
+        pages = {page for (page,) in self.conn.execute("SELECT page FROM pages WHERE job = ?", (job,))}
+        row = self.conn.execute("SELECT end_page FROM jobs WHERE name = ?", (job,)).fetchone()
+        items = self.conn.execute("SELECT COALESCE(SUM(item_count), 0) FROM pages WHERE job = ?",
+                                  (job,)).fetchone()[0]
+        return pages, row[0] if row else None, items
+
+    def page_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def iter_pages(self, job: str) -> Iterator[Tuple[int, List[Dict]]]:
+        """Logged pages of one job in page order, pages past its last page excluded"""
+        row = self.conn.execute("SELECT end_page FROM jobs WHERE name = ?", (job,)).fetchone()
+        end_page = row[0] if row and row[0] is not None else None
+        query = "SELECT page, items FROM pages WHERE job = ?" + (" AND page <= ?" if end_page else "") + " ORDER BY page"
+        params = (job, end_page) if end_page else (job,)
+        for page, items in self.conn.execute(query, params):
+            yield page, json.loads(items)
@@ -0,0 +1,229 @@
+"""Typed columnar (Parquet) snapshots of the product catalogue.
+
+Columns match the CSV header, but prices are floats, flags are bools,
+counts are ints and sizes/images are list<string> columns instead of
+comma-joined text. Convert existing CSV snapshots with:
+
+    python columnar.py premium_outlet_products_*.csv
+"""
+import csv
+import sys
+from typing import Dict, Iterable, List, Optional
+
+# Optional and slow to import (most of the scraper's startup), so loaded by
+# require_pyarrow() only when Parquet is actually read or written
+pa = None
+pq = None
+
+ROW_GROUP_SIZE = 10_000  # Rows buffered before a Parquet row group is written
+
+FLOAT_COLUMNS = ('price', 'priceOld', 'maxPrice', 'minPrice', 'maxPriceOld', 'minPriceOld', 'beautyDiscount')
+INT_COLUMNS = ('id', 'discountId')
+SMALL_INT_COLUMNS = ('discount', 'variant_count', 'image_count')
+BOOL_COLUMNS = ('newIn', 'monoBrand', 'priceInStore', 'hasVariantPrice', 'sizeTable_show')
+LIST_COLUMNS = ('available_sizes', 'images')
+STRING_COLUMNS = ('title', 'route', 'brandName', 'brand_title', 'brand_route', 'season', 'colection', 'line',
+                  'item', 'model', 'article', 'warehouse', 'image', 'mannequins', 'outfit',
+                  'sizeTable_name', 'sizeTable_title')
+
+COLUMN_NAMES = sorted(FLOAT_COLUMNS + INT_COLUMNS + SMALL_INT_COLUMNS + BOOL_COLUMNS + LIST_COLUMNS + STRING_COLUMNS)
+
+# Normalised variant table: one row per product variant. Prices fall back to the
+# product's own when the variant has none (hasVariantPrice false); variant
+# fields the API does not send are stored as missing
+VARIANT_COLUMNS = ('product_row', 'product_id', 'variant_id', 'size', 'price', 'priceOld', 'quantity')
+VARIANT_FIELDS = {'variant_id': 'id', 'size': 'siteSize', 'price': 'price', 'priceOld': 'priceOld',
+                  'quantity': 'quantity'}
+
+# Columns filled by a plain product.get(name); the rest come from nested objects
+NESTED_COLUMNS = ('brand_title', 'brand_route', 'sizeTable_name', 'sizeTable_title', 'sizeTable_show',
+                  'available_sizes', 'variant_count', 'images', 'image_count')
+DIRECT_COLUMNS = tuple(c for c in COLUMN_NAMES if c not in NESTED_COLUMNS)
+
+def page_columns(products: List[Dict]) -> Dict[str, list]:
+    """Turn a page of raw API products into column lists in a single pass.
+
+    Values are left as the API sent them; available_sizes and images are
+    lists of strings. Column order is COLUMN_NAMES, the CSV header order.
+    """
+    columns = {name: [] for name in COLUMN_NAMES}
+    direct = [(columns[name].append, name) for name in DIRECT_COLUMNS]
+    brand_title = columns['brand_title'].append
+    brand_route = columns['brand_route'].append
+    size_name = columns['sizeTable_name'].append
+    size_title = columns['sizeTable_title'].append
+    size_show = columns['sizeTable_show'].append
+    sizes = columns['available_sizes'].append
+    variant_count = columns['variant_count'].append
+    image_sources = columns['images'].append
+    image_count = columns['image_count'].append
+
+    for product in products:
+        get = product.get
+        for append, name in direct:
+            append(get(name))
+        brand = get('brand') or {}
+        brand_title(brand.get('title'))
+        brand_route(brand.get('route'))
+        size_table = get('sizeTable') or {}
+        size_name(size_table.get('name'))
+        size_title(size_table.get('title'))
+        size_show(size_table.get('show'))
+        variants = get('variants') or []
+        sizes([v.get('siteSize', '') for v in variants])
+        variant_count(len(variants))
+        images = get('images') or []
+        image_sources([img.get('source', '') for img in images])
+        image_count(len(images))
+
+    return columns
+
+def page_variant_columns(products: List[Dict]) -> Dict[str, list]:
+    """One row per variant of a page of raw API products, product_row indexing the page"""
+    columns = {name: [] for name in VARIANT_COLUMNS}
+    rows, ids, variant_ids = columns['product_row'].append, columns['product_id'].append, columns['variant_id'].append
+    sizes, prices, old_prices = columns['size'].append, columns['price'].append, columns['priceOld'].append
+    quantities = columns['quantity'].append
+    for row, product in enumerate(products):
+        variants = product.get('variants')
+        if not variants:
+            continue
+        product_id, price, price_old = product.get('id'), product.get('price'), product.get('priceOld')
+        for variant in variants:
+            get = variant.get
+            rows(row)
+            ids(product_id)
+            variant_ids(get('id'))
+            sizes(get('siteSize'))
+            prices(get('price', price))
+            old_prices(get('priceOld', price_old))
+            quantities(get('quantity'))
+    return columns
+
+def rows_variant_columns(rows: List[Dict[str, str]]) -> Dict[str, list]:
+    """The variant table recoverable from flattened CSV rows: sizes at the product's prices"""
+    columns = {name: [] for name in VARIANT_COLUMNS}
+    for row_number, row in enumerate(rows):
+        for size in (row.get('available_sizes') or '').split(', '):
+            if size:
+                columns['product_row'].append(row_number)
+                columns['product_id'].append(row.get('id'))
+                columns['variant_id'].append(None)
+                columns['size'].append(size)
+                columns['price'].append(row.get('price'))
+                columns['priceOld'].append(row.get('priceOld'))
+                columns['quantity'].append(None)
+    return columns
+
+def flatten_page(products: List[Dict]) -> Dict[str, list]:
+    """page_columns with the list columns comma-joined, i.e. CSV-ready columns"""
+    columns = page_columns(products)
+    columns['available_sizes'] = [', '.join(sizes) for sizes in columns['available_sizes']]
+    columns['images'] = [', '.join(images) for images in columns['images']]
+    return columns
+
+def require_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        pa, pq = pyarrow, pyarrow.parquet
+
+def product_schema() -> "pa.Schema":
+    """Arrow schema for a product snapshot, columns in CSV header order"""
+    require_pyarrow()
+    types = {}
+    types.update({c: pa.float64() for c in FLOAT_COLUMNS})
+    types.update({c: pa.int64() for c in INT_COLUMNS})
+    types.update({c: pa.int32() for c in SMALL_INT_COLUMNS})
+    types.update({c: pa.bool_() for c in BOOL_COLUMNS})
+    types.update({c: pa.list_(pa.string()) for c in LIST_COLUMNS})
+    types.update({c: pa.string() for c in STRING_COLUMNS})
+    return pa.schema([(name, types[name]) for name in COLUMN_NAMES])
+
+def _to_float(value) -> Optional[float]:
+    return float(value) if value not in (None, '') else None
+
+def _to_int(value) -> Optional[int]:
+    return int(float(value)) if value not in (None, '') else None
+
+def _to_bool(value) -> Optional[bool]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        return value == 'True'
+    return bool(value)
+
+def _to_str(value) -> Optional[str]:
+    return str(value) if value not in (None, '') else None
+
+CONVERTERS = {}
+CONVERTERS.update({c: _to_float for c in FLOAT_COLUMNS})
+CONVERTERS.update({c: _to_int for c in INT_COLUMNS + SMALL_INT_COLUMNS})
+CONVERTERS.update({c: _to_bool for c in BOOL_COLUMNS})
+CONVERTERS.update({c: _to_str for c in STRING_COLUMNS})
+CONVERTERS.update({'product_row': _to_int, 'product_id': _to_int, 'variant_id': _to_int, 'size': _to_str,
+                   'quantity': _to_int})
+
+def products_to_table(products: List[Dict]) -> "pa.Table":
+    """Build a typed table straight from raw API products"""
+    schema = product_schema()
+    columns = page_columns(products)
+    for name in COLUMN_NAMES:
+        if name not in LIST_COLUMNS:
+            convert = CONVERTERS[name]
+            columns[name] = [convert(value) for value in columns[name]]
+    return pa.table(columns, schema=schema)
+
+def rows_to_table(rows: Iterable[Dict[str, str]]) -> "pa.Table":
+    """Build a typed table from flattened CSV rows (comma-joined lists are split back)"""
+    schema = product_schema()
+    columns = {name: [] for name in schema.names}
+    for row in rows:
+        for name in schema.names:
+            value = row.get(name)
+            if name in LIST_COLUMNS:
+                columns[name].append([v for v in (value or '').split(', ') if v])
+            else:
+                columns[name].append(CONVERTERS[name](value))
+    return pa.table(columns, schema=schema)
+
+class ParquetSnapshotWriter:
+    """Buffer pages of products and write them as Parquet row groups"""
+
+    def __init__(self, filename: str, row_group_size: int = ROW_GROUP_SIZE):
+        require_pyarrow()
+        self.filename = filename
+        self.row_group_size = row_group_size
+        self._buffer: List[Dict] = []
+        self._writer = pq.ParquetWriter(filename, product_schema(), compression='zstd')
+
+    def write_page(self, products: List[Dict]):
+        self._buffer.extend(products)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._writer.write_table(products_to_table(self._buffer))
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+def csv_to_parquet(csv_filename: str, parquet_filename: Optional[str] = None) -> str:
+    """Convert a CSV snapshot to Parquet next to it; returns the new filename"""
+    require_pyarrow()
+    parquet_filename = parquet_filename or csv_filename.rsplit('.', 1)[0] + '.parquet'
+    with open(csv_filename, newline='', encoding='utf-8') as f:
+        table = rows_to_table(csv.DictReader(f))
+    pq.write_table(table, parquet_filename, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    return parquet_filename
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(f"✓ {path} -> {csv_to_parquet(path)}")
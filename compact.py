@@ -0,0 +1,474 @@
+"""Compact, memory-mappable product snapshots.
+
+A store is a directory of .snap files plus the string dictionaries they
+share. Brand names, routes, sizes and image filenames are written once to
+strings/<dictionary>.jsonl (append-only, one JSON string per line) and
+every snapshot stores them as integer codes. Numbers are fixed-width
+little-endian columns: float64 prices with NaN for missing, int64/int32
+ids and counts, int8 flags. A .snap file is
+
+    MAGIC | uint32 header length | JSON header | 8-byte aligned column blocks
+
+so opening one reads only the header and maps the rest: column() returns a
+numpy view into the file, and a year of hourly snapshots costs one mmap
+each rather than a parse. Optionally each snapshot also gets a normalised
+variant table (<stem>.variants.snap: product row and id, size, price, old
+price and stock per variant) in the same format. Convert existing
+snapshots into a store with:
+
+    python compact.py premium_outlet_products_*.csv --store snapshots
+    python compact.py premium_outlet_products_*.ndjson --store snapshots --variants
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import (BOOL_COLUMNS, COLUMN_NAMES, CONVERTERS, FLOAT_COLUMNS, INT_COLUMNS, LIST_COLUMNS,
+                      SMALL_INT_COLUMNS, page_columns, page_variant_columns, rows_variant_columns)
+
+MAGIC = b'POSNAP1\n'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+DEFAULT_STORE = "snapshots"
+SNAPSHOT_EXTENSION = '.snap'
+VARIANTS_SUFFIX = '.variants'  # premium_outlet_products_<time>.variants.snap next to the product table
+STRINGS_DIR = "strings"
+
+# Columns whose values overlap share one dictionary; the rest get their own
+SHARED_DICTIONARIES = {
+    'image': 'images', 'images': 'images', 'mannequins': 'images', 'outfit': 'images',
+    'brandName': 'brands', 'brand_title': 'brands',
+    'size': 'available_sizes',
+}
+
+# Missing values in the integer columns; the reader turns them into NaN
+NULL_INT64 = np.iinfo(np.int64).min
+NULL_INT32 = np.iinfo(np.int32).min
+NULL_BOOL = -1
+
+def dictionary_name(column: str) -> str:
+    return SHARED_DICTIONARIES.get(column, column)
+
+def column_kind(column: str) -> str:
+    if column in FLOAT_COLUMNS:
+        return 'float'
+    if column in INT_COLUMNS:
+        return 'int'
+    if column in SMALL_INT_COLUMNS:
+        return 'small_int'
+    if column in BOOL_COLUMNS:
+        return 'bool'
+    if column in LIST_COLUMNS:
+        return 'list'
+    return 'string'
+
+PRODUCT_KINDS = {name: column_kind(name) for name in COLUMN_NAMES}
+VARIANT_KINDS = {'product_row': 'small_int', 'product_id': 'int', 'variant_id': 'int', 'size': 'string',
+                 'price': 'float', 'priceOld': 'float', 'quantity': 'small_int'}
+
+def variants_path(path: str) -> str:
+    """The variant table stored alongside a product .snap file"""
+    return path[:-len(SNAPSHOT_EXTENSION)] + VARIANTS_SUFFIX + SNAPSHOT_EXTENSION
+
+class StringTable:
+    """Append-only dictionary: code 0 is missing, codes 1.. index the file's lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[Optional[str]] = [None]
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.values.extend(json.loads(line) for line in f if line.strip())
+        self._saved = len(self.values)
+        self._codes: Optional[Dict[str, int]] = None
+        self._decoded: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, values: Iterable[Optional[str]]) -> List[int]:
+        if self._codes is None:
+            self._codes = {value: code for code, value in enumerate(self.values) if code}
+        codes = self._codes
+        out = []
+        for value in values:
+            if value is None:
+                out.append(0)
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            out.append(code)
+        return out
+
+    def flush(self):
+        """Append codes handed out since the last flush, before any snapshot refers to them"""
+        if len(self.values) == self._saved:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path) and _line_count(self.path) != self._saved - 1:
+            raise RuntimeError(f"{self.path} was changed by another writer; one writer per store at a time")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(value, ensure_ascii=False) + '\n' for value in self.values[self._saved:])
+        self._saved = len(self.values)
+        self._decoded = None
+
+    def decoded(self) -> np.ndarray:
+        """Object array indexed by code, for vectorised decoding"""
+        if self._decoded is None or len(self._decoded) != len(self.values):
+            self._decoded = np.array(self.values, dtype=object)
+        return self._decoded
+
+def _line_count(path: str) -> int:
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+
+class CompactStore:
+    """A directory of .snap files and the string dictionaries they share.
+
+    With variants=True, writers also store each snapshot's variant table.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE, variants: bool = False):
+        self.root = root
+        self.variants = variants
+        self._tables: Dict[str, StringTable] = {}
+
+    def table(self, name: str) -> StringTable:
+        if name not in self._tables:
+            self._tables[name] = StringTable(os.path.join(self.root, STRINGS_DIR, f"{name}.jsonl"))
+        return self._tables[name]
+
+    def flush(self):
+        for table in self._tables.values():
+            table.flush()
+
+    def path(self, stem: str) -> str:
+        return os.path.join(self.root, os.path.basename(stem) + SNAPSHOT_EXTENSION)
+
+    def paths(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.path.join(self.root, name) for name in os.listdir(self.root)
+                      if name.endswith(SNAPSHOT_EXTENSION) and not name.endswith(VARIANTS_SUFFIX + SNAPSHOT_EXTENSION))
+
+    def writer(self, stem: str) -> "CompactSnapshotWriter":
+        return CompactSnapshotWriter(self.path(stem), self)
+
+    def open(self, path: str) -> "CompactSnapshot":
+        return CompactSnapshot(path, self)
+
+    def snapshots(self) -> Iterator["CompactSnapshot"]:
+        """Every snapshot in filename (i.e. time) order; each is only mapped, not read"""
+        for path in self.paths():
+            yield self.open(path)
+
+class TableBuffer:
+    """Typed columns of one table, buffered in memory until written as a .snap file"""
+
+    def __init__(self, kinds: Dict[str, str], store: CompactStore, table: str):
+        self.kinds = kinds
+        self.store = store
+        self.table = table
+        self.rows = 0
+        self._columns: Dict[str, list] = {name: [] for name, kind in kinds.items() if kind != 'list'}
+        self._lists: Dict[str, Tuple[List[int], List[int]]] = {name: ([0], []) for name, kind in kinds.items()
+                                                               if kind == 'list'}
+
+    def append(self, columns: Dict[str, list]):
+        """Raw or CSV-text values per column, lists of strings for the list columns"""
+        for name, out in self._columns.items():
+            convert = CONVERTERS[name]
+            values = [convert(value) for value in columns[name]]
+            if self.kinds[name] == 'string':
+                values = self.store.table(dictionary_name(name)).encode(values)
+            out.extend(values)
+        for name, (offsets, codes) in self._lists.items():
+            table = self.store.table(dictionary_name(name))
+            for values in columns[name]:
+                codes.extend(table.encode(v for v in values if v))
+                offsets.append(len(codes))
+        self.rows += len(next(iter(columns.values()), []))
+
+    def _arrays(self) -> Iterator[Tuple[str, dict, List[np.ndarray]]]:
+        for name, kind in self.kinds.items():
+            info = {'kind': kind}
+            if kind in ('list', 'string'):
+                info['dictionary'] = dictionary_name(name)
+                info['dictionary_size'] = len(self.store.table(info['dictionary']))
+            if kind == 'list':
+                offsets, codes = self._lists[name]
+                yield name, info, [np.array(offsets, dtype='<u4'), np.array(codes, dtype=_code_dtype(codes))]
+                continue
+            values = self._columns[name]
+            if kind == 'string':
+                array = np.array(values, dtype=_code_dtype(values))
+            elif kind == 'float':
+                array = np.array([np.nan if v is None else v for v in values], dtype='<f8')
+            elif kind == 'bool':
+                array = np.array([NULL_BOOL if v is None else v for v in values], dtype='i1')
+            else:
+                dtype, null = ('<i8', NULL_INT64) if kind == 'int' else ('<i4', NULL_INT32)
+                array = np.array([null if v is None else v for v in values], dtype=dtype)
+            info['nulls'] = sum(value is None for value in values)
+            yield name, info, [array]
+
+    def write(self, filename: str):
+        """Write the .snap file atomically; the store's dictionaries must already be flushed"""
+        columns = {}
+        blocks = []
+        offset = 0
+        for name, info, arrays in self._arrays():
+            parts = []
+            for array in arrays:
+                parts.append({'dtype': array.dtype.str, 'offset': offset, 'count': len(array)})
+                blocks.append((offset, array))
+                offset += _aligned(array.nbytes)
+            info['blocks'] = parts
+            columns[name] = info
+        header = json.dumps({'version': FORMAT_VERSION, 'table': self.table, 'rows': self.rows,
+                             'columns': columns}).encode()
+        data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        tmp = filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for block_offset, array in blocks:
+                f.seek(data_start + block_offset)
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp, filename)
+
+class CompactSnapshotWriter:
+    """Buffer pages of products (and optionally their variants) and write the .snap files on close"""
+
+    def __init__(self, filename: str, store: Optional[CompactStore] = None, variants: Optional[bool] = None):
+        self.filename = filename
+        self.store = store or CompactStore(os.path.dirname(filename) or '.')
+        self._products = TableBuffer(PRODUCT_KINDS, self.store, 'products')
+        with_variants = self.store.variants if variants is None else variants
+        self._variants = TableBuffer(VARIANT_KINDS, self.store, 'variants') if with_variants else None
+
+    @property
+    def rows(self) -> int:
+        return self._products.rows
+
+    @property
+    def variants_filename(self) -> Optional[str]:
+        return variants_path(self.filename) if self._variants is not None else None
+
+    def write_page(self, products: List[Dict]):
+        if self._variants is not None:
+            self._append_variants(page_variant_columns(products))
+        self._products.append(page_columns(products))
+
+    def write_rows(self, rows: List[Dict[str, str]]):
+        """Flattened CSV rows; comma-joined lists are split back"""
+        if self._variants is not None:
+            self._append_variants(rows_variant_columns(rows))
+        columns = {name: [] for name in COLUMN_NAMES}
+        for row in rows:
+            for name in COLUMN_NAMES:
+                value = row.get(name)
+                if name in LIST_COLUMNS:
+                    columns[name].append([v for v in (value or '').split(', ') if v])
+                else:
+                    columns[name].append(value)
+        self._products.append(columns)
+
+    def _append_variants(self, columns: Dict[str, list]):
+        # product_row counts from the start of the page; make it a row of the whole snapshot
+        first = self._products.rows
+        columns['product_row'] = [first + row for row in columns['product_row']]
+        self._variants.append(columns)
+
+    def close(self):
+        # Dictionaries first: a snapshot must never refer to codes that are not on disk
+        self.store.flush()
+        if self._variants is not None:
+            self._variants.write(self.variants_filename)
+        self._products.write(self.filename)
+
+def _code_dtype(codes: list) -> str:
+    return '<u2' if max(codes, default=0) < 1 << 16 else '<u4'
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+class CompactSnapshot:
+    """A mapped .snap file; columns are zero-copy numpy views into it"""
+
+    def __init__(self, path: str, store: Optional[CompactStore] = None):
+        self.path = path
+        self.store = store or CompactStore(os.path.dirname(path) or '.')
+        with open(path, 'rb') as f:
+            # The mapping outlives the file object; it is released once no view refers to it
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compact snapshot")
+        (header_size,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._map[start:start + header_size])
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {header['version']}, expected {FORMAT_VERSION}")
+        self.table: str = header.get('table', 'products')
+        self.rows: int = header['rows']
+        self.columns: Dict[str, dict] = header['columns']
+        self._data_start = _aligned(start + header_size)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _block(self, name: str, index: int = 0) -> np.ndarray:
+        block = self.columns[name]['blocks'][index]
+        return np.frombuffer(self._map, dtype=block['dtype'], count=block['count'],
+                             offset=self._data_start + block['offset'])
+
+    def _table(self, name: str) -> StringTable:
+        info = self.columns[name]
+        table = self.store.table(info['dictionary'])
+        if len(table) < info['dictionary_size']:
+            raise ValueError(f"{self.path} needs {info['dictionary_size']} {info['dictionary']} strings, "
+                             f"{table.path} has {len(table)}")
+        return table
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw stored values: numbers with their null sentinels, or dictionary codes"""
+        if self.columns[name]['kind'] == 'list':
+            raise ValueError(f"{name} is a list column; use list_column()")
+        return self._block(name)
+
+    def list_column(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(offsets, codes): row i holds codes[offsets[i]:offsets[i + 1]]"""
+        return self._block(name, 0), self._block(name, 1)
+
+    def values(self, name: str) -> np.ndarray:
+        """Decoded values: floats with NaN for missing ints, bools, or strings (None when missing)"""
+        info = self.columns[name]
+        kind = info['kind']
+        if kind == 'list':
+            offsets, codes = self.list_column(name)
+            strings = self._table(name).decoded()[codes]
+            return np.array([list(strings[a:b]) for a, b in zip(offsets[:-1], offsets[1:])], dtype=object)
+        data = self.column(name)
+        if kind == 'string':
+            return self._table(name).decoded()[data]
+        if kind == 'float' or not info['nulls']:
+            return data.astype(bool) if kind == 'bool' else data
+        if kind == 'bool':
+            return np.where(data == NULL_BOOL, None, data.astype(bool)).astype(object)
+        return np.where(data == (NULL_INT64 if kind == 'int' else NULL_INT32), np.nan, data)
+
+    def categorical(self, name: str):
+        """String column as a pandas Categorical with sorted, used-only categories (like read_csv)"""
+        import pandas as pd
+        codes = self.column(name)
+        used, inverse = np.unique(codes, return_inverse=True)
+        strings = self._table(name).decoded()[used]
+        present = used != 0
+        order = np.argsort(strings[present].astype(str), kind='stable')
+        remap = np.full(len(used), -1, dtype=np.int32)
+        remap[np.flatnonzero(present)[order]] = np.arange(len(order), dtype=np.int32)
+        return pd.Categorical.from_codes(remap[inverse], categories=strings[present][order])
+
+    def to_frame(self, columns: Optional[List[str]] = None, categorical: bool = True):
+        """DataFrame of the named columns; string columns become categoricals unless categorical=False"""
+        import pandas as pd
+        data = {}
+        for name in columns or list(self.columns):
+            if name not in self.columns:
+                raise KeyError(f"{self.path} has no column {name}")
+            if categorical and self.columns[name]['kind'] == 'string':
+                data[name] = self.categorical(name)
+            elif self.columns[name]['kind'] == 'list':
+                data[name] = [', '.join(values) for values in self.values(name)]
+            else:
+                data[name] = self.values(name)
+        return pd.DataFrame(data, copy=False)
+
+    def iter_rows(self, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Plain dicts with None for missing values, e.g. for history ingestion"""
+        names = columns or list(self.columns)
+        decoded = []
+        for name in names:
+            values = self.values(name)
+            if values.dtype.kind == 'f':
+                values = np.where(np.isnan(values), None, values).astype(object)
+            decoded.append(values.tolist())
+        for row in zip(*decoded):
+            yield dict(zip(names, row))
+
+def read_frame(path: str, columns: Optional[List[str]] = None):
+    """pd.read_csv stand-in for a .snap file"""
+    return CompactSnapshot(path).to_frame(columns)
+
+def read_variants(path: str, columns: Optional[List[str]] = None):
+    """The variant table stored with a product .snap file, or None when it was written without one"""
+    path = variants_path(path)
+    return CompactSnapshot(path).to_frame(columns) if os.path.exists(path) else None
+
+def convert(path: str, store: CompactStore) -> Tuple[str, int]:
+    """Write a CSV, NDJSON or JSON snapshot into the store; returns (.snap path, rows)"""
+    stem, ext = os.path.splitext(path)
+    writer = store.writer(stem)
+    if ext == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) >= 10_000:
+                    writer.write_rows(batch)
+                    batch = []
+            writer.write_rows(batch)
+    elif ext == '.ndjson':
+        with open(path, encoding='utf-8') as f:
+            batch = []
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= 10_000:
+                    writer.write_page(batch)
+                    batch = []
+            writer.write_page(batch)
+    elif ext == '.json':
+        with open(path, encoding='utf-8') as f:
+            writer.write_page(json.load(f))
+    else:
+        raise ValueError(f"Cannot convert {path}: expected .csv, .ndjson or .json")
+    writer.close()
+    return writer.filename, writer.rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert snapshots into a compact, memory-mappable store")
+    parser.add_argument('files', nargs='+', help="CSV, NDJSON or JSON snapshots")
+    parser.add_argument('--store', default=DEFAULT_STORE, help=f"store directory (default: {DEFAULT_STORE})")
+    parser.add_argument('--variants', action='store_true',
+                        help="also write the variant table (CSV snapshots only have sizes to offer)")
+    args = parser.parse_args()
+
+    store = CompactStore(args.store, variants=args.variants)
+    for path in args.files:
+        try:
+            snap, rows = convert(path, store)
+        except (OSError, ValueError) as e:
+            print(f"✗ {path}: {e}", file=sys.stderr)
+            continue
+        print(f"✓ {path} -> {snap} ({rows:,} rows, {os.path.getsize(path) / 1024 ** 2:.1f} MB -> "
+              f"{os.path.getsize(snap) / 1024 ** 2:.1f} MB)")
+        if args.variants:
+            print(f"  + {variants_path(snap)} ({os.path.getsize(variants_path(snap)) / 1024 ** 2:.2f} MB)")
+
+if __name__ == "__main__":
+    main()
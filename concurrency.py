@@ -0,0 +1,93 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for outgoing requests.
+
+    The limit grows by one after a full window of healthy responses and is
+    cut multiplicatively on overload signals (429/5xx, timeouts or latency
+    above the target). Only one cut is applied per window, so a burst of
+    failures from requests that were already in flight halves the limit once.
+    """
+
+    def __init__(self, initial: int = 10, min_limit: int = 1, max_limit: int = 64,
+                 latency_target: float = 2.0, decrease_factor: float = 0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.peak_limit = initial
+        self.increases = 0
+        self.decreases = 0
+        self._healthy = 0
+        self._epoch = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> int:
+        """Wait for a free slot; returns the epoch token to hand back to release()"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+            return self._epoch
+
+    async def release(self, token: int, latency: float, overloaded: bool):
+        """Free a slot and feed the request outcome back into the limit"""
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded or latency > self.latency_target:
+                # Ignore outcomes of requests sent before the last cut
+                if token >= self._epoch:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._epoch += 1
+                    self._healthy = 0
+                    self.decreases += 1
+            else:
+                self._healthy += 1
+                if self._healthy >= self.current and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._healthy = 0
+                    self.increases += 1
+                    self.peak_limit = max(self.peak_limit, self.current)
+            self._condition.notify_all()
+
+    def slot(self) -> "LimiterSlot":
+        return LimiterSlot(self)
+
+class LimiterSlot:
+    """Async context manager around acquire/release; set ``overloaded`` before exiting"""
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.overloaded = False
+        self.waited = 0.0
+        self._token = 0
+        self._start = 0.0
+
+    async def __aenter__(self) -> "LimiterSlot":
+        queued_at = time.perf_counter()
+        self._token = await self.limiter.acquire()
+        self._start = time.perf_counter()
+        self.waited = self._start - queued_at
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None and not isinstance(exc, asyncio.CancelledError):
+            self.overloaded = True
+        await self.limiter.release(self._token, time.perf_counter() - self._start, self.overloaded)
+        return False
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0,
+                  retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than a server-provided Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
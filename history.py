@@ -0,0 +1,323 @@
+"""Time series over every scraped snapshot.
+
+Ingests premium_outlet_products_*.{snap,parquet,csv,ndjson,json} into one SQLite
+table of observations keyed by (product id, snapshot time, listing), where
+the listing is the filename suffix of multi-language (_az, _en) or per-job
+output and empty for a single merged snapshot. Each snapshot is read once:
+(time, listing) pairs already in the store are skipped, so adding a new
+file costs only its own rows. Reports cover per-product price changes,
+discount depth per brand over time and new/removed items per run:
+
+    python history.py                 # ingest new snapshots and print a report
+    python history.py --product 190373
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from compact import SNAPSHOT_EXTENSION, VARIANTS_SUFFIX, CompactSnapshot
+
+DEFAULT_HISTORY_DB = "snapshot_history.sqlite"
+SNAPSHOT_PATTERN = "premium_outlet_products_*"
+REPORT_DIR = "history"
+BATCH_SIZE = 5000
+
+# When one scrape produced several files, read the cheapest one
+FORMAT_PREFERENCE = ['.snap', '.parquet', '.csv', '.ndjson', '.json']
+SNAPSHOT_NAME = re.compile(r'premium_outlet_products_(\d{8}_\d{6})(?:_(.+))?$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_time TEXT NOT NULL,
+    listing TEXT NOT NULL DEFAULT '',
+    file TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    PRIMARY KEY (snapshot_time, listing)
+);
+CREATE TABLE IF NOT EXISTS observations (
+    product_id INTEGER NOT NULL,
+    snapshot_time TEXT NOT NULL,
+    listing TEXT NOT NULL DEFAULT '',
+    price REAL,
+    price_old REAL,
+    discount REAL,
+    brand TEXT,
+    item TEXT,
+    new_in INTEGER,
+    variant_count INTEGER,
+    PRIMARY KEY (product_id, snapshot_time, listing)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_observations_snapshot ON observations (snapshot_time, listing, product_id);
+CREATE INDEX IF NOT EXISTS idx_observations_brand ON observations (brand, snapshot_time);
+"""
+
+# Stores written before listings were tracked: one snapshot per time, its listing
+# recovered from the file it was read from
+MIGRATE_LISTING = """
+ALTER TABLE snapshots RENAME TO snapshots_old;
+ALTER TABLE observations RENAME TO observations_old;
+DROP INDEX IF EXISTS idx_observations_snapshot;
+DROP INDEX IF EXISTS idx_observations_brand;
+{schema}
+INSERT INTO snapshots (snapshot_time, listing, file, rows, ingested_at)
+    SELECT snapshot_time, '', file, rows, ingested_at FROM snapshots_old;
+INSERT INTO observations
+    SELECT product_id, snapshot_time, '', price, price_old, discount, brand, item, new_in, variant_count
+    FROM observations_old;
+DROP TABLE snapshots_old;
+DROP TABLE observations_old;
+"""
+
+Observation = Tuple[int, str, str, Optional[float], Optional[float], Optional[float],
+                    Optional[str], Optional[str], Optional[int], Optional[int]]
+
+def snapshot_key(path: str) -> Optional[Tuple[str, str]]:
+    """(ISO timestamp, listing suffix) encoded in a snapshot filename"""
+    match = SNAPSHOT_NAME.match(os.path.splitext(os.path.basename(path))[0])
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat(), match.group(2) or ''
+
+def _num(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _money(value) -> Optional[float]:
+    # Prices are in AZN; rounding to cents keeps float noise from showing up as price changes
+    value = _num(value)
+    return round(value, 2) if value is not None else None
+
+def _flag(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    return int(value == 'True') if isinstance(value, str) else int(bool(value))
+
+def _text(value) -> Optional[str]:
+    return str(value) if value not in (None, '') else None
+
+def _from_flat(row: Dict, taken_at: str, listing: str = '') -> Optional[Observation]:
+    product_id = _num(row.get('id'))
+    if product_id is None:
+        return None
+    variant_count = _num(row.get('variant_count'))
+    return (int(product_id), taken_at, listing, _money(row.get('price')), _money(row.get('priceOld')), _num(row.get('discount')),
+            _text(row.get('brand_title')), _text(row.get('item')), _flag(row.get('newIn')),
+            int(variant_count) if variant_count is not None else None)
+
+def _from_raw(product: Dict, taken_at: str, listing: str = '') -> Optional[Observation]:
+    row = dict(product)
+    row['brand_title'] = (product.get('brand') or {}).get('title')
+    row['variant_count'] = len(product.get('variants') or [])
+    return _from_flat(row, taken_at, listing)
+
+def read_observations(path: str, taken_at: str, listing: str = '') -> Iterator[Observation]:
+    """Stream observations out of a snapshot file of any supported format"""
+    ext = os.path.splitext(path)[1]
+    if ext == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield _from_flat(row, taken_at, listing)
+    elif ext == '.ndjson':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield _from_raw(json.loads(line), taken_at, listing)
+    elif ext == '.json':
+        with open(path, encoding='utf-8') as f:
+            for product in json.load(f):
+                yield _from_raw(product, taken_at, listing)
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        columns = ['id', 'price', 'priceOld', 'discount', 'brand_title', 'item', 'newIn', 'variant_count']
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE, columns=columns):
+            for row in batch.to_pylist():
+                yield _from_flat(row, taken_at, listing)
+    elif ext == '.snap':
+        columns = ['id', 'price', 'priceOld', 'discount', 'brand_title', 'item', 'newIn', 'variant_count']
+        for row in CompactSnapshot(path).iter_rows(columns):
+            yield _from_flat(row, taken_at, listing)
+
+class SnapshotHistory:
+    """SQLite store of (product id, snapshot time) observations"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_DB):
+        self.conn = sqlite3.connect(path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(snapshots)")}
+        if columns and 'listing' not in columns:
+            self._migrate_listing()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate_listing(self):
+        with self.conn:
+            self.conn.executescript(MIGRATE_LISTING.format(schema=SCHEMA))
+            for taken_at, file in self.conn.execute("SELECT snapshot_time, file FROM snapshots").fetchall():
+                key = snapshot_key(file)
+                if key and key[1]:
+                    self.conn.execute("UPDATE snapshots SET listing = ? WHERE snapshot_time = ?", (key[1], taken_at))
+                    self.conn.execute("UPDATE observations SET listing = ? WHERE snapshot_time = ?", (key[1], taken_at))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "SnapshotHistory":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingested(self) -> set:
+        """(snapshot time, listing) pairs already in the store"""
+        return set(self.conn.execute("SELECT snapshot_time, listing FROM snapshots"))
+
+    def ingest_file(self, path: str, taken_at: str, listing: str = '') -> int:
+        """Load one snapshot in a single transaction; duplicate (id, time) rows are ignored"""
+        rows = 0
+        batch: List[Observation] = []
+        with self.conn:
+            for observation in read_observations(path, taken_at, listing):
+                if observation is None:
+                    continue
+                batch.append(observation)
+                if len(batch) >= BATCH_SIZE:
+                    rows += self._insert(batch)
+                    batch = []
+            rows += self._insert(batch)
+            self.conn.execute("INSERT INTO snapshots (snapshot_time, listing, file, rows, ingested_at) "
+                              "VALUES (?, ?, ?, ?, ?)", (taken_at, listing, os.path.basename(path), rows,
+                                                         datetime.now().isoformat(timespec='seconds')))
+        return rows
+
+    def _insert(self, batch: List[Observation]) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany("INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        return self.conn.total_changes - before
+
+    def ingest(self, pattern: str = SNAPSHOT_PATTERN) -> List[Tuple[str, int]]:
+        """Ingest every snapshot matching pattern whose (time, listing) is not stored yet.
+
+        Multi-language and per-job scrapes write one file per listing with the
+        same time; each is its own snapshot. Between formats of the same
+        snapshot the cheapest to read wins.
+        """
+        candidates: Dict[Tuple[str, str], str] = {}
+        for path in glob.glob(pattern):
+            if path.endswith(VARIANTS_SUFFIX + SNAPSHOT_EXTENSION):
+                continue  # a product snapshot's variant table, not a snapshot of its own
+            ext = os.path.splitext(path)[1]
+            key = snapshot_key(path)
+            if key is None or ext not in FORMAT_PREFERENCE:
+                continue
+            current = candidates.get(key)
+            if current is None or FORMAT_PREFERENCE.index(ext) < FORMAT_PREFERENCE.index(os.path.splitext(current)[1]):
+                candidates[key] = path
+
+        known = self.ingested()
+        ingested = []
+        for key in sorted(set(candidates) - known):
+            ingested.append((candidates[key], self.ingest_file(candidates[key], *key)))
+        return ingested
+
+    def price_changes(self, product_id: Optional[int] = None) -> pd.DataFrame:
+        """Observations whose price differs from the same product's previous snapshot"""
+        where = "WHERE product_id = ?" if product_id is not None else ""
+        query = f"""
+            SELECT * FROM (
+                SELECT product_id, listing, snapshot_time, brand, item, price,
+                       LAG(price) OVER (PARTITION BY product_id, listing ORDER BY snapshot_time) AS previous_price,
+                       discount
+                FROM observations {where}
+            )
+            WHERE previous_price IS NOT NULL AND price IS NOT previous_price
+            ORDER BY product_id, listing, snapshot_time
+        """
+        params = (product_id,) if product_id is not None else ()
+        changes = pd.read_sql_query(query, self.conn, params=params)
+        changes['change'] = (changes['price'] - changes['previous_price']).round(2)
+        return changes
+
+    def price_series(self, product_id: int) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT snapshot_time, listing, price, price_old, discount FROM observations "
+            "WHERE product_id = ? ORDER BY listing, snapshot_time", self.conn, params=(product_id,))
+
+    def brand_discount_trend(self, min_products: int = 10) -> pd.DataFrame:
+        """Average discount per listing and brand (rows) per snapshot (columns)"""
+        trend = pd.read_sql_query(
+            "SELECT listing, brand, snapshot_time, AVG(discount) AS avg_discount, COUNT(*) AS products "
+            "FROM observations WHERE brand IS NOT NULL GROUP BY listing, brand, snapshot_time", self.conn)
+        trend = trend[trend['products'] >= min_products]
+        return trend.pivot(index=['listing', 'brand'], columns='snapshot_time', values='avg_discount')
+
+    def churn(self) -> pd.DataFrame:
+        """Products added and removed relative to the previous snapshot of the same listing"""
+        return pd.read_sql_query("""
+            WITH ordered AS (
+                SELECT snapshot_time, listing, rows,
+                       LAG(snapshot_time) OVER (PARTITION BY listing ORDER BY snapshot_time) AS previous
+                FROM snapshots
+            )
+            SELECT o.snapshot_time, o.listing, o.rows AS products,
+                   (SELECT COUNT(*) FROM observations a
+                    WHERE a.snapshot_time = o.snapshot_time AND a.listing = o.listing AND o.previous IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM observations b
+                                      WHERE b.snapshot_time = o.previous AND b.listing = o.listing
+                                        AND b.product_id = a.product_id)
+                   ) AS new_items,
+                   (SELECT COUNT(*) FROM observations b
+                    WHERE b.snapshot_time = o.previous AND b.listing = o.listing
+                      AND NOT EXISTS (SELECT 1 FROM observations a
+                                      WHERE a.snapshot_time = o.snapshot_time AND a.listing = o.listing
+                                        AND a.product_id = b.product_id)
+                   ) AS removed_items
+            FROM ordered o
+            ORDER BY o.snapshot_time, o.listing
+        """, self.conn)
+
+def run_history(pattern: str = SNAPSHOT_PATTERN, db_path: str = DEFAULT_HISTORY_DB,
+                out_dir: str = REPORT_DIR, product_id: Optional[int] = None):
+    """Ingest new snapshots, print a summary and write the report CSVs"""
+    with SnapshotHistory(db_path) as history:
+        for path, rows in history.ingest(pattern):
+            print(f"✓ Ingested {rows:,} rows from {path}")
+
+        churn = history.churn()
+        print(f"\n{len(churn)} snapshot(s) in {db_path}")
+        if churn.empty:
+            return
+        print(churn.to_string(index=False))
+
+        if product_id is not None:
+            print(f"\nPrice series for product {product_id}:")
+            print(history.price_series(product_id).to_string(index=False))
+            return
+
+        os.makedirs(out_dir, exist_ok=True)
+        changes = history.price_changes()
+        changes.to_csv(os.path.join(out_dir, 'price_changes.csv'), index=False)
+        history.brand_discount_trend().to_csv(os.path.join(out_dir, 'brand_discount_trend.csv'))
+        churn.to_csv(os.path.join(out_dir, 'churn.csv'), index=False)
+        print(f"\n{len(changes):,} price changes across {changes['product_id'].nunique():,} products")
+        print(f"✓ Reports written to {out_dir}/")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest snapshot files and report price history")
+    parser.add_argument('--pattern', default=SNAPSHOT_PATTERN, help="glob of snapshot files")
+    parser.add_argument('--db', default=DEFAULT_HISTORY_DB, help="SQLite history store")
+    parser.add_argument('--out-dir', default=REPORT_DIR, help="where report CSVs are written")
+    parser.add_argument('--product', type=int, help="print one product's price series instead")
+    args = parser.parse_args()
+    run_history(args.pattern, args.db, args.out_dir, args.product)
+
+if __name__ == "__main__":
+    main()
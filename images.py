@@ -0,0 +1,135 @@
+"""Mirror product images to a local directory.
+
+Image fields (image, images, outfit) hold filenames with a content hash,
+e.g. 188797-9d043276b05c09bbb1054f5de019d36f.jpg, so a file that is
+already on disk never changes and re-runs only download new images.
+Downloads share the scraper's aiohttp session, run under their own
+concurrency limit, stream straight to disk and stop once a byte budget
+is spent:
+
+    python scrape_products.py --images images/ --image-base-url https://<cdn>/<path>/
+"""
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from concurrency import backoff_delay
+from transport import Transport
+
+IMAGE_CONCURRENCY = 8
+IMAGE_RETRIES = 2
+CHUNK_SIZE = 64 * 1024
+SAFE_NAME = re.compile(r'^[\w][\w.-]*$')  # No paths or hidden files from API data
+
+def image_names(products: Iterable[Dict]) -> List[str]:
+    """Every image filename a page of raw API products refers to, in order, without duplicates"""
+    names = {}
+    for product in products:
+        for name in (product.get('image'), product.get('outfit')):
+            if name:
+                names[name] = None
+        for image in product.get('images') or []:
+            if image.get('source'):
+                names[image['source']] = None
+    return list(names)
+
+@dataclass
+class ImageConfig:
+    """Where images come from and go to, and how much the mirror may fetch"""
+    out_dir: str
+    base_url: str  # Image filenames are appended to this
+    concurrency: int = IMAGE_CONCURRENCY
+    byte_budget: Optional[int] = None  # Stop starting downloads after this many bytes
+
+class ImageMirror:
+    """Download each image once into out_dir, skipping files that already exist"""
+
+    def __init__(self, transport: Transport, config: ImageConfig):
+        self.transport = transport
+        self.out_dir = config.out_dir
+        self.base_url = config.base_url.rstrip('/') + '/'
+        self.byte_budget = config.byte_budget
+        self.semaphore = asyncio.Semaphore(config.concurrency)
+        self.seen: Set[str] = set()
+        self.tasks: List[asyncio.Task] = []
+        self.bytes = 0
+        self.counts = {'downloaded': 0, 'existing': 0, 'failed': 0, 'over_budget': 0, 'invalid': 0}
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    @property
+    def budget_left(self) -> bool:
+        return self.byte_budget is None or self.bytes < self.byte_budget
+
+    def add(self, names: Iterable[str]):
+        """Queue downloads for names not seen before; returns immediately"""
+        for name in names:
+            if name in self.seen:
+                continue
+            self.seen.add(name)
+            if not SAFE_NAME.match(name):
+                self.counts['invalid'] += 1
+            elif os.path.exists(os.path.join(self.out_dir, name)):
+                self.counts['existing'] += 1
+            else:
+                self.tasks.append(asyncio.ensure_future(self._download(name)))
+
+    async def wait(self):
+        """Wait for every queued download to finish"""
+        while self.tasks:
+            tasks, self.tasks = self.tasks, []
+            await asyncio.gather(*tasks)
+
+    async def _download(self, name: str):
+        path = os.path.join(self.out_dir, name)
+        for attempt in range(IMAGE_RETRIES + 1):
+            async with self.semaphore:
+                if not self.budget_left:
+                    self.counts['over_budget'] += 1
+                    return
+                try:
+                    outcome = await self._stream(name, path)
+                except Exception as e:
+                    outcome = f"{type(e).__name__}: {e}".rstrip(': ')
+            if outcome is None:
+                self.counts['downloaded'] += 1
+                return
+            if outcome == 'over_budget':
+                self.counts['over_budget'] += 1
+                return
+            if outcome == 'permanent' or attempt == IMAGE_RETRIES:
+                break
+            await asyncio.sleep(backoff_delay(attempt))
+        self.counts['failed'] += 1
+
+    async def _stream(self, name: str, path: str) -> Optional[str]:
+        """Stream one image to a temporary file and move it into place; None on success"""
+        part = path + '.part'
+        try:
+            async with self.transport.get_asset(self.base_url + name) as response:
+                if response.status != 200:
+                    return 'retry' if response.status == 429 or response.status >= 500 else 'permanent'
+                if (self.byte_budget is not None and response.content_length
+                        and self.bytes + response.content_length > self.byte_budget):
+                    return 'over_budget'
+                with open(part, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        self.bytes += len(chunk)
+                        f.write(chunk)
+            os.replace(part, path)
+            part = None
+            return None
+        finally:
+            if part and os.path.exists(part):
+                os.remove(part)
+
+    def summary(self) -> str:
+        c = self.counts
+        text = (f"Images: {c['downloaded']} downloaded ({self.bytes / 1024 ** 2:.1f} MB), "
+                f"{c['existing']} already present, {c['failed']} failed")
+        if c['over_budget']:
+            text += f", {c['over_budget']} skipped over the byte budget"
+        if c['invalid']:
+            text += f", {c['invalid']} unsafe names ignored"
+        return text
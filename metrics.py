@@ -0,0 +1,179 @@
+"""Per-page instrumentation for scrape runs.
+
+fetch_page and the writers record, for every page: request latency,
+response size, item count, retries, time spent waiting for a limiter
+slot, time slept in backoff, and time spent flattening and writing rows.
+A run's records go to a JSON-lines file (one page per line plus a final
+summary line) and a Prometheus text-format snapshot:
+
+    premium_outlet_metrics_<timestamp>.jsonl
+    premium_outlet_metrics_<timestamp>.prom
+
+Comparing wait, request and write totals shows whether a slow run was
+our own concurrency limit, the server/network, or local CSV writing.
+"""
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOWEST_PAGES = 5
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+@dataclass
+class PageMetrics:
+    """Timings and sizes for one fetched page; seconds unless noted"""
+    page: int
+    job: str = ""  # Crawl job label, see scrape_products.CrawlJob.name
+    status: str = "pending"  # ok, failed
+    attempts: int = 0
+    latency: float = 0.0  # Request time of the last attempt
+    request_seconds: float = 0.0  # Request time over all attempts
+    wait_seconds: float = 0.0  # Queued for a limiter slot, all attempts
+    backoff_seconds: float = 0.0
+    bytes: int = 0  # Response body after content decoding
+    wire_bytes: Optional[int] = None  # Content-Length as sent, when the server gave one
+    items: int = 0
+    flatten_seconds: float = 0.0
+    write_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def add_attempt(self, waited: float, seconds: float):
+        self.attempts += 1
+        self.wait_seconds += waited
+        self.latency = seconds
+        self.request_seconds += seconds
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), 'retries': self.retries}
+
+class ScrapeMetrics:
+    """Collects PageMetrics for one run and renders the summary and exports"""
+
+    def __init__(self):
+        self.pages: List[PageMetrics] = []
+        self._latest: Dict[Tuple[str, int], PageMetrics] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def start_page(self, page: int, job: str = "") -> PageMetrics:
+        record = PageMetrics(page=page, job=job)
+        self.pages.append(record)
+        self._latest[(job, page)] = record
+        return record
+
+    def get(self, page: int, job: str = "") -> Optional[PageMetrics]:
+        """Most recent record for a page, for timing what happens after the fetch"""
+        return self._latest.get((job, page))
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict:
+        ok = [p for p in self.pages if p.status == 'ok']
+        latencies = [p.latency for p in ok]
+        waits = [p.wait_seconds for p in self.pages]
+        elapsed = self.elapsed or 1e-9
+        items = sum(p.items for p in ok)
+        size = sum(p.bytes for p in ok)
+        slowest = sorted(ok, key=lambda p: p.latency, reverse=True)[:SLOWEST_PAGES]
+        return {
+            'elapsed_seconds': self.elapsed,
+            'pages_ok': len(ok),
+            'pages_failed': sum(1 for p in self.pages if p.status == 'failed'),
+            'items': items,
+            'bytes': size,
+            'retries': sum(p.retries for p in self.pages),
+            'pages_per_sec': len(ok) / elapsed,
+            'items_per_sec': items / elapsed,
+            'mb_per_sec': size / elapsed / 1024 ** 2,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p90': percentile(latencies, 90),
+            'latency_p99': percentile(latencies, 99),
+            'latency_max': max(latencies, default=0.0),
+            'wait_p99': percentile(waits, 99),
+            # Summed over concurrent pages, so these can exceed elapsed_seconds
+            'request_seconds': sum(p.request_seconds for p in self.pages),
+            'wait_seconds': sum(waits),
+            'backoff_seconds': sum(p.backoff_seconds for p in self.pages),
+            'flatten_seconds': sum(p.flatten_seconds for p in self.pages),
+            'write_seconds': sum(p.write_seconds for p in self.pages),
+            'slowest_pages': [{'page': p.page, 'job': p.job, 'latency': p.latency, 'bytes': p.bytes,
+                               'retries': p.retries} for p in slowest],
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"Throughput: {s['pages_per_sec']:.1f} pages/s, {s['items_per_sec']:.0f} items/s, "
+              f"{s['mb_per_sec']:.2f} MB/s ({s['bytes'] / 1024 ** 2:.1f} MB)")
+        print(f"Latency: p50 {s['latency_p50'] * 1000:.0f} ms, p90 {s['latency_p90'] * 1000:.0f} ms, "
+              f"p99 {s['latency_p99'] * 1000:.0f} ms, max {s['latency_max'] * 1000:.0f} ms; "
+              f"{s['retries']} retries")
+        print(f"Time by stage (summed over pages): request {s['request_seconds']:.2f}s, "
+              f"limiter wait {s['wait_seconds']:.2f}s, backoff {s['backoff_seconds']:.2f}s, "
+              f"flatten {s['flatten_seconds']:.2f}s, write {s['write_seconds']:.2f}s")
+        if s['slowest_pages']:
+            several_jobs = len({p.job for p in self.pages}) > 1
+            slowest = ', '.join(f"{p['page']}{' [' + p['job'] + ']' if several_jobs else ''} "
+                                f"({p['latency'] * 1000:.0f} ms)" for p in s['slowest_pages'])
+            print(f"Slowest pages: {slowest}")
+
+    def write_jsonl(self, filename: str):
+        with open(filename, 'w', encoding='utf-8') as f:
+            for record in self.pages:
+                f.write(json.dumps({'type': 'page', **record.as_dict()}, ensure_ascii=False) + '\n')
+            f.write(json.dumps({'type': 'summary', **self.summary()}, ensure_ascii=False) + '\n')
+
+    def prometheus_text(self) -> str:
+        """Snapshot of the run in the Prometheus text exposition format"""
+        s = self.summary()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value:g}" if isinstance(value, float) else f"{name}{labels} {value}")
+
+        metric('scrape_pages_total', 'counter', "Pages by final status",
+               [('{status="ok"}', s['pages_ok']), ('{status="failed"}', s['pages_failed'])])
+        metric('scrape_items_total', 'counter', "Products fetched", [('', s['items'])])
+        metric('scrape_response_bytes_total', 'counter', "Response bytes after content decoding", [('', s['bytes'])])
+        metric('scrape_retries_total', 'counter', "Retried page requests", [('', s['retries'])])
+
+        latencies = [p.latency for p in self.pages if p.status == 'ok']
+        buckets = [(f'{{le="{bound:g}"}}', sum(1 for v in latencies if v <= bound)) for bound in LATENCY_BUCKETS]
+        buckets.append(('{le="+Inf"}', len(latencies)))
+        lines.append("# HELP scrape_page_latency_seconds Request latency of successfully fetched pages")
+        lines.append("# TYPE scrape_page_latency_seconds histogram")
+        for labels, count in buckets:
+            lines.append(f"scrape_page_latency_seconds_bucket{labels} {count}")
+        lines.append(f"scrape_page_latency_seconds_sum {sum(latencies):g}")
+        lines.append(f"scrape_page_latency_seconds_count {len(latencies)}")
+
+        metric('scrape_stage_seconds_total', 'counter', "Seconds spent per stage, summed over pages",
+               [(f'{{stage="{stage}"}}', float(s[f'{stage}_seconds']))
+                for stage in ('request', 'wait', 'backoff', 'flatten', 'write')])
+        metric('scrape_duration_seconds', 'gauge', "Wall-clock duration of the run", [('', float(s['elapsed_seconds']))])
+        metric('scrape_pages_per_second', 'gauge', "Successful pages per second of wall clock",
+               [('', float(s['pages_per_sec']))])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filename: str):
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
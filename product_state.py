@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DEFAULT_STATE_DB = "product_state.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen_run INTEGER NOT NULL,
+    last_seen_run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    full_pass INTEGER,
+    inserts INTEGER DEFAULT 0,
+    updates INTEGER DEFAULT 0,
+    deletes INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_products_last_seen ON products (last_seen_run);
+"""
+
+def content_hash(row: Dict) -> str:
+    """Stable hash of a flattened product row"""
+    encoded = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+class ProductStateStore:
+    """SQLite store of the last known flattened state of every product, keyed by id"""
+
+    def __init__(self, path: str = DEFAULT_STATE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.run_id: Optional[int] = None
+        self.counts = {'insert': 0, 'update': 0, 'delete': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "ProductStateStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_run(self) -> int:
+        cursor = self.conn.execute("INSERT INTO runs (started_at) VALUES (?)",
+                                   (datetime.now().isoformat(timespec='seconds'),))
+        self.conn.commit()
+        self.run_id = cursor.lastrowid
+        self.counts = {'insert': 0, 'update': 0, 'delete': 0}
+        return self.run_id
+
+    def apply_page(self, rows: List[Dict]) -> List[Dict]:
+        """Upsert one page of flattened rows and return the inserts/updates it caused"""
+        rows = [r for r in rows if r.get('id') is not None]
+        if not rows:
+            return []
+
+        ids = [r['id'] for r in rows]
+        placeholders = ','.join('?' * len(ids))
+        existing = {
+            row_id: (row_hash, data)
+            for row_id, row_hash, data in self.conn.execute(
+                f"SELECT id, hash, data FROM products WHERE id IN ({placeholders})", ids)
+        }
+
+        changes = []
+        upserts = []
+        touched = []
+        for row in rows:
+            row_hash = content_hash(row)
+            previous = existing.get(row['id'])
+            if previous is None:
+                changes.append({'op': 'insert', 'id': row['id'], 'row': row})
+                upserts.append((row['id'], row_hash, json.dumps(row, ensure_ascii=False), self.run_id, self.run_id))
+            elif previous[0] != row_hash:
+                old_row = json.loads(previous[1])
+                diff = {k: [old_row.get(k), v] for k, v in row.items() if old_row.get(k) != v}
+                changes.append({'op': 'update', 'id': row['id'], 'changes': diff})
+                upserts.append((row['id'], row_hash, json.dumps(row, ensure_ascii=False), self.run_id, self.run_id))
+            else:
+                touched.append((self.run_id, row['id']))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO products (id, hash, data, first_seen_run, last_seen_run) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET hash = excluded.hash, data = excluded.data, "
+                "last_seen_run = excluded.last_seen_run",
+                upserts)
+            self.conn.executemany("UPDATE products SET last_seen_run = ? WHERE id = ?", touched)
+
+        for change in changes:
+            self.counts[change['op']] += 1
+        return changes
+
+    def finish_run(self, full_pass: bool) -> List[Dict]:
+        """Close the run; after a complete pass, products not seen are removed and reported as deletions"""
+        deletions = []
+        with self.conn:
+            if full_pass:
+                for row_id, data in self.conn.execute(
+                        "SELECT id, data FROM products WHERE last_seen_run < ?", (self.run_id,)):
+                    deletions.append({'op': 'delete', 'id': row_id, 'row': json.loads(data)})
+                self.conn.execute("DELETE FROM products WHERE last_seen_run < ?", (self.run_id,))
+            self.counts['delete'] = len(deletions)
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ?, full_pass = ?, inserts = ?, updates = ?, deletes = ? WHERE id = ?",
+                (datetime.now().isoformat(timespec='seconds'), int(full_pass),
+                 self.counts['insert'], self.counts['update'], self.counts['delete'], self.run_id))
+        return deletions
@@ -1,155 +1,791 @@
+import argparse
 import asyncio
-import aiohttp
+import contextlib
 import csv
 import json
-from typing import List, Dict
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Set, Tuple
 from datetime import datetime
 
-API_URL = "https://premium-api-production.up.railway.app/products"
-TOTAL_PAGES = 213  # Actual total pages from API
-CONCURRENT_REQUESTS = 10  # Limit concurrent requests to avoid overwhelming the server
-
-async def fetch_page(session: aiohttp.ClientSession, page: int, semaphore: asyncio.Semaphore) -> Dict:
-    """Fetch a single page of products"""
-    payload = {
-        "lang": "az",
-        "page": page,
-        "sort": "",
-        "limit": 30,
-        "filter_category": 4,
-        "param_srsltid": "AfmBOoqYkwwKtgLjHJ8RJc6S5lAOiqf3tQRSuSaQe_fRqarwzprfL8e0"
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json, text/plain, */*",
-        "Origin": "https://www.premiumoutlet.az"
-    }
-
-    async with semaphore:
-        try:
-            async with session.post(API_URL, json=payload, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✓ Page {page}/{TOTAL_PAGES} fetched ({len(data.get('data', {}).get('items', []))} items)")
-                    return data
-                else:
-                    print(f"✗ Page {page} failed with status {response.status}")
-                    return None
-        except Exception as e:
-            print(f"✗ Page {page} error: {str(e)}")
-            return None
-
-def flatten_product(product: Dict) -> Dict:
-    """Flatten product data for CSV export"""
-    flattened = {
-        'id': product.get('id'),
-        'title': product.get('title'),
-        'route': product.get('route'),
-        'brandName': product.get('brandName'),
-        'brand_title': product.get('brand', {}).get('title'),
-        'brand_route': product.get('brand', {}).get('route'),
-        'price': product.get('price'),
-        'priceOld': product.get('priceOld'),
-        'discount': product.get('discount'),
-        'maxPrice': product.get('maxPrice'),
-        'minPrice': product.get('minPrice'),
-        'maxPriceOld': product.get('maxPriceOld'),
-        'minPriceOld': product.get('minPriceOld'),
-        'newIn': product.get('newIn'),
-        'monoBrand': product.get('monoBrand'),
-        'priceInStore': product.get('priceInStore'),
-        'season': product.get('season'),
-        'colection': product.get('colection'),
-        'line': product.get('line'),
-        'item': product.get('item'),
-        'model': product.get('model'),
-        'article': product.get('article'),
-        'warehouse': product.get('warehouse'),
-        'image': product.get('image'),
-        'mannequins': product.get('mannequins'),
-        'outfit': product.get('outfit'),
-        'hasVariantPrice': product.get('hasVariantPrice'),
-        'beautyDiscount': product.get('beautyDiscount'),
-        'discountId': product.get('discountId'),
-        # Size table info
-        'sizeTable_name': product.get('sizeTable', {}).get('name'),
-        'sizeTable_title': product.get('sizeTable', {}).get('title'),
-        'sizeTable_show': product.get('sizeTable', {}).get('show'),
-        # Variants (join sizes)
-        'available_sizes': ', '.join([v.get('siteSize', '') for v in product.get('variants', [])]),
-        'variant_count': len(product.get('variants', [])),
-        # Images (join image URLs)
-        'images': ', '.join([img.get('source', '') for img in product.get('images', [])]),
-        'image_count': len(product.get('images', [])),
-    }
-
-    return flattened
-
-async def scrape_all_pages() -> List[Dict]:
-    """Scrape all pages concurrently"""
-    semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
-    all_products = []
-
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_page(session, page, semaphore) for page in range(1, TOTAL_PAGES + 1)]
-        results = await asyncio.gather(*tasks)
-
-        for result in results:
-            if result and result.get('ok'):
-                items = result.get('data', {}).get('items', [])
-                all_products.extend(items)
-
-    return all_products
-
-def save_to_csv(products: List[Dict], filename: str):
-    """Save products to CSV file"""
-    if not products:
-        print("No products to save!")
-        return
-
-    flattened_products = [flatten_product(p) for p in products]
-
-    # Get all unique keys from all products
-    fieldnames = set()
-    for product in flattened_products:
-        fieldnames.update(product.keys())
-
-    fieldnames = sorted(fieldnames)
-
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(flattened_products)
-
-    print(f"\n✓ Saved {len(products)} products to {filename}")
+from alerts import DEFAULT_ALERT_STATE, DEFAULT_ALERTS, AlertEngine, alert_session, run_alerts
+from checkpoint import DEFAULT_CHECKPOINT, CrawlCheckpoint
+from columnar import COLUMN_NAMES, ParquetSnapshotWriter, flatten_page
+from concurrency import AdaptiveLimiter, backoff_delay
+from images import IMAGE_CONCURRENCY, ImageConfig, ImageMirror, image_names
+from metrics import PageMetrics, ScrapeMetrics
+from product_state import DEFAULT_STATE_DB, ProductStateStore
+from search import build_index
+from transport import API_URL, Transport, TransportConfig
 
-async def main():
-    print(f"Starting scrape of {TOTAL_PAGES} pages...")
-    print(f"Concurrent requests: {CONCURRENT_REQUESTS}\n")
+if TYPE_CHECKING:
+    from compact import CompactStore
+
+PAGE_SIZE = 30
+MAX_PAGES = 100_000  # Runaway guard when the API advertises no page count
+CONCURRENT_REQUESTS = 10  # Starting concurrency; adapted at runtime by AdaptiveLimiter
+MAX_CONCURRENT_REQUESTS = 32  # Upper bound the limiter may grow to
+MAX_RETRIES = 4  # Extra attempts per page after a transient failure
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+UNCHANGED_PAGES_TO_STOP = 3  # Incremental mode stops after this many consecutive unchanged pages
+
+BASE_PAYLOAD = {
+    "lang": "az",
+    "sort": "",
+    "limit": PAGE_SIZE,
+    "filter_category": 4,
+    "param_srsltid": "AfmBOoqYkwwKtgLjHJ8RJc6S5lAOiqf3tQRSuSaQe_fRqarwzprfL8e0"
+}
+
+@dataclass(frozen=True)
+class CrawlJob:
+    """One listing to crawl: a category in a language, in a sort order"""
+    category: int = BASE_PAYLOAD["filter_category"]
+    lang: str = BASE_PAYLOAD["lang"]
+    sort: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"cat{self.category}-{self.lang}" + (f"-{self.sort}" if self.sort else "")
+
+    def payload(self, page: int) -> Dict:
+        return {**BASE_PAYLOAD, "page": page, "sort": self.sort,
+                "filter_category": self.category, "lang": self.lang}
+
+DEFAULT_JOB = CrawlJob()
+
+async def fetch_page(transport: Transport, page: int, limiter: AdaptiveLimiter,
+                     job: CrawlJob = DEFAULT_JOB, failures: Optional[Dict[int, str]] = None,
+                     metrics: Optional[ScrapeMetrics] = None) -> Optional[Dict]:
+    """Fetch a single page of products, retrying transient failures with jittered backoff"""
+    payload = job.payload(page)
+    record = metrics.start_page(page, job.name) if metrics is not None else None
+    label = f"Page {page}" if job == DEFAULT_JOB else f"Page {page} [{job.name}]"
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        retryable = True
+        data = None
+        async with limiter.slot() as slot:
+            sent = time.perf_counter()
+            try:
+                async with transport.post(payload) as response:
+                    if response.status == 200:
+                        data, size = await transport.read_json_sized(response)
+                        wire_bytes = response.content_length
+                        if not (isinstance(data, dict) and isinstance(data.get('data'), dict)):
+                            # null/non-object JSON or payload: retry like any other transient failure
+                            data = None
+                            reason = "empty/invalid body"
+                    else:
+                        reason = f"status {response.status}"
+                        retryable = response.status in RETRYABLE_STATUSES
+                        if retryable:
+                            slot.overloaded = True
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except Exception as e:
+                data = None
+                slot.overloaded = True
+                reason = f"{type(e).__name__}: {e}".rstrip(': ')
+            if record is not None:
+                record.add_attempt(slot.waited, time.perf_counter() - sent)
+
+        if data is not None:
+            items = len(data['data'].get('items') or [])
+            if record is not None:
+                record.status, record.bytes, record.wire_bytes, record.items = 'ok', size, wire_bytes, items
+            print(f"✓ {label} fetched ({items} items)")
+            return data
+        if not retryable:
+            break
+
+        if attempt < MAX_RETRIES:
+            delay = backoff_delay(attempt, retry_after=retry_after)
+            print(f"↻ {label} {reason}, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            if record is not None:
+                record.backoff_seconds += delay
+            await asyncio.sleep(delay)
+
+    print(f"✗ {label} failed after {attempt + 1} attempt(s) ({reason})")
+    if record is not None:
+        record.status, record.error = 'failed', reason
+    if failures is not None:
+        failures[page] = reason
+    return None
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds; HTTP-date values are ignored"""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def report_fetch_health(limiter: AdaptiveLimiter, failures: Dict):
+    """Print the limiter outcome and every page that could not be recovered.
+
+    failures maps page -> reason, or (job name, page) -> reason for multi-job crawls.
+    """
+    print(f"Concurrency: final limit {limiter.current}, peak {limiter.peak_limit} "
+          f"({limiter.increases} increases, {limiter.decreases} backoffs)")
+    if failures:
+        print(f"✗ {len(failures)} unrecoverable page(s):")
+        for key in sorted(failures):
+            where = f"{key[0]} page {key[1]}" if isinstance(key, tuple) else f"page {key}"
+            print(f"  - {where}: {failures[key]}")
+    else:
+        print("All pages fetched")
+
+def page_items(result: Optional[Dict]) -> Optional[List[Dict]]:
+    """Items of a fetched page, or None if the page failed"""
+    if not (result and result.get('ok')):
+        return None
+    body = result.get('data')
+    return (body.get('items') or []) if isinstance(body, dict) else []
+
+# Only unambiguous names: a bare 'count' or 'pages' is often the size of the current page
+TOTAL_PAGE_KEYS = ('totalPages', 'total_pages', 'lastPage', 'last_page', 'pageCount')
+TOTAL_ITEM_KEYS = ('total', 'totalCount', 'total_count', 'totalItems')
+
+def discover_last_page(result: Dict, page_size: int = PAGE_SIZE) -> Optional[int]:
+    """Read the last page number from a response's pagination fields, if it has any"""
+    body = result.get('data') or {}
+    containers = [body, body.get('pagination'), body.get('meta'), result.get('meta'), result.get('pagination')]
+    for container in containers:
+        if not isinstance(container, dict):
+            continue
+        for key in TOTAL_PAGE_KEYS:
+            value = container.get(key)
+            if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+                return value
+        for key in TOTAL_ITEM_KEYS:
+            value = container.get(key)
+            if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+                return math.ceil(value / page_size)
+    return None
+
+def first_page_end(result: Dict, items: List[Dict]) -> Optional[int]:
+    """Last page to crawl from page 1's pagination fields, or None to probe until an empty page.
+
+    A full first page with an advertised end of 1 contradicts itself, so
+    the count is ignored then.
+    """
+    advertised = discover_last_page(result)
+    if advertised == 1 and len(items) >= PAGE_SIZE:
+        return None
+    return advertised
+
+def new_limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(initial=CONCURRENT_REQUESTS, max_limit=MAX_CONCURRENT_REQUESTS)
+
+FIELDNAMES = COLUMN_NAMES  # Fixed CSV header, same order as before
+
+def flatten_rows(products: List[Dict]) -> List[Dict]:
+    """One flattened dict per product (CSV header keys), via the column-wise flatten_page"""
+    columns = flatten_page(products)
+    return [dict(zip(FIELDNAMES, values)) for values in zip(*(columns[name] for name in FIELDNAMES))]
+
+PARTIAL_SUFFIX = '.partial'  # Snapshot files carry it until their run is complete
+
+class SnapshotWriter:
+    """Append each page to the CSV and NDJSON (and optional Parquet/compact) sinks as soon as it arrives.
+
+    Files are written as <name>.partial and only renamed to their final
+    names on exit once complete() was called, so an unfinished snapshot is
+    never taken for a finished one. The compact snapshot is buffered and
+    only written then.
+    """
+
+    def __init__(self, csv_filename: str, ndjson_filename: str, parquet_filename: Optional[str] = None,
+                 compact_store: Optional["CompactStore"] = None):
+        self.csv_filename = csv_filename
+        self.ndjson_filename = ndjson_filename
+        self.parquet_filename = parquet_filename
+        self.compact_store = compact_store
+        self.count = 0
+        self.completed = False
+        self.saved = False  # Renamed to the final names
+        self._parquet = None
+        self._compact = None
+
+    def filenames(self) -> List[str]:
+        return [self.csv_filename, self.ndjson_filename] + ([self.parquet_filename] if self.parquet_filename else [])
+
+    def path(self, filename: str) -> str:
+        """Where one of the files is on disk: its final name once the snapshot is saved"""
+        return filename if self.saved else filename + PARTIAL_SUFFIX
+
+    def __enter__(self) -> "SnapshotWriter":
+        if self.parquet_filename:
+            self._parquet = ParquetSnapshotWriter(self.path(self.parquet_filename))
+        if self.compact_store is not None:
+            self._compact = self.compact_store.writer(os.path.splitext(self.csv_filename)[0])
+        self._csv_file = open(self.path(self.csv_filename), 'w', newline='', encoding='utf-8')
+        self._ndjson_file = open(self.path(self.ndjson_filename), 'w', encoding='utf-8')
+        self._writer = csv.writer(self._csv_file)
+        self._writer.writerow(FIELDNAMES)
+        return self
+
+    def complete(self):
+        """Mark every page as written: the files get their final names on exit"""
+        self.completed = True
+
+    def __exit__(self, *exc):
+        self._csv_file.close()
+        self._ndjson_file.close()
+        if self._parquet:
+            self._parquet.close()
+        if not self.completed:
+            return
+        if self._compact:
+            self._compact.close()
+        for filename in self.filenames():
+            os.replace(filename + PARTIAL_SUFFIX, filename)
+        self.saved = True
+
+    def write_page(self, items: List[Dict], record: Optional[PageMetrics] = None):
+        """Flatten and append one page of products, then flush both sinks"""
+        started = time.perf_counter()
+        # Column-wise flatten, then rows straight off the columns: no per-row dicts
+        columns = flatten_page(items)
+        flattened = time.perf_counter()
+        self._writer.writerows(zip(*(columns[name] for name in FIELDNAMES)))
+        self._ndjson_file.writelines(json.dumps(p, ensure_ascii=False) + '\n' for p in items)
+        self._csv_file.flush()
+        self._ndjson_file.flush()
+        if self._parquet:
+            self._parquet.write_page(items)
+        if self._compact:
+            self._compact.write_page(items)
+        self.count += len(items)
+        if record is not None:
+            record.flatten_seconds += flattened - started
+            record.write_seconds += time.perf_counter() - flattened
+
+@dataclass
+class JobProgress:
+    """Crawl position and outcome of one job"""
+    job: CrawlJob
+    failures: Dict[int, str] = field(default_factory=dict)
+    end: int = 0  # Last page to request; lowered when an empty page is seen
+    next_page: int = 2
+    last_with_items: int = 0
+    items: int = 0
+    done: Set[int] = field(default_factory=set)  # Pages already fetched by an earlier, resumed run
+
+    @property
+    def pending(self) -> bool:
+        while self.next_page in self.done:
+            self.next_page += 1
+        return self.next_page <= self.end
+
+async def crawl_jobs(transport: Transport, limiter: AdaptiveLimiter, jobs: List[CrawlJob],
+                     on_page: Callable[[CrawlJob, int, List[Dict]], None],
+                     metrics: Optional[ScrapeMetrics] = None,
+                     progress: Optional[Dict[CrawlJob, JobProgress]] = None,
+                     on_end: Optional[Callable[[CrawlJob, int], None]] = None) -> Dict[CrawlJob, JobProgress]:
+    """Crawl several listings over one session and one concurrency budget.
+
+    Page 1 of every job is fetched first to size each crawl. A single pool
+    of workers then claims pages from the jobs round-robin, so small
+    listings finish early instead of queueing behind large ones and the
+    whole crawl takes about as long as its largest job. Workers stop
+    claiming a job's pages past its advertised last page or its first
+    empty page; a full page at the advertised end means the count was
+    stale, so the page after it is probed too.
+
+    progress carries over the state of a resumed run: pages in a job's
+    done set are skipped, and page 1 too once the job's end is known.
+    on_end is told every job's last page whenever it is found or lowered.
+    """
+    progress = progress or {}
+    progress = {job: progress.get(job) or JobProgress(job) for job in jobs}
+    states = list(progress.values())
+
+    def set_end(state: JobProgress, end: int):
+        state.end = end
+        if on_end is not None:
+            on_end(state.job, end)
+
+    async def first_page(state: JobProgress):
+        if state.end and 1 in state.done:
+            return
+        result = await fetch_page(transport, 1, limiter, state.job, state.failures, metrics)
+        items = page_items(result)
+        if not items:
+            return
+        on_page(state.job, 1, items)
+        state.last_with_items = max(state.last_with_items, 1)
+        state.items += len(items)
+        advertised = first_page_end(result, items)
+        prefix = "API reports" if len(jobs) == 1 else f"{state.job.name}:"
+        if advertised:
+            print(f"{prefix} {advertised} pages")
+        else:
+            print(f"{prefix} no page count, probing until an empty page")
+        set_end(state, min(advertised or MAX_PAGES, MAX_PAGES))
+
+    await asyncio.gather(*[first_page(state) for state in states])
+
+    turn = 0
 
+    def claim() -> Optional[Tuple[JobProgress, int]]:
+        nonlocal turn
+        for _ in range(len(states)):
+            state = states[turn % len(states)]
+            turn += 1
+            if state.pending:
+                state.next_page += 1
+                return state, state.next_page - 1
+        return None
+
+    async def worker():
+        while True:
+            claimed = claim()
+            if claimed is None:
+                return
+            state, page = claimed
+            items = page_items(await fetch_page(transport, page, limiter, state.job, state.failures, metrics))
+            if items is None:
+                continue
+            if not items:
+                # Past the end of this listing: stop handing out its later pages
+                if page - 1 < state.end:
+                    set_end(state, page - 1)
+                continue
+            state.last_with_items = max(state.last_with_items, page)
+            state.items += len(items)
+            on_page(state.job, page, items)
+            if page == state.end and len(items) >= PAGE_SIZE and state.end < MAX_PAGES:
+                set_end(state, page + 1)
+
+    await asyncio.gather(*[worker() for _ in range(limiter.max_limit)])
+    return progress
+
+async def scrape_incremental(store: ProductStateStore, changelog, limiter: AdaptiveLimiter,
+                             failures: Dict[int, str], sort: str = "",
+                             stop_after: int = UNCHANGED_PAGES_TO_STOP,
+                             config: Optional[TransportConfig] = None,
+                             metrics: Optional[ScrapeMetrics] = None,
+                             alerts: Optional[AlertEngine] = None) -> bool:
+    """Scrape pages in order, logging only changes; stop after a run of unchanged pages.
+
+    Inserted and updated rows are matched against the watch rules in alerts.
+    Returns True when every page was fetched, i.e. deletions could be detected.
+    """
+    job = CrawlJob(sort=sort)
+    unchanged_run = 0
+    full_pass = True
+    end = MAX_PAGES
+
+    async with Transport(config) as transport:
+        # Fetch in windows so pages are compared in sort order and we can stop early
+        start = 1
+        while start <= end:
+            window = range(start, min(start + limiter.current, end + 1))
+            start = window[-1] + 1
+            results = await asyncio.gather(*[fetch_page(transport, page, limiter, job, failures, metrics)
+                                             for page in window])
+
+            for page, result in zip(window, results):
+                items = page_items(result)
+                if page == 1 and items:
+                    end = min(first_page_end(result, items) or MAX_PAGES, MAX_PAGES)
+                if items is None:
+                    # A missing page can hide changes and makes deletions unknowable
+                    full_pass = False
+                    unchanged_run = 0
+                    continue
+                if not items:
+                    end = min(end, page - 1)
+                    break
+                if page == end and len(items) >= PAGE_SIZE and end < MAX_PAGES:
+                    end += 1  # A full page at the advertised end: the count was stale, probe the next one
+                started = time.perf_counter()
+                rows = flatten_rows(items)
+                flattened = time.perf_counter()
+                changes = store.apply_page(rows)
+                write_changes(changelog, changes)
+                if alerts is not None and changes:
+                    changed = {c['id'] for c in changes}
+                    alerts.match_rows(row for row in rows if row['id'] in changed)
+                record = metrics.get(page, job.name) if metrics is not None else None
+                if record is not None:
+                    record.flatten_seconds += flattened - started
+                    record.write_seconds += time.perf_counter() - flattened
+                unchanged_run = 0 if changes else unchanged_run + 1
+
+            if stop_after and unchanged_run >= stop_after and window[-1] < end:
+                print(f"\n{unchanged_run} consecutive unchanged pages, stopping after page {window[-1]}")
+                return False
+
+    return full_pass
+
+def write_changes(changelog, changes: List[Dict]):
+    """Append change records to an NDJSON change log"""
+    changelog.writelines(json.dumps(c, ensure_ascii=False) + '\n' for c in changes)
+    changelog.flush()
+
+def save_metrics(metrics: ScrapeMetrics, timestamp: str):
+    """Print the run summary and export the per-page metrics"""
+    metrics.finish()
+    metrics.print_summary()
+    jsonl_filename = f"premium_outlet_metrics_{timestamp}.jsonl"
+    prom_filename = f"premium_outlet_metrics_{timestamp}.prom"
+    metrics.write_jsonl(jsonl_filename)
+    metrics.write_prometheus(prom_filename)
+    print(f"✓ Saved metrics to {jsonl_filename} and {prom_filename}")
+
+class CategoryMemberships:
+    """Which categories each product was listed in, per language"""
+
+    def __init__(self):
+        self.categories: Dict[Tuple[str, int], Set[int]] = {}
+
+    def add_page(self, job: CrawlJob, items: List[Dict]) -> List[Dict]:
+        """Record the job's category for every item; returns the items not seen before in this language"""
+        fresh = []
+        for product in items:
+            key = (job.lang, product.get('id'))
+            seen = self.categories.get(key)
+            if seen is None:
+                self.categories[key] = {job.category}
+                fresh.append(product)
+            else:
+                seen.add(job.category)
+        return fresh
+
+    def write_csv(self, filename: str):
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'lang', 'categories'])
+            for (lang, product_id), categories in self.categories.items():
+                writer.writerow([product_id, lang, ', '.join(str(c) for c in sorted(categories))])
+
+def snapshot_stems(timestamp: str, jobs: List[CrawlJob], per_job: bool) -> Dict[str, str]:
+    """Output file stem per sink: one per job, or one per language when merged"""
+    if per_job:
+        return {job.name: f"premium_outlet_products_{timestamp}_{job.name}" for job in jobs}
+    langs = sorted({job.lang for job in jobs})
+    return {lang: f"premium_outlet_products_{timestamp}" + (f"_{lang}" if len(langs) > 1 else "") for lang in langs}
+
+def remove_partial_snapshots(stems: Dict[str, str], parquet: bool):
+    """Delete the .partial files an abandoned run left behind"""
+    for stem in stems.values():
+        for ext in ('.csv', '.ndjson') + (('.parquet',) if parquet else ()):
+            try:
+                os.remove(stem + ext + PARTIAL_SUFFIX)
+            except FileNotFoundError:
+                pass
+
+async def run_snapshot(config: TransportConfig, jobs: Optional[List[CrawlJob]] = None, per_job: bool = False,
+                       parquet: bool = False, collect_metrics: bool = True,
+                       checkpoint_path: str = DEFAULT_CHECKPOINT, resume: bool = False, restart: bool = False,
+                       image_config: Optional[ImageConfig] = None, alert_options: Optional[Dict] = None,
+                       search_index: Optional[str] = None, compact: Optional[str] = None,
+                       variants: bool = False):
+    """Crawl one or more listings into snapshot files, through a resumable checkpoint.
+
+    Each page goes to the checkpoint and then straight to the snapshot
+    files as it arrives; a resumed run first replays the checkpointed pages
+    into them. The files are named *.partial until every page is in, then
+    renamed and the checkpoint deleted; otherwise --resume fetches just the
+    missing pages. Several jobs share one session and concurrency budget.
+    Merged output has one snapshot per language with every product once,
+    from the first page it arrived on (categories in
+    premium_outlet_categories_*.csv); per-job output keeps each listing as
+    served. Compact snapshots of one run share the string dictionaries of
+    the compact store and are only written once complete. With
+    image_config, product images are mirrored while pages come in; with
+    alert_options (alerts.run_alerts arguments), the finished snapshots
+    are matched against a watchlist; with search_index, a complete
+    snapshot is applied to that search index; with compact, each snapshot
+    is also written to that compact store (see compact.py), plus its
+    variant table with variants. Returns the number of products written.
+    """
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    if resume:
+        if not checkpoint.started:
+            checkpoint.close()
+            raise SystemExit(f"Nothing to resume: {checkpoint_path} holds no unfinished scrape")
+        timestamp = checkpoint.timestamp
+        jobs = [CrawlJob(category, lang, sort) for _, category, lang, sort in checkpoint.jobs()]
+        options = checkpoint.options
+        per_job, parquet = options.get('per_job', False), options.get('parquet', False)
+        compact, variants = options.get('compact'), options.get('variants', False)
+        print(f"Resuming scrape {timestamp} from {checkpoint_path} ({checkpoint.page_count()} pages already fetched)")
+    else:
+        if checkpoint.started and not restart:
+            unfinished, pages = checkpoint.timestamp, checkpoint.page_count()
+            checkpoint.close()
+            raise SystemExit(f"{checkpoint_path} holds an unfinished scrape from {unfinished} "
+                             f"({pages} pages); pass --resume to continue it or --restart to discard it")
+        if checkpoint.started:
+            abandoned = [CrawlJob(category, lang, sort) for _, category, lang, sort in checkpoint.jobs()]
+            remove_partial_snapshots(snapshot_stems(checkpoint.timestamp, abandoned,
+                                                    checkpoint.options.get('per_job', False)),
+                                     checkpoint.options.get('parquet', False))
+        jobs = jobs or [DEFAULT_JOB]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        checkpoint.start(timestamp, [(job.name, job.category, job.lang, job.sort) for job in jobs],
+                         {'per_job': per_job, 'parquet': parquet, 'compact': compact,
+                          'variants': variants})
+        print("Starting scrape..." if len(jobs) == 1 else
+              f"Starting scrape of {len(jobs)} listings: {', '.join(job.name for job in jobs)}")
+    print(f"Concurrent requests: {CONCURRENT_REQUESTS} (adaptive, max {MAX_CONCURRENT_REQUESTS})\n")
+
+    limiter = new_limiter()
+    metrics = ScrapeMetrics() if collect_metrics else None
     start_time = datetime.now()
 
-    products = await scrape_all_pages()
+    progress = {}
+    for job in jobs:
+        done, end_page, items = checkpoint.progress(job.name)
+        progress[job] = JobProgress(job, end=end_page or 0, done=done, items=items,
+                                    last_with_items=max(done, default=0))
+
+    stems = snapshot_stems(timestamp, jobs, per_job)
+    memberships = CategoryMemberships()
+    store = None
+    if compact:
+        from compact import CompactStore  # Pulls in numpy, so only when compact output is asked for
+        store = CompactStore(compact, variants=variants)
+    mirror: Optional[ImageMirror] = None
+
+    def write_page(job: CrawlJob, page: int, items: List[Dict]):
+        fresh = memberships.add_page(job, items)
+        record = metrics.get(page, job.name) if metrics is not None else None
+        writers[job.name if per_job else job.lang].write_page(items if per_job else fresh, record)
+        if mirror is not None:
+            mirror.add(image_names(items))
 
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    def on_page(job: CrawlJob, page: int, items: List[Dict]):
+        started = time.perf_counter()
+        checkpoint.record_page(job.name, page, items)
+        record = metrics.get(page, job.name) if metrics is not None else None
+        if record is not None:
+            record.write_seconds += time.perf_counter() - started
+        write_page(job, page, items)
+
+    with contextlib.ExitStack() as stack:
+        writers = {key: stack.enter_context(SnapshotWriter(f"{stem}.csv", f"{stem}.ndjson",
+                                                           f"{stem}.parquet" if parquet else None, store))
+                   for key, stem in stems.items()}
+        async with Transport(config) as transport:
+            if image_config is not None:
+                mirror = ImageMirror(transport, image_config)
+            # Pages fetched before a resume never reach on_page
+            for job in jobs:
+                for page, items in checkpoint.iter_pages(job.name):
+                    write_page(job, page, items)
+            progress = await crawl_jobs(transport, limiter, jobs, on_page, metrics, progress,
+                                        on_end=lambda job, end: checkpoint.set_end(job.name, end))
+            if mirror is not None:
+                await mirror.wait()
+
+        if len(jobs) == 1:
+            failures = dict(progress[jobs[0]].failures)
+        else:
+            failures = {(state.job.name, page): reason for state in progress.values()
+                        for page, reason in state.failures.items()}
+        if not failures:
+            for writer in writers.values():
+                writer.complete()
+    counts = {key: writer.count for key, writer in writers.items()}
+
+    memberships_filename = f"premium_outlet_categories_{timestamp}.csv"
+    if len(jobs) > 1:
+        memberships.write_csv(memberships_filename)
+
+    duration = (datetime.now() - start_time).total_seconds()
 
     print(f"\n{'='*60}")
     print(f"Scraping completed in {duration:.2f} seconds")
-    print(f"Total products fetched: {len(products)}")
+    if len(jobs) > 1:
+        for state in progress.values():
+            print(f"  {state.job.name}: {state.items} products over {state.last_with_items} pages")
+    print(f"Total products written: {sum(counts.values())}")
+    report_fetch_health(limiter, failures)
+    if mirror is not None:
+        print(mirror.summary())
+    if metrics is not None:
+        save_metrics(metrics, timestamp)
+    if failures:
+        checkpoint.close()
+        print(f"Checkpoint kept in {checkpoint_path}: run with --resume to fetch only the missing pages")
+    else:
+        checkpoint.discard()
     print(f"{'='*60}\n")
 
-    # Save to CSV
+    for key, stem in stems.items():
+        writer = writers[key]
+        if not writer.saved:
+            print(f"✗ Incomplete snapshot of {counts[key]} products kept as {writer.path(f'{stem}.csv')} "
+                  f"(and .ndjson{', .parquet' if parquet else ''}); --resume completes it")
+            continue
+        print(f"✓ Saved {counts[key]} products to {stem}.csv")
+        print(f"✓ Saved raw data to {stem}.ndjson")
+        if parquet:
+            print(f"✓ Saved typed columnar snapshot to {stem}.parquet")
+        if compact:
+            print(f"✓ Saved compact snapshot to {os.path.join(compact, os.path.basename(stem))}.snap")
+        if variants:
+            print(f"✓ Saved variant table to {os.path.join(compact, os.path.basename(stem))}.variants.snap")
+    if len(jobs) > 1:
+        print(f"✓ Saved category memberships to {memberships_filename}")
+    if alert_options is not None:
+        run_alerts(snapshots=[writer.path(writer.csv_filename) for writer in writers.values()], **alert_options)
+    if search_index:
+        if failures:
+            # Products on the missing pages would be dropped from the index
+            print(f"Search index {search_index} not updated: the snapshot is incomplete")
+        else:
+            build_index(f"{next(iter(stems.values()))}.csv", search_index)
+    return sum(counts.values())
+
+async def run_incremental(config: TransportConfig, state_db: str, sort: str, full: bool,
+                          collect_metrics: bool = True, alert_options: Optional[Dict] = None):
+    print(f"Starting incremental scrape against {state_db}...")
+    print(f"Concurrent requests: {CONCURRENT_REQUESTS} (adaptive, max {MAX_CONCURRENT_REQUESTS})\n")
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"premium_outlet_products_{timestamp}.csv"
-    save_to_csv(products, filename)
-
-    # Also save raw JSON for backup
-    json_filename = f"premium_outlet_products_{timestamp}.json"
-    with open(json_filename, 'w', encoding='utf-8') as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
-    print(f"✓ Saved raw data to {json_filename}")
+    changes_filename = f"premium_outlet_changes_{timestamp}.ndjson"
+
+    limiter = new_limiter()
+    failures = {}
+    metrics = ScrapeMetrics() if collect_metrics else None
+    start_time = datetime.now()
+
+    with contextlib.ExitStack() as stack:
+        store = stack.enter_context(ProductStateStore(state_db))
+        changelog = stack.enter_context(open(changes_filename, 'w', encoding='utf-8'))
+        alerts = stack.enter_context(alert_session(**alert_options)) if alert_options is not None else None
+        store.start_run()
+        full_pass = await scrape_incremental(store, changelog, limiter, failures, sort=sort,
+                                             stop_after=0 if full else UNCHANGED_PAGES_TO_STOP, config=config,
+                                             metrics=metrics, alerts=alerts)
+        write_changes(changelog, store.finish_run(full_pass))
+        counts = store.counts
+
+    duration = (datetime.now() - start_time).total_seconds()
+
+    print(f"\n{'='*60}")
+    print(f"Incremental scrape completed in {duration:.2f} seconds")
+    print(f"Inserted: {counts['insert']}  Updated: {counts['update']}  Deleted: {counts['delete']}")
+    report_fetch_health(limiter, failures)
+    if not full_pass:
+        print("Deletions not checked (partial pass); run with --full to detect them")
+    if metrics is not None:
+        save_metrics(metrics, timestamp)
+    print(f"{'='*60}\n")
+
+    print(f"✓ Saved change log to {changes_filename}")
+
+def parse_int_list(value: str) -> List[int]:
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers: {value}")
+
+def parse_str_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+def crawl_job_list(args: argparse.Namespace) -> List[CrawlJob]:
+    """Every category x language combination from the command line, in one sort order"""
+    return [CrawlJob(category, lang, args.sort)
+            for category in args.categories or [DEFAULT_JOB.category]
+            for lang in args.langs or [DEFAULT_JOB.lang]]
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape Premium Outlet products")
+    parser.add_argument('--api-url', default=API_URL,
+                        help="products endpoint, e.g. a local benchmarks.mock_api server")
+    parser.add_argument('--timeout', type=float, default=TransportConfig.total_timeout,
+                        help="total timeout per request attempt in seconds")
+    parser.add_argument('--no-compression', action='store_true', help="request uncompressed responses")
+    parser.add_argument('--parquet', action='store_true',
+                        help="also write a typed Parquet snapshot (needs pyarrow)")
+    parser.add_argument('--compact', metavar='DIR', default=None,
+                        help="also write a compact, memory-mappable snapshot into this store (see compact.py)")
+    parser.add_argument('--variants', action='store_true',
+                        help="with --compact: also store one row per product variant (size, prices, stock)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only emit inserts/updates/deletions against the local state store")
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB,
+                        help=f"SQLite state store for incremental mode (default: {DEFAULT_STATE_DB})")
+    parser.add_argument('--sort', default="",
+                        help="API sort order; incremental early stopping assumes it is stable")
+    parser.add_argument('--full', action='store_true',
+                        help="incremental mode: fetch every page so deletions can be detected")
+    parser.add_argument('--no-metrics', action='store_true',
+                        help="skip the premium_outlet_metrics_*.jsonl/.prom per-page metrics export")
+    parser.add_argument('--categories', type=parse_int_list, default=None,
+                        help=f"comma-separated category ids to crawl together (default: {DEFAULT_JOB.category})")
+    parser.add_argument('--langs', type=parse_str_list, default=None,
+                        help=f"comma-separated languages, crawled for every category (default: {DEFAULT_JOB.lang})")
+    parser.add_argument('--per-job', action='store_true',
+                        help="with --categories/--langs: one snapshot per listing instead of merged by product id")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT,
+                        help=f"page log that makes snapshot runs resumable (default: {DEFAULT_CHECKPOINT})")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue the scrape in --checkpoint, fetching only the pages it is missing")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard an unfinished scrape in --checkpoint and start over")
+    parser.add_argument('--images', metavar='DIR', default=None,
+                        help="also mirror product images into DIR, skipping files already there")
+    parser.add_argument('--image-base-url', default=None,
+                        help="URL prefix image filenames are appended to (required with --images)")
+    parser.add_argument('--image-concurrency', type=int, default=IMAGE_CONCURRENCY,
+                        help=f"parallel image downloads (default: {IMAGE_CONCURRENCY})")
+    parser.add_argument('--image-budget-mb', type=float, default=None,
+                        help="stop starting image downloads after this many MB")
+    parser.add_argument('--search-index', default=None,
+                        help="update this search index (see search.py) with the new snapshot")
+    parser.add_argument('--alerts', metavar='WATCHLIST', default=None,
+                        help="match the scraped products against this watchlist (see alerts.py); "
+                             "incremental runs match inserted and updated products")
+    parser.add_argument('--alerts-out', default=DEFAULT_ALERTS,
+                        help=f"JSON-lines file alerts are appended to (default: {DEFAULT_ALERTS})")
+    parser.add_argument('--alerts-webhook', default=None, help="also POST alerts to this URL")
+    parser.add_argument('--alerts-state', default=DEFAULT_ALERT_STATE,
+                        help=f"last price seen per rule and product (default: {DEFAULT_ALERT_STATE})")
+    args = parser.parse_args()
+    if args.images and not args.image_base_url:
+        parser.error("--images needs --image-base-url")
+    if args.variants and not args.compact:
+        parser.error("--variants is stored in the compact store: give --compact DIR")
+    if args.compact and args.incremental:
+        parser.error("--compact is only supported for snapshot runs")
+    if args.images and args.incremental:
+        parser.error("--images is only supported for snapshot runs")
+    if args.incremental and (args.resume or args.restart):
+        parser.error("--resume/--restart apply to snapshot runs; incremental runs are already stored page by page")
+    if args.search_index and (args.incremental or args.per_job or len(args.langs or []) > 1):
+        parser.error("--search-index needs a single merged snapshot: not with --incremental, --per-job "
+                     "or several --langs")
+    if args.incremental and (args.categories or args.langs):
+        parser.error("--incremental tracks a single listing; --categories/--langs are not supported with it")
+    return args
+
+async def main():
+    args = parse_args()
+    config = TransportConfig(api_url=args.api_url, total_timeout=args.timeout,
+                             compression=not args.no_compression)
+    alert_options = None
+    if args.alerts:
+        alert_options = {'rules_path': args.alerts, 'alerts_path': args.alerts_out,
+                         'webhook': args.alerts_webhook, 'state_path': args.alerts_state}
+    if args.incremental:
+        await run_incremental(config, args.state_db, args.sort, args.full, not args.no_metrics, alert_options)
+    else:
+        image_config = None
+        if args.images:
+            budget = int(args.image_budget_mb * 1024 ** 2) if args.image_budget_mb is not None else None
+            image_config = ImageConfig(args.images, args.image_base_url, args.image_concurrency, budget)
+        await run_snapshot(config, crawl_job_list(args), args.per_job, args.parquet, not args.no_metrics,
+                           args.checkpoint, args.resume, args.restart, image_config, alert_options,
+                           args.search_index, args.compact, args.variants)
 
 if __name__ == "__main__":
     asyncio.run(main())
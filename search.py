@@ -0,0 +1,438 @@
+"""Local search over a product snapshot.
+
+Rows get a document number and every index is a bitmap over document
+numbers (a Python int, bit n set for document n): an inverted index of
+title/brand/item/line/model/article words, facet bitmaps for brand,
+item, season, collection and size, and bucketed range bitmaps for price
+and discount. A query intersects bitmaps and never rescans rows:
+
+    python search.py build premium_outlet_products_20251130_224700.csv
+    python search.py query "denim şalvar" --brand GUESS --max-price 150 --min-discount 40 --facets size
+
+Text is folded so Azerbaijani letters match their plain Latin spelling
+(şalvar = salvar, biçimli = bicimli, İ/ı = i); the last query word also
+matches as a prefix. Building against an existing index only touches
+products that were added, changed or removed since the last snapshot.
+"""
+import argparse
+import csv
+import json
+import os
+import pickle
+import re
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from product_state import content_hash
+
+DEFAULT_INDEX = "search_index.pickle"
+INDEX_VERSION = 1
+DEFAULT_LIMIT = 20
+RANGE_BUCKETS = 256  # Prefix bitmaps per range index; edge buckets are resolved per document
+SPARSE_TERM = 32  # Words in fewer products than this are saved as document lists
+COMPACT_RATIO = 0.5  # Rebuild from scratch once removed documents exceed this share of live ones
+
+TEXT_FIELDS = ('title', 'brand_title', 'item', 'line', 'model', 'article')
+FACETS = {'brand': 'brand_title', 'item': 'item', 'season': 'season', 'collection': 'colection',
+          'size': 'available_sizes'}
+RANGES = ('price', 'discount')
+SORT_ORDERS = ('price', 'price_desc', 'discount', 'discount_desc')
+STORED_FIELDS = ('id', *TEXT_FIELDS, 'season', 'colection', 'available_sizes', 'price', 'discount', 'route')
+
+AZ_FOLD = str.maketrans({'ə': 'e', 'ı': 'i', 'ş': 's', 'ç': 'c', 'ğ': 'g', 'ö': 'o', 'ü': 'u',
+                         'Ə': 'e', 'I': 'i', 'İ': 'i', 'Ş': 's', 'Ç': 'c', 'Ğ': 'g', 'Ö': 'o', 'Ü': 'u'})
+WORD = re.compile(r'\w+')
+
+def normalise(text: str) -> str:
+    """Lower-case and fold Azerbaijani letters to their plain Latin base"""
+    return text.translate(AZ_FOLD).casefold()
+
+def tokenize(text: str) -> List[str]:
+    return WORD.findall(normalise(text))
+
+def bitmap_from_docs(docs: Iterable[int]) -> int:
+    """Set of document numbers -> bitmap, in one pass over a byte buffer"""
+    docs = list(docs)
+    if not docs:
+        return 0
+    buffer = bytearray(max(docs) // 8 + 1)
+    for doc in docs:
+        buffer[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(buffer, 'little')
+
+def iter_docs(bitmap: int) -> Iterator[int]:
+    """Document numbers in a bitmap, ascending"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _sizes(value) -> List[str]:
+    if isinstance(value, str):
+        return [s for s in value.split(', ') if s]
+    return list(value or [])
+
+class RangeIndex:
+    """Numeric column as prefix bitmaps over its sorted order.
+
+    cumulative[b] holds every document ranked below bucket b, so a range is
+    one XOR of two prefixes plus the documents in the two edge buckets.
+    """
+
+    def __init__(self, values: Dict[int, float]):
+        ranked = sorted((value, doc) for doc, value in values.items())
+        self.values = [value for value, _ in ranked]
+        self.docs = [doc for _, doc in ranked]
+        self.bucket = max(64, -(-len(ranked) // RANGE_BUCKETS))
+        self.cumulative = [0]
+        for start in range(0, len(ranked), self.bucket):
+            self.cumulative.append(self.cumulative[-1] | bitmap_from_docs(self.docs[start:start + self.bucket]))
+
+    def _below(self, rank: int) -> int:
+        """Bitmap of the documents ranked below rank"""
+        bucket = rank // self.bucket
+        return self.cumulative[bucket] | bitmap_from_docs(self.docs[bucket * self.bucket:rank])
+
+    def between(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect_right(self.values, high)
+        if start >= end:
+            return 0
+        return self._below(end) ^ self._below(start)
+
+    def ordered(self, bitmap: int, descending: bool = False) -> Iterator[int]:
+        """Documents of bitmap in value order, skipping buckets with no document in it"""
+        buckets = range(len(self.cumulative) - 2, -1, -1) if descending else range(len(self.cumulative) - 1)
+        for bucket in buckets:
+            if not bitmap & (self.cumulative[bucket + 1] ^ self.cumulative[bucket]):
+                continue
+            docs = self.docs[bucket * self.bucket:(bucket + 1) * self.bucket]
+            for doc in reversed(docs) if descending else docs:
+                if bitmap >> doc & 1:
+                    yield doc
+
+class SearchIndex:
+    """Inverted, facet and range bitmaps over one snapshot, updatable row by row"""
+
+    def __init__(self):
+        self.source: Optional[str] = None
+        self.docs: List[Optional[Dict]] = []  # Stored fields per document number; None once removed
+        self.doc_of: Dict[int, int] = {}  # Product id -> document number
+        self.hashes: Dict[int, str] = {}
+        self.live = 0
+        self.removed = 0
+        self.terms: Dict[str, int] = {}
+        self.facets: Dict[str, Dict[str, int]] = {name: {} for name in FACETS}
+        self.labels: Dict[str, Dict[str, str]] = {name: {} for name in FACETS}  # Folded value -> as shown
+        self.vocabulary: List[str] = []
+        self.ranges: Dict[str, RangeIndex] = {}
+
+    @staticmethod
+    def _document(row: Dict) -> Dict:
+        doc = {field: row.get(field) for field in STORED_FIELDS}
+        doc['id'] = int(float(row['id']))
+        doc['available_sizes'] = _sizes(doc['available_sizes'])
+        for field in RANGES:
+            doc[field] = _float(doc[field])
+        return doc
+
+    @staticmethod
+    def _keys(doc: Dict) -> Tuple[set, List[Tuple[str, str, str]]]:
+        """Words and (facet, folded value, label) entries a stored document is indexed under"""
+        words = set()
+        for field in TEXT_FIELDS:
+            if doc.get(field):
+                words.update(tokenize(str(doc[field])))
+        facets = []
+        for name, field in FACETS.items():
+            values = doc[field] if name == 'size' else ([doc[field]] if doc.get(field) else [])
+            facets.extend((name, normalise(str(value)), str(value)) for value in values)
+        return words, facets
+
+    def update(self, rows: Iterable[Dict]) -> Dict[str, int]:
+        """Bring the index in line with a full snapshot: add, re-index or remove only what changed"""
+        counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        add_terms: Dict[str, List[int]] = {}
+        drop_terms: Dict[str, List[int]] = {}
+        add_facets: Dict[Tuple[str, str], List[int]] = {}
+        drop_facets: Dict[Tuple[str, str], List[int]] = {}
+        added, dropped = [], []
+
+        def index(doc_number: int, doc: Dict, terms: Dict, facets: Dict):
+            words, entries = self._keys(doc)
+            for word in words:
+                terms.setdefault(word, []).append(doc_number)
+            for name, value, label in entries:
+                facets.setdefault((name, value), []).append(doc_number)
+                self.labels[name].setdefault(value, label)
+
+        seen = set()
+        for row in rows:
+            try:
+                doc = self._document(row)
+            except (KeyError, TypeError, ValueError):
+                continue
+            product_id = doc['id']
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            row_hash = content_hash(doc)
+            number = self.doc_of.get(product_id)
+            if number is not None and self.hashes[product_id] == row_hash:
+                counts['unchanged'] += 1
+                continue
+            if number is not None:
+                # Changed: the document keeps its number, only its postings move
+                index(number, self.docs[number], drop_terms, drop_facets)
+                counts['changed'] += 1
+            else:
+                number = len(self.docs)
+                self.docs.append(None)
+                self.doc_of[product_id] = number
+                added.append(number)
+                counts['added'] += 1
+            self.docs[number] = doc
+            self.hashes[product_id] = row_hash
+            index(number, doc, add_terms, add_facets)
+
+        for product_id in [p for p in self.doc_of if p not in seen]:
+            number = self.doc_of.pop(product_id)
+            del self.hashes[product_id]
+            index(number, self.docs[number], drop_terms, drop_facets)
+            self.docs[number] = None
+            dropped.append(number)
+            counts['removed'] += 1
+        self.removed += len(dropped)
+
+        self._apply(self.terms, drop_terms, add_terms)
+        for (name, value), docs in drop_facets.items():
+            self.facets[name][value] = self.facets[name].get(value, 0) & ~bitmap_from_docs(docs)
+        for (name, value), docs in add_facets.items():
+            self.facets[name][value] = self.facets[name].get(value, 0) | bitmap_from_docs(docs)
+        for name in FACETS:
+            self.facets[name] = {value: bitmap for value, bitmap in self.facets[name].items() if bitmap}
+        self.live = (self.live & ~bitmap_from_docs(dropped)) | bitmap_from_docs(added)
+        self._finish()
+        return counts
+
+    @staticmethod
+    def _apply(bitmaps: Dict[str, int], drop: Dict[str, List[int]], add: Dict[str, List[int]]):
+        for key, docs in drop.items():
+            remaining = bitmaps.get(key, 0) & ~bitmap_from_docs(docs)
+            if remaining:
+                bitmaps[key] = remaining
+            else:
+                bitmaps.pop(key, None)
+        for key, docs in add.items():
+            bitmaps[key] = bitmaps.get(key, 0) | bitmap_from_docs(docs)
+
+    def _finish(self):
+        """Rebuild the derived structures: sorted vocabulary for prefixes, and the range bitmaps"""
+        self.vocabulary = sorted(self.terms)
+        for field in RANGES:
+            self.ranges[field] = RangeIndex({number: doc[field] for number, doc in enumerate(self.docs)
+                                             if doc is not None and doc[field] is not None})
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_of)
+
+    def needs_compaction(self) -> bool:
+        return self.removed > COMPACT_RATIO * max(self.size, 1)
+
+    def compacted(self) -> "SearchIndex":
+        """Fresh index over the live documents, renumbered without gaps"""
+        index = SearchIndex()
+        index.update(doc for doc in self.docs if doc is not None)
+        index.source = self.source
+        return index
+
+    def _term(self, word: str, prefix: bool) -> int:
+        if not prefix:
+            return self.terms.get(word, 0)
+        bitmap = 0
+        start = bisect_left(self.vocabulary, word)
+        for term in self.vocabulary[start:]:
+            if not term.startswith(word):
+                break
+            bitmap |= self.terms[term]
+        return bitmap
+
+    def _facet(self, name: str, values: List[str]) -> int:
+        bitmap = 0
+        for value in values:
+            bitmap |= self.facets[name].get(normalise(value), 0)
+        return bitmap
+
+    def match(self, text: str = "", filters: Optional[Dict[str, List[str]]] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              min_discount: Optional[float] = None, max_discount: Optional[float] = None) -> int:
+        """Bitmap of the documents matching every word (the last as a prefix) and every filter.
+
+        Values within one facet are alternatives (brand=GUESS or brand=Diesel).
+        """
+        result = self.live
+        words = tokenize(text)
+        for position, word in enumerate(words):
+            result &= self._term(word, prefix=position == len(words) - 1)
+            if not result:
+                return 0
+        for name, values in (filters or {}).items():
+            if values:
+                result &= self._facet(name, values)
+        if min_price is not None or max_price is not None:
+            result &= self.ranges['price'].between(min_price, max_price)
+        if min_discount is not None or max_discount is not None:
+            result &= self.ranges['discount'].between(min_discount, max_discount)
+        return result
+
+    def page(self, bitmap: int, limit: int = DEFAULT_LIMIT, sort: str = "") -> List[Dict]:
+        """The first `limit` matching documents in snapshot order, or in one of SORT_ORDERS"""
+        if not sort:
+            numbers = []
+            for number in iter_docs(bitmap):
+                numbers.append(number)
+                if len(numbers) == limit:
+                    break
+        else:
+            if sort not in SORT_ORDERS:
+                raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+            field, _, descending = sort.partition('_')
+            numbers = []
+            for number in self.ranges[field].ordered(bitmap, descending=bool(descending)):
+                numbers.append(number)
+                if len(numbers) == limit:
+                    break
+        return [self.docs[number] for number in numbers]
+
+    def facet_counts(self, bitmap: int, name: str, top: int = 10) -> Dict[str, int]:
+        """Matching documents per value of one facet, largest first"""
+        counts = {}
+        for value, facet in self.facets[name].items():
+            count = (bitmap & facet).bit_count()
+            if count:
+                counts[self.labels[name].get(value, value)] = count
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top])
+
+    def search(self, text: str = "", limit: int = DEFAULT_LIMIT, sort: str = "",
+               facets: Iterable[str] = (), **criteria) -> Dict:
+        start = time.perf_counter()
+        bitmap = self.match(text, **criteria)
+        results = self.page(bitmap, limit, sort)
+        counts = {name: self.facet_counts(bitmap, name) for name in facets}
+        return {'total': bitmap.bit_count(), 'elapsed_ms': (time.perf_counter() - start) * 1000,
+                'results': results, 'facets': counts}
+
+    def save(self, path: str = DEFAULT_INDEX):
+        """Write atomically, so a reader never sees half an index"""
+        state = {'version': INDEX_VERSION, **self.__dict__}
+        state['ranges'] = {}  # Rebuilt on load
+        # Most words occur in a handful of products: a short list pickles far smaller than a bitmap
+        state['terms'] = {term: list(iter_docs(bitmap)) if bitmap.bit_count() < SPARSE_TERM else bitmap
+                          for term, bitmap in self.terms.items()}
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX) -> Optional["SearchIndex"]:
+        """The saved index, or None if there is none or it has an older layout"""
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        if state.pop('version', None) != INDEX_VERSION:
+            return None
+        index = cls()
+        index.__dict__.update(state)
+        index.terms = {term: bitmap_from_docs(docs) if isinstance(docs, list) else docs
+                       for term, docs in state['terms'].items()}
+        index._finish()
+        return index
+
+def iter_snapshot_rows(path: str) -> Iterator[Dict]:
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+def build_index(snapshot: str, path: str = DEFAULT_INDEX, full: bool = False) -> SearchIndex:
+    """Update the saved index to a new snapshot (or build it from scratch) and save it"""
+    start = time.perf_counter()
+    index = None if full else SearchIndex.load(path)
+    incremental = index is not None
+    index = index or SearchIndex()
+    counts = index.update(iter_snapshot_rows(snapshot))
+    if index.needs_compaction():
+        index = index.compacted()
+    index.source = snapshot
+    index.save(path)
+    print(f"✓ {'Updated' if incremental else 'Built'} {path} from {snapshot} in {time.perf_counter() - start:.2f}s: "
+          f"{counts['added']} added, {counts['changed']} changed, {counts['removed']} removed, "
+          f"{counts['unchanged']} unchanged ({index.size} products, {len(index.terms)} terms)")
+    return index
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build and query the product search index")
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f"index file (default: {DEFAULT_INDEX})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="index a snapshot, updating the existing index in place")
+    build.add_argument('snapshot', help="premium_outlet_products_*.csv")
+    build.add_argument('--full', action='store_true', help="rebuild from scratch instead of updating")
+
+    query = commands.add_parser('query', help="search the index")
+    query.add_argument('text', nargs='?', default="", help="words to match; the last one also matches as a prefix")
+    for name in FACETS:
+        query.add_argument(f'--{name}', action='append', help=f"{name} filter (repeat for alternatives)")
+    query.add_argument('--min-price', type=float)
+    query.add_argument('--max-price', type=float)
+    query.add_argument('--min-discount', type=float)
+    query.add_argument('--max-discount', type=float)
+    query.add_argument('--sort', choices=SORT_ORDERS, default="", help="result order (default: snapshot order)")
+    query.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    query.add_argument('--facets', default="", help=f"comma-separated facets to count: {', '.join(FACETS)}")
+    query.add_argument('--json', action='store_true', help="print the full result as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command == 'build':
+        build_index(args.snapshot, args.index, args.full)
+        return
+
+    index = SearchIndex.load(args.index)
+    if index is None:
+        raise SystemExit(f"No index at {args.index}; run: python search.py build <snapshot.csv>")
+    facets = [f.strip() for f in args.facets.split(',') if f.strip()]
+    unknown = [f for f in facets if f not in FACETS]
+    if unknown:
+        raise SystemExit(f"Unknown facets: {', '.join(unknown)}")
+    try:
+        result = index.search(args.text, limit=args.limit, sort=args.sort, facets=facets,
+                              filters={name: getattr(args, name) for name in FACETS},
+                              min_price=args.min_price, max_price=args.max_price,
+                              min_discount=args.min_discount, max_discount=args.max_discount)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    print(f"{result['total']} matches in {result['elapsed_ms']:.3f} ms (index of {index.source})")
+    for doc in result['results']:
+        price = f"{doc['price']:.2f}" if doc['price'] is not None else "-"
+        discount = f"-{doc['discount']:.0f}%" if doc['discount'] else ""
+        print(f"  {doc['id']:>8}  {price:>9} AZN {discount:>5}  {doc['brand_title']} | {doc['title']} "
+              f"[{', '.join(doc['available_sizes'])}]")
+    for name, counts in result['facets'].items():
+        print(f"{name}: " + ', '.join(f"{value} ({count})" for value, count in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import csv
+import glob
+import os
+
+import scrape_products
+from benchmarks.mock_api import DEFAULT_CSV, create_app, load_catalogue, start_server
+from checkpoint import DEFAULT_CHECKPOINT, CrawlCheckpoint
+from history import SnapshotHistory
+from scrape_products import DEFAULT_JOB, MAX_RETRIES, PAGE_SIZE, run_snapshot
+from transport import TransportConfig
+
+PAGES = 30
+PRODUCTS = load_catalogue(DEFAULT_CSV)[:PAGES * PAGE_SIZE]
+
+def snapshot_rows(directory):
+    (path,) = glob.glob(os.path.join(directory, 'premium_outlet_products_*.csv'))
+    with open(path, newline='', encoding='utf-8') as f:
+        return sorted((row for row in csv.DictReader(f)), key=lambda row: int(row['id']))
+
+def clean_run(directory, monkeypatch):
+    monkeypatch.chdir(directory)
+
+    async def run():
+        runner, url = await start_server(create_app(PRODUCTS))
+        try:
+            await run_snapshot(TransportConfig(api_url=url), collect_metrics=False)
+        finally:
+            await runner.cleanup()
+    asyncio.run(run())
+    return snapshot_rows(directory)
+
+def test_resume_after_a_kill_skips_completed_pages(tmp_path, monkeypatch):
+    (tmp_path / 'clean').mkdir()
+    clean = clean_run(tmp_path / 'clean', monkeypatch)
+    killed = tmp_path / 'killed'
+    killed.mkdir()
+    monkeypatch.chdir(killed)
+
+    async def run():
+        app = create_app(PRODUCTS, latency=0.01)
+        runner, url = await start_server(app)
+        try:
+            crawl = asyncio.create_task(run_snapshot(TransportConfig(api_url=url), collect_metrics=False))
+            while len(app['served']) < PAGES // 3:
+                await asyncio.sleep(0.005)
+            crawl.cancel()
+            try:
+                await crawl
+            except asyncio.CancelledError:
+                pass
+
+            assert glob.glob('premium_outlet_products_*.csv') == []
+            assert len(glob.glob('premium_outlet_products_*.csv.partial')) == 1
+            with CrawlCheckpoint(DEFAULT_CHECKPOINT) as checkpoint:
+                done = checkpoint.progress(DEFAULT_JOB.name)[0]
+            assert 0 < len(done) < PAGES
+
+            before = len(app['served'])
+            await run_snapshot(TransportConfig(api_url=url), collect_metrics=False, resume=True)
+            return done, app['served'][before:]
+        finally:
+            await runner.cleanup()
+    done, refetched = asyncio.run(run())
+
+    assert done.isdisjoint(refetched)
+    assert done | set(refetched) == set(range(1, PAGES + 1))
+    assert glob.glob('*.partial') == []
+    assert not os.path.exists(DEFAULT_CHECKPOINT)
+    assert snapshot_rows(killed) == clean
+
+def test_failed_page_keeps_the_snapshot_partial_until_resumed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scrape_products, 'backoff_delay', lambda attempt, retry_after=None: 0.0)
+
+    async def run():
+        app = create_app(PRODUCTS, faults={7: [503] * (MAX_RETRIES + 1)})
+        runner, url = await start_server(app)
+        try:
+            await run_snapshot(TransportConfig(api_url=url), collect_metrics=False)
+            assert glob.glob('premium_outlet_products_*.csv') == []
+            assert SnapshotHistory(str(tmp_path / 'history.sqlite')).ingest() == []
+            assert os.path.exists(DEFAULT_CHECKPOINT)
+
+            before = len(app['served'])
+            await run_snapshot(TransportConfig(api_url=url), collect_metrics=False, resume=True)
+            return app['served'][before:]
+        finally:
+            await runner.cleanup()
+    assert asyncio.run(run()) == [7]
+    assert glob.glob('*.partial') == []
+    assert len(snapshot_rows(tmp_path)) == len(PRODUCTS)
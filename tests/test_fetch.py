@@ -0,0 +1,125 @@
+import asyncio
+import random
+
+import pytest
+
+import scrape_products
+from benchmarks.mock_api import DEFAULT_CSV, create_app, load_catalogue, start_server
+from concurrency import AdaptiveLimiter, backoff_delay
+from scrape_products import MAX_RETRIES, PAGE_SIZE, fetch_page, new_limiter, page_items
+from transport import Transport, TransportConfig
+
+PRODUCTS = load_catalogue(DEFAULT_CSV)[:3 * PAGE_SIZE]
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Backoff delays fetch_page asked for, without sleeping them"""
+    asked = []
+
+    def no_wait(attempt, retry_after=None):
+        asked.append(backoff_delay(attempt, retry_after=retry_after))
+        return 0.0
+    monkeypatch.setattr(scrape_products, 'backoff_delay', no_wait)
+    return asked
+
+def fetch(app, page=1, limiter=None, failures=None):
+    async def run():
+        runner, url = await start_server(app)
+        try:
+            async with Transport(TransportConfig(api_url=url)) as transport:
+                return await fetch_page(transport, page, limiter or new_limiter(), failures=failures)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(run())
+
+def test_limiter_cuts_once_per_window_and_grows_after_a_healthy_window():
+    async def run():
+        limiter = AdaptiveLimiter(initial=4, max_limit=6)
+        tokens = [await limiter.acquire() for _ in range(4)]
+        for token in tokens:
+            await limiter.release(token, 0.01, overloaded=False)
+        assert (limiter.current, limiter.increases) == (5, 1)
+
+        tokens = [await limiter.acquire() for _ in range(3)]
+        for token in tokens:
+            await limiter.release(token, 0.01, overloaded=True)
+        assert (limiter.current, limiter.decreases) == (2, 1)
+
+        token = await limiter.acquire()
+        await limiter.release(token, limiter.latency_target + 1, overloaded=False)
+        assert (limiter.current, limiter.decreases) == (1, 2)
+    asyncio.run(run())
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_overload_responses_cut_the_limit(delays, status):
+    limiter = new_limiter()
+    before = limiter.current
+    assert page_items(fetch(create_app(PRODUCTS, faults={1: [status]}), limiter=limiter)) == PRODUCTS[:PAGE_SIZE]
+    assert limiter.decreases == 1
+    assert limiter.current == before // 2
+
+def test_successes_grow_the_limit():
+    async def run():
+        app = create_app(PRODUCTS)
+        runner, url = await start_server(app)
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        try:
+            async with Transport(TransportConfig(api_url=url)) as transport:
+                for page in (1, 2, 3, 1, 2):  # 2 healthy -> 3, then 3 healthy -> 4
+                    await fetch_page(transport, page, limiter)
+        finally:
+            await runner.cleanup()
+        return limiter
+    limiter = asyncio.run(run())
+    assert (limiter.current, limiter.increases, limiter.decreases) == (4, 2, 0)
+
+def test_transient_errors_are_retried_with_growing_backoff(delays):
+    app = create_app(PRODUCTS, faults={2: [503, 502, 500]})
+    assert page_items(fetch(app, page=2)) == PRODUCTS[PAGE_SIZE:2 * PAGE_SIZE]
+    assert app['stats']['requests'] == 4
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= 0.5 * 2 ** attempt
+
+def test_gives_up_after_max_retries(delays):
+    app = create_app(PRODUCTS, faults={1: [503] * (MAX_RETRIES + 1)})
+    failures = {}
+    assert fetch(app, failures=failures) is None
+    assert app['stats']['requests'] == MAX_RETRIES + 1
+    assert len(delays) == MAX_RETRIES
+    assert failures == {1: 'status 503'}
+
+def test_client_errors_are_not_retried(delays):
+    app = create_app(PRODUCTS, faults={1: [404]})
+    failures = {}
+    assert fetch(app, failures=failures) is None
+    assert app['stats']['requests'] == 1
+    assert delays == []
+    assert failures == {1: 'status 404'}
+
+def test_backoff_jitter_stays_within_bounds():
+    random.seed(0)
+    for attempt in range(10):
+        ceiling = min(20.0, 0.5 * 2 ** attempt)
+        samples = [backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in samples)
+        assert max(samples) > ceiling / 2  # full jitter, not a fixed delay
+    assert all(backoff_delay(0, retry_after=3.0) >= 3.0 for _ in range(50))
+
+@pytest.mark.parametrize('body', ['null', '[1, 2]', '"ok"', 'not json', '{"ok": true, "data": null}',
+                                  '{"ok": true, "data": [1]}'])
+def test_malformed_bodies_are_retried(delays, body):
+    app = create_app(PRODUCTS, faults={1: [body, body]})
+    assert page_items(fetch(app)) == PRODUCTS[:PAGE_SIZE]
+    assert app['stats']['requests'] == 3
+
+def test_malformed_body_until_the_last_attempt_fails_the_page(delays):
+    failures = {}
+    assert fetch(create_app(PRODUCTS, faults={1: ['null'] * (MAX_RETRIES + 1)}), failures=failures) is None
+    assert failures == {1: 'empty/invalid body'}
+
+def test_page_items_tolerates_missing_payloads():
+    assert page_items(None) is None
+    assert page_items({'ok': False}) is None
+    assert page_items({'ok': True, 'data': None}) == []
+    assert page_items({'ok': True, 'data': {'items': None}}) == []
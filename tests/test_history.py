@@ -0,0 +1,27 @@
+import csv
+import itertools
+import os
+
+from benchmarks.mock_api import DEFAULT_CSV
+from compact import CompactStore, convert, variants_path
+from history import SnapshotHistory
+
+def test_ingest_skips_variant_tables(tmp_path):
+    with open(DEFAULT_CSV, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        rows = list(itertools.islice(reader, 20))
+        fieldnames = reader.fieldnames
+    source = tmp_path / 'premium_outlet_products_20250101_120000_az.csv'
+    with open(source, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    store = CompactStore(str(tmp_path / 'store'), variants=True)
+    snap, count = convert(str(source), store)
+    assert os.path.exists(variants_path(snap))
+
+    history = SnapshotHistory(str(tmp_path / 'history.sqlite'))
+    ingested = history.ingest(os.path.join(store.root, 'premium_outlet_products_*'))
+    assert ingested == [(snap, count)]
+    assert history.ingested() == {('2025-01-01T12:00:00', 'az')}
@@ -0,0 +1,89 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from benchmarks.mock_api import DEFAULT_CSV, create_app, load_catalogue, start_server
+from product_state import ProductStateStore
+from scrape_products import (CONCURRENT_REQUESTS, PAGE_SIZE, UNCHANGED_PAGES_TO_STOP, new_limiter,
+                             scrape_incremental)
+from transport import TransportConfig
+
+PAGES = 30
+PRODUCTS = load_catalogue(DEFAULT_CSV)[:PAGES * PAGE_SIZE]
+
+@pytest.fixture
+def store(tmp_path):
+    with ProductStateStore(str(tmp_path / 'state.sqlite')) as store:
+        yield store
+
+def incremental(store, products, stop_after=UNCHANGED_PAGES_TO_STOP):
+    """One incremental run: (full pass, change records incl. deletions, pages served)"""
+    async def run():
+        app = create_app(products)
+        runner, url = await start_server(app)
+        changelog = io.StringIO()
+        try:
+            store.start_run()
+            full_pass = await scrape_incremental(store, changelog, new_limiter(), {}, stop_after=stop_after,
+                                                 config=TransportConfig(api_url=url))
+        finally:
+            await runner.cleanup()
+        changes = [json.loads(line) for line in changelog.getvalue().splitlines()]
+        return full_pass, changes + store.finish_run(full_pass), sorted(app['served'])
+    return asyncio.run(run())
+
+def with_price(products, index, price):
+    changed = list(products)
+    changed[index] = {**products[index], 'price': price}
+    return changed
+
+def test_first_run_inserts_everything(store):
+    full_pass, changes, served = incremental(store, PRODUCTS)
+    assert full_pass
+    assert served == list(range(1, PAGES + 1))
+    assert [c['op'] for c in changes] == ['insert'] * len(PRODUCTS)
+
+def test_unchanged_products_are_not_emitted(store):
+    incremental(store, PRODUCTS, stop_after=0)
+    full_pass, changes, served = incremental(store, PRODUCTS, stop_after=0)
+    assert full_pass
+    assert served == list(range(1, PAGES + 1))
+    assert changes == []
+    assert store.counts == {'insert': 0, 'update': 0, 'delete': 0}
+
+def test_stops_after_a_run_of_unchanged_pages(store):
+    incremental(store, PRODUCTS)
+    full_pass, changes, served = incremental(store, PRODUCTS)
+    assert not full_pass
+    # Pages are compared a window (the limiter's current limit) at a time
+    assert served == list(range(1, CONCURRENT_REQUESTS + 1))
+    assert changes == []
+
+def test_changed_products_are_emitted_again(store):
+    incremental(store, PRODUCTS)
+    product = PRODUCTS[PAGE_SIZE + 3]
+    full_pass, changes, served = incremental(store, with_price(PRODUCTS, PAGE_SIZE + 3, product['price'] + 10))
+    assert not full_pass
+    assert changes == [{'op': 'update', 'id': product['id'],
+                        'changes': {'price': [product['price'], product['price'] + 10]}}]
+
+    # Nothing changed since: the product is not emitted a second time
+    assert incremental(store, with_price(PRODUCTS, PAGE_SIZE + 3, product['price'] + 10))[1] == []
+
+def test_changes_past_the_early_stop_need_a_full_pass(store):
+    incremental(store, PRODUCTS)
+    late = len(PRODUCTS) - 1
+    changed = with_price(PRODUCTS, late, PRODUCTS[late]['price'] + 1)
+    assert incremental(store, changed)[1] == []
+
+    full_pass, changes, served = incremental(store, changed, stop_after=0)
+    assert full_pass
+    assert [(c['op'], c['id']) for c in changes] == [('update', PRODUCTS[late]['id'])]
+
+def test_full_pass_reports_removed_products(store):
+    incremental(store, PRODUCTS)
+    full_pass, changes, _ = incremental(store, PRODUCTS[:-1], stop_after=0)
+    assert full_pass
+    assert [(c['op'], c['id']) for c in changes] == [('delete', PRODUCTS[-1]['id'])]
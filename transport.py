@@ -0,0 +1,102 @@
+import json
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import aiohttp
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding
+    orjson = None
+
+try:
+    import brotli  # noqa: F401  (aiohttp decodes br responses when this is installed)
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+API_URL = "https://premium-api-production.up.railway.app/products"
+
+BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/plain, */*",
+    "Origin": "https://www.premiumoutlet.az",
+}
+
+@dataclass
+class TransportConfig:
+    """Connection pool, timeout and encoding settings for the API session"""
+    api_url: str = API_URL
+    limit: int = 64  # Total pooled connections
+    limit_per_host: int = 32  # Matches the limiter's ceiling so it is never starved
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    total_timeout: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    compression: bool = True
+    fast_json: bool = True  # Use orjson for response bodies when it is installed
+
+def accept_encoding() -> str:
+    return "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+
+def json_loads(fast: bool = True) -> Callable[[str], object]:
+    return orjson.loads if fast and orjson is not None else json.loads
+
+class Transport:
+    """Shared aiohttp session plus the settings every API request needs"""
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.api_url = self.config.api_url
+        self.loads = json_loads(self.config.fast_json)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        config = self.config
+        connector = aiohttp.TCPConnector(
+            limit=config.limit,
+            limit_per_host=config.limit_per_host,
+            ttl_dns_cache=config.dns_cache_ttl,
+            keepalive_timeout=config.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=config.total_timeout,
+            connect=config.connect_timeout,
+            sock_read=config.read_timeout,
+        )
+        headers = dict(BASE_HEADERS)
+        if config.compression:
+            headers["Accept-Encoding"] = accept_encoding()
+        else:
+            headers["Accept-Encoding"] = "identity"
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+    async def __aenter__(self) -> "Transport":
+        self.session = self._create_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def post(self, payload: dict):
+        """POST a JSON payload to the products endpoint (use as ``async with``)"""
+        return self.session.post(self.api_url, json=payload)
+
+    def get_asset(self, url: str):
+        """GET a static file such as a product image (use as ``async with``)"""
+        # Images are already compressed, so skip content encoding
+        return self.session.get(url, headers={"Accept": "image/*,*/*;q=0.8", "Accept-Encoding": "identity"})
+
+    async def read_json(self, response: aiohttp.ClientResponse):
+        data, _ = await self.read_json_sized(response)
+        return data
+
+    async def read_json_sized(self, response: aiohttp.ClientResponse) -> Tuple[object, int]:
+        """Decoded JSON body plus its size in bytes after content decoding"""
+        body = await response.read()
+        return self.loads(body), len(body)